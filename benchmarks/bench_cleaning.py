@@ -0,0 +1,62 @@
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.data_cleaning import DataCleaning
+from scripts.cleaning_plan import CleaningPlan
+
+
+def make_frame(rows, numeric_columns=8, text_columns=4, null_ratio=0.05, seed=0):
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(numeric_columns):
+        values = rng.normal(100, 20, rows)
+        values[rng.random(rows) < null_ratio] = np.nan
+        data[f"num_{i}"] = values
+    for i in range(text_columns):
+        data[f"text_{i}"] = rng.choice(["alpha", "beta", "gamma", "delta"], rows)
+    df = pd.DataFrame(data)
+    # Some exact duplicates
+    return pd.concat([df, df.sample(frac=0.02, random_state=seed)], ignore_index=True)
+
+
+def measure(label, func, df):
+    # Peak counts only what the cleaning allocates on top of its input
+    frame = df.copy(deep=True)
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(frame)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<8} rows_out={len(result):<10} time={elapsed:7.2f}s peak={peak / 2**20:9.1f} MiB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the DataCleaning step chain with the fused CleaningPlan")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--strategy", default="mean", choices=["mean", "median", "mode", "drop"])
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    options = dict(missing_value_strategy=args.strategy, outlier_column="num_0", irrelevant_columns=["text_3", "num_7"])
+    print(f"input rows={len(df)} memory={df.memory_usage(deep=True).sum() / 2**20:.1f} MiB")
+    print("plan:", CleaningPlan(**options).explain())
+
+    cleaner = DataCleaning()
+    measure("chain", lambda frame: cleaner.clean_data(frame, **options, fused=False), df)
+    measure("fused", lambda frame: cleaner.clean_data(frame, **options, fused=True), df)
+
+
+if __name__ == "__main__":
+    main()
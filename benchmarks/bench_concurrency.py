@@ -0,0 +1,43 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fake_llm import FakeLLM, install
+from scripts.ai_agent import AIAgent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure AIAgent.clean_data speedup against a sleeping fake LLM")
+    parser.add_argument("--rows", type=int, default=400)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    df = pd.DataFrame({
+        "id": np.arange(args.rows),
+        "value": np.random.default_rng(0).normal(size=args.rows),
+    })
+    agent = AIAgent()
+    agent.graph  # import langgraph and compile the graph before timing, not inside the workers=1 run
+
+    baseline = None
+    for workers in args.workers:
+        fake = install(FakeLLM(latency=args.latency))
+        start = time.perf_counter()
+        results = agent.clean_data(df, batch_size=args.batch_size, max_workers=workers)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        rows_out = sum(len(r["cleaned_data"]) for r in results)
+        print(f"workers={workers:<3} batches={len(results):<5} rows={rows_out:<7} "
+              f"time={elapsed:.2f}s speedup={baseline / elapsed:.2f}x max_in_flight={fake.max_in_flight}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fake_llm import FakeLLM, install
+from scripts.ai_agent import AIAgent
+from scripts.batch_encoders import ENCODERS, get_encoder
+
+
+def sample_frames(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    cities = np.array(["New York", "Los Angeles", "Chicago", "Houston", "Phoenix"])
+    return {
+        "numeric": pd.DataFrame({
+            "id": np.arange(rows),
+            "price": rng.normal(100, 25, rows).round(2),
+            "quantity": rng.integers(1, 50, rows),
+        }),
+        "categorical": pd.DataFrame({
+            "id": np.arange(rows),
+            "city": rng.choice(cities, rows),
+            "status": rng.choice(["active", "inactive", "pending"], rows),
+            "amount": rng.normal(50, 10, rows).round(2),
+        }),
+        "text": pd.DataFrame({
+            "id": np.arange(rows),
+            "title": [f"Post number {i}" for i in range(rows)],
+            "body": ["lorem ipsum dolor sit amet " * int(n) for n in rng.integers(2, 20, rows)],
+        }),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare prompt size and latency of the batch encoders")
+    parser.add_argument("--rows", type=int, default=20, help="rows per batch")
+    parser.add_argument("--chars-per-token", type=float, default=4.0)
+    parser.add_argument("--per-token-latency", type=float, default=0.0005,
+                        help="fake prompt-evaluation cost in seconds per token")
+    parser.add_argument("--live", action="store_true", help="call the real Ollama server instead of the fake")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if not args.live:
+        install(FakeLLM(latency=0.0, per_token_latency=args.per_token_latency))
+
+    variants = [(name, {}) for name in ENCODERS]
+    variants += [("csv", {"dictionary_encode": True}), ("csv", {"max_cell_chars": 60})]
+
+    print(f"{'frame':<12} {'encoder':<28} {'tokens/row':>10} {'latency':>9}")
+    for frame_name, df in sample_frames(args.rows).items():
+        for name, options in variants:
+            encoder = get_encoder(name, **options)
+            tokens_per_row = len(encoder.encode(df)) / args.chars_per_token / len(df)
+            agent = AIAgent(encoder=encoder)
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                agent._clean_batch(df)
+            latency = (time.perf_counter() - start) / args.repeat
+            print(f"{frame_name:<12} {encoder.signature:<28} {tokens_per_row:>10.1f} {latency:>8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.stub_ollama import StubOllama
+from benchmarks.synthetic import make_dataset
+from scripts.ai_agent import AIAgent
+from scripts.llm_pool import OllamaPool
+
+
+def run(hosts, df, args):
+    pool = OllamaPool(hosts, max_concurrency=args.parallel, health_interval=0.5)
+    agent = AIAgent(client=pool, max_workers=pool.capacity, structured=args.structured)
+    try:
+        start = time.perf_counter()
+        results = agent.clean_data(df, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - start
+    finally:
+        pool.close()
+    rows = sum(len(result.get("cleaned_data", [])) for result in results)
+    return elapsed, rows, pool.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure AIAgent throughput over a pool of local stub Ollama servers")
+    parser.add_argument("--servers", type=int, default=4)
+    parser.add_argument("--parallel", type=int, default=1, help="requests each server runs at once")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per request on a stub server")
+    parser.add_argument("--rows", type=int, default=640)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--structured", action="store_true", help="stream schema-constrained output")
+    args = parser.parse_args()
+
+    df = make_dataset(args.rows, null_ratio=0.0, duplicate_ratio=0.0, outlier_ratio=0.0)
+    stubs = [StubOllama(latency=args.latency, parallel=args.parallel).start() for _ in range(args.servers)]
+    try:
+        print(f"{'servers':>7} {'seconds':>8} {'rows/s':>9} {'speedup':>8}  requests per server")
+        baseline = None
+        for count in range(1, args.servers + 1):
+            elapsed, rows, stats = run([stub.host for stub in stubs[:count]], df, args)
+            baseline = baseline or elapsed
+            spread = " ".join(str(endpoint["requests"]) for endpoint in stats)
+            print(f"{count:>7} {elapsed:>7.2f}s {rows / elapsed:>9.1f} {baseline / elapsed:>7.2f}x  {spread}")
+
+        # One server dies: its calls fail over and it is ejected, the rest carry the load
+        stubs[-1].stop()
+        elapsed, rows, stats = run([stub.host for stub in stubs], df, args)
+        status = " ".join(f"{endpoint['requests']}{'' if endpoint['healthy'] else '(ejected)'}" for endpoint in stats)
+        print(f"{args.servers:>7} {elapsed:>7.2f}s {rows / elapsed:>9.1f} {'1 down':>8}  {status}")
+    finally:
+        for stub in stubs[:-1]:
+            stub.stop()
+
+
+if __name__ == "__main__":
+    main()
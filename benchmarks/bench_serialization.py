@@ -0,0 +1,64 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.encoders import jsonable_encoder
+
+from benchmarks.synthetic import make_dataset
+from scripts.backend import to_records
+from scripts.serialization import COMPRESSIONS, compress, result_to_json, zstandard
+
+RESULT = {"issues_found": ["Missing values in num_0"], "cleaning_strategy": ["Filled with the column mean"]}
+
+
+#What the endpoints did before: records as Python dicts, walked by jsonable_encoder, then JSONResponse's json.dumps
+def records_path(df):
+    content = jsonable_encoder({**RESULT, "cleaned_data": to_records(df)})
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(shape, compression=None):
+    def encode(df):
+        content = result_to_json(RESULT, df, shape).encode("utf-8")
+        return compress(content, compression) if compression else content
+    return encode
+
+
+def measure(encode, df, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        content = encode(df)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    encode(df)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, len(content), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the records/jsonable_encoder path with direct columnar JSON encoding")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_dataset(args.rows)
+    variants = [("records + jsonable_encoder", records_path)]
+    variants += [(f"fast {shape}", fast_path(shape)) for shape in ("records", "split", "columns")]
+    variants += [(f"fast records + {encoding}", fast_path("records", encoding))
+                 for encoding in COMPRESSIONS if encoding != "zstd" or zstandard is not None]
+
+    print(f"{'variant':<28} {'rows/s':>12} {'seconds':>8} {'MB out':>8} {'peak MB':>8}")
+    for name, encode in variants:
+        seconds, size, peak = measure(encode, df, args.repeat)
+        print(f"{name:<28} {args.rows / seconds:>12,.0f} {seconds:>7.3f}s {size / 1e6:>8.1f} {peak / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Modules that should only load once the agent first talks to the model
+# (pyarrow itself is imported by pandas, so only its file-format modules are checked)
+DEFERRED = ["langgraph", "ollama", "sqlalchemy", "openpyxl", "pyarrow.parquet", "pyarrow.feather"]
+
+# Runs in a fresh interpreter: time one import, then report which heavy modules it pulled in
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "loaded": [name for name in {deferred!r} if name in sys.modules]}}))
+"""
+
+
+def measure(module):
+    code = PROBE.format(module=module, deferred=DEFERRED)
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+#Cumulative import time of the slowest top-level packages, from python -X importtime
+def import_profile(module, top):
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stderr
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if cumulative.isdigit() and "." not in name.strip():
+            packages[name.strip()] = int(cumulative)
+    return sorted(packages.items(), key=lambda item: -item[1])[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import time of the backend and the AI agent")
+    parser.add_argument("--modules", nargs="+", default=["scripts.ai_agent", "scripts.backend"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0, help="also list the N slowest packages per module (-X importtime)")
+    args = parser.parse_args()
+
+    print(f"{'module':<22} {'median':>8} {'min':>8}  deferred modules loaded")
+    for module in args.modules:
+        runs = [measure(module) for _ in range(args.repeat)]
+        seconds = [run["seconds"] for run in runs]
+        loaded = ", ".join(runs[-1]["loaded"]) or "none"
+        print(f"{module:<22} {statistics.median(seconds):>7.3f}s {min(seconds):>7.3f}s  {loaded}")
+        for name, microseconds in import_profile(module, args.top) if args.top else []:
+            print(f"    {name:<30} {microseconds / 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
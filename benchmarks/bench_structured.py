@@ -0,0 +1,56 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fake_llm import FakeLLM, install
+from benchmarks.synthetic import make_dataset
+from scripts.ai_agent import AIAgent
+from scripts.metrics import metrics
+
+
+def run(df, args, max_invalid, seed):
+    fake = install(FakeLLM(latency=0.0, bad_row_ratio=args.bad_row_ratio, degenerate_ratio=args.degenerate_ratio,
+                           stream_latency=args.stream_latency, seed=seed))
+    metrics.reset()
+    agent = AIAgent(structured=True, row_retries=args.row_retries, max_invalid_records=max_invalid)
+    agent.graph  # compile before timing
+    start = time.perf_counter()
+    agent.clean_data(df)
+    elapsed = time.perf_counter() - start
+    records = {dict(labels)["result"]: value for (metric, labels), value in metrics.snapshot().items() if metric == "llm_records_total"}
+    return {"calls": fake.calls, "pieces": fake.streamed_pieces, "invalid": records.get("invalid", 0),
+            "re-sent": records.get("retried", 0), "unchanged": records.get("unchanged", 0), "seconds": elapsed}
+
+
+#Averages over several fake-model seeds: one seed is too few answers for the variants to differ reliably
+def main():
+    parser = argparse.ArgumentParser(description="Measure structured-mode generation with early stopping and row-level retries")
+    parser.add_argument("--rows", type=int, default=400)
+    parser.add_argument("--bad-row-ratio", type=float, default=0.02, help="share of records the fake model gets wrong")
+    parser.add_argument("--degenerate-ratio", type=float, default=0.3,
+                        help="share of answers that turn bad from a random record on")
+    parser.add_argument("--stream-latency", type=float, default=0.0005, help="fake seconds per streamed piece")
+    parser.add_argument("--row-retries", type=int, default=1)
+    parser.add_argument("--max-invalid", type=int, nargs="+", default=[1, 2], help="early-stop thresholds to compare")
+    parser.add_argument("--seeds", type=int, default=5)
+    args = parser.parse_args()
+
+    df = make_dataset(args.rows, numeric_columns=3, categorical_columns=2, text_columns=1, null_ratio=0.0,
+                      duplicate_ratio=0.0, outlier_ratio=0.0)
+    variants = [(f"early stop ({count})", count) for count in args.max_invalid] + [("read to the end", args.rows)]
+
+    # pieces is the number of streamed pieces generated, the cost that early stopping saves on a real server
+    print(f"{'variant':<16} {'calls':>6} {'pieces':>8} {'invalid':>8} {'re-sent':>8} {'unchanged':>9} {'seconds':>8}")
+    for name, max_invalid in variants:
+        runs = [run(df, args, max_invalid, seed) for seed in range(args.seeds)]
+        mean = {key: statistics.mean(result[key] for result in runs) for key in runs[0]}
+        print(f"{name:<16} {mean['calls']:>6.1f} {mean['pieces']:>8.0f} {mean['invalid']:>8.1f} "
+              f"{mean['re-sent']:>8.1f} {mean['unchanged']:>9.1f} {mean['seconds']:>7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
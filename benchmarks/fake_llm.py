@@ -0,0 +1,106 @@
+import json
+import time
+import random
+import threading
+
+
+class FakeLLM:
+    """Deterministic stand-in for ollama.chat that sleeps for a fixed latency.
+
+    ``per_token_latency`` adds prompt-size dependent time (about four
+    characters per token), like prompt evaluation on a real server. It
+    answers with one cleaned record per dataset row so the agent sees a
+    well-formed response for every batch.
+
+    With a JSON schema as ``format`` (structured mode) the records follow
+    the schema, and ``bad_row_ratio`` of them leave out a column so they
+    fail validation; in ``degenerate_ratio`` of the answers every record from
+    a random point on is bad, like a model that has gone off the rails. ``stream=True`` returns the answer in four-character
+    pieces like a streaming chat, each costing ``stream_latency``.
+    """
+
+    def __init__(self, latency=0.1, per_token_latency=0.0, bad_row_ratio=0.0, degenerate_ratio=0.0, stream_latency=0.0,
+                 seed=0):
+        self.latency = latency
+        self.per_token_latency = per_token_latency
+        self.bad_row_ratio = bad_row_ratio
+        self.degenerate_ratio = degenerate_ratio
+        self.stream_latency = stream_latency
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.streamed_pieces = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, model=None, messages=None, stream=False, format=None, **kwargs):
+        response = self._respond(messages, format)
+        return self._stream(response) if stream else response
+
+    def _respond(self, messages, schema):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            prompt_text = messages[-1]["content"]
+            time.sleep(self.latency + self.per_token_latency * len(prompt_text) / 4)
+            if isinstance(schema, dict):
+                cleaned_data = self._schema_records(schema)
+            else:
+                cleaned_data = [{"row": i} for i in range(self._dataset_rows(prompt_text))]
+            content = json.dumps({"issues_found": [], "cleaning_strategy": [], "cleaned_data": cleaned_data})
+            # Rough token counts in the fields ollama reports them in
+            return {"message": {"role": "assistant", "content": content},
+                    "prompt_eval_count": len(prompt_text) // 4, "eval_count": len(content) // 4}
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _stream(self, response):
+        content = response["message"]["content"]
+        for start in range(0, len(content), 4):
+            time.sleep(self.stream_latency)
+            with self._lock:
+                self.streamed_pieces += 1
+            yield {"message": {"role": "assistant", "content": content[start:start + 4]}, "done": False}
+        yield {"message": {"role": "assistant", "content": ""}, "done": True,
+               "prompt_eval_count": response["prompt_eval_count"], "eval_count": response["eval_count"]}
+
+    #One all-null record per allowed _row_id; bad rows drop their first column
+    def _schema_records(self, schema):
+        record_schema = schema["properties"]["cleaned_data"]["items"]
+        columns = [column for column in record_schema["required"] if column != "_row_id"]
+        row_ids = record_schema["properties"]["_row_id"]["enum"]
+        with self._lock:
+            degenerate = self.random.random() < self.degenerate_ratio
+            degenerate_from = self.random.randrange(len(row_ids)) if degenerate and row_ids else len(row_ids)
+        records = []
+        for position, row_id in enumerate(row_ids):
+            record = {"_row_id": row_id, **{column: None for column in columns}}
+            with self._lock:
+                bad = columns and (position >= degenerate_from or self.random.random() < self.bad_row_ratio)
+            if bad:
+                del record[columns[0]]
+            records.append(record)
+        return records
+
+    @staticmethod
+    def _dataset_rows(prompt_text):
+        # Count rows between "Dataset:" and "Return format:" for every batch encoder
+        body = prompt_text.split("Dataset:", 1)[-1].split("Return format:", 1)[0].strip()
+        if body.startswith("Value codes"):
+            body = body.split("\n\n", 1)[-1]
+        lines = [line for line in body.splitlines() if line.strip()]
+        if lines and lines[0].startswith("rows: "):
+            return int(lines[0][len("rows: "):])
+        if lines and lines[0].startswith("{"):
+            return len(lines)
+        return max(len(lines) - 1, 0)
+
+
+def install(fake):
+    # Patch the module-level ollama.chat the agent calls
+    import ollama
+    ollama.chat = fake
+    return fake
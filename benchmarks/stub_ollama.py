@@ -0,0 +1,92 @@
+import json
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.fake_llm import FakeLLM
+
+
+class StubOllama:
+    """Local HTTP server speaking enough of the Ollama API (/api/chat, /api/ps) for the real client.
+
+    Answers come from a FakeLLM with the given ``latency``. ``parallel``
+    requests are served at a time and the rest queue, like a server with
+    OLLAMA_NUM_PARALLEL slots on one GPU, so throughput only grows by
+    adding servers. ``models`` limits the models the server has (others get
+    a 404 like an unpulled model; None serves any), and ``stop`` closes the
+    socket to simulate a dead host.
+    """
+
+    def __init__(self, latency=0.2, parallel=1, port=0, models=None):
+        self.fake = FakeLLM(latency=latency)
+        self.slots = threading.Semaphore(parallel)
+        self.models = models
+        self.chats = 0
+        self.loaded = set()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def host(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path != "/api/ps":
+                    return self._send(404, {"error": "not found"})
+                self._send(200, {"models": [{"model": name, "name": name} for name in sorted(stub.loaded)]})
+
+            def do_POST(self):
+                if self.path != "/api/chat":
+                    return self._send(404, {"error": "not found"})
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if stub.models is not None and body.get("model") not in stub.models:
+                    return self._send(404, {"error": f"model '{body.get('model')}' not found"})
+                stub.chats += 1
+                stub.loaded.add(body.get("model"))
+                created_at = datetime.now(timezone.utc).isoformat()
+                if not body.get("messages"):
+                    # Load-only request
+                    return self._send(200, {"model": body.get("model"), "created_at": created_at, "done": True,
+                                            "message": {"role": "assistant", "content": ""}})
+                with stub.slots:
+                    response = stub.fake(model=body.get("model"), messages=body["messages"], format=body.get("format"))
+                response = {**response, "model": body.get("model"), "created_at": created_at, "done": True}
+                if not body.get("stream", True):
+                    return self._send(200, response)
+                # Ollama streams newline-delimited JSON chunks
+                content = response["message"]["content"]
+                chunks = [{"model": body.get("model"), "created_at": created_at, "done": False,
+                           "message": {"role": "assistant", "content": content[start:start + 16]}}
+                          for start in range(0, len(content), 16)]
+                chunks.append({**response, "message": {"role": "assistant", "content": ""}})
+                self._send(200, "".join(json.dumps(chunk) + "\n" for chunk in chunks), "application/x-ndjson")
+
+            def _send(self, status, payload, content_type="application/json"):
+                data = (payload if isinstance(payload, str) else json.dumps(payload)).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
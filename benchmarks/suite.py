@@ -0,0 +1,222 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fake_llm import FakeLLM, install
+from benchmarks.synthetic import make_dataset
+from scripts.ai_agent import AIAgent
+from scripts.data_cleaning import DataCleaning
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+#Median wall time of repeats runs of func(); rows/s is rows divided by that time
+#With setup, every run gets a fresh setup() result (built outside the timed region) as its argument
+def time_case(func, rows, repeats, setup=None):
+    timings = []
+    for _ in range(repeats):
+        args = (setup(),) if setup else ()
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    seconds = statistics.median(timings)
+    return {"seconds": round(seconds, 6), "rows": rows, "rows_per_sec": round(rows / seconds, 1) if seconds else None}
+
+
+#Each case takes its own copy of the dataset: handle_missing_values and fix_data_types change their input in place
+def cleaning_cases():
+    cleaner = DataCleaning()
+    options = dict(missing_value_strategy="mean", outlier_column="num_0", irrelevant_columns=["text_0"], categorical_column="cat_0")
+    return {
+        "handle_missing_values[mean]": lambda df: cleaner.handle_missing_values(df, strategy="mean"),
+        "handle_missing_values[median]": lambda df: cleaner.handle_missing_values(df, strategy="median"),
+        "handle_missing_values[mode]": lambda df: cleaner.handle_missing_values(df, strategy="mode"),
+        "handle_missing_values[drop]": lambda df: cleaner.handle_missing_values(df, strategy="drop"),
+        "remove_duplicates": lambda df: cleaner.remove_duplicates(df),
+        "remove_outliers": lambda df: cleaner.remove_outliers(df, column="num_0"),
+        "drop_irrelevant_columns": lambda df: cleaner.drop_irrelevant_columns(df, columns=["text_0"]),
+        "encode_categorical_variables": lambda df: cleaner.encode_categorical_variables(df, column="cat_0"),
+        "fix_data_types": lambda df: cleaner.fix_data_types(df, "id", "int"),
+        "clean_data[chain]": lambda df: cleaner.clean_data(df, **options, fused=False),
+        "clean_data[fused]": lambda df: cleaner.clean_data(df, **options, fused=True),
+    }
+
+
+def ai_cases(df, batch_size, workers):
+    agent = AIAgent()
+    agent.graph  # built up front so the first case does not time the langgraph import and compile
+    return {
+        f"ai_clean_data[workers={count}]": partial(agent.clean_data, df, batch_size=batch_size, max_workers=count)
+        for count in workers
+    }
+
+
+#The three cleaning endpoints through a TestClient, fed from a temp CSV, a SQLite table and a local HTTP server
+def endpoint_cases(df, workdir):
+    os.environ.setdefault("JOBS_DB_PATH", os.path.join(workdir, "jobs.sqlite"))
+    os.environ.setdefault("LLM_CACHE_PATH", os.path.join(workdir, "llm_cache.sqlite"))
+    from fastapi.testclient import TestClient
+    import scripts.backend as backend
+
+    backend.ai_agent.cache = None  # every repeat must reach the (fake) model
+    client = TestClient(backend.app)
+
+    csv_bytes = df.to_csv(index=False).encode("utf-8")
+
+    db_path = os.path.join(workdir, "bench.sqlite")
+    df.to_sql("bench", f"sqlite:///{db_path}", index=False, if_exists="replace")
+
+    with open(os.path.join(workdir, "bench.json"), "w") as f:
+        f.write(df.to_json(orient="records"))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=workdir))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_url = f"http://127.0.0.1:{server.server_address[1]}/bench.json"
+
+    def post(path, **kwargs):
+        response = client.post(path, **kwargs)
+        response.raise_for_status()
+
+    cases = {
+        "endpoint /clean-data/": lambda: post("/clean-data/", files={"file": ("bench.csv", csv_bytes, "text/csv")}),
+        "endpoint /clean-db-data/": lambda: post("/clean-db-data/", json={"db_url": f"sqlite:///{db_path}", "query": "SELECT * FROM bench"}),
+        "endpoint /clean-api-data/": lambda: post("/clean-api-data/", json={"api_url": api_url}),
+    }
+    return client, server, cases
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_json(path, value):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(value, f, indent=2)
+
+
+#Cases whose throughput fell more than tolerance below the baseline
+def find_regressions(results, baseline, tolerance):
+    regressions = []
+    for case, result in results.items():
+        expected = baseline.get("results", {}).get(case, {}).get("rows_per_sec")
+        if expected and result["rows_per_sec"] < expected * (1 - tolerance):
+            regressions.append((case, expected, result["rows_per_sec"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time DataCleaning, the AI stage and the endpoints, and compare against a baseline")
+    parser.add_argument("--rows", type=int, default=50_000, help="rows for the DataCleaning cases")
+    parser.add_argument("--numeric-columns", type=int, default=4)
+    parser.add_argument("--categorical-columns", type=int, default=2)
+    parser.add_argument("--null-ratio", type=float, default=0.05)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.02)
+    parser.add_argument("--outlier-ratio", type=float, default=0.01)
+    parser.add_argument("--cardinality", type=int, default=10)
+    parser.add_argument("--ai-rows", type=int, default=400, help="rows for the AI and endpoint cases")
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds per fake LLM call")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--only", nargs="+", choices=["cleaning", "ai", "endpoints"], default=["cleaning", "ai", "endpoints"])
+    parser.add_argument("--history", default=os.path.join(RESULTS_DIR, "history.json"))
+    parser.add_argument("--baseline", default=os.path.join(RESULTS_DIR, "baseline.json"))
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed throughput drop before failing (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    config = {key: value for key, value in vars(args).items() if key not in ("history", "baseline", "update_baseline", "tolerance")}
+    dataset_options = dict(numeric_columns=args.numeric_columns, categorical_columns=args.categorical_columns,
+                           null_ratio=args.null_ratio, duplicate_ratio=args.duplicate_ratio,
+                           outlier_ratio=args.outlier_ratio, cardinality=args.cardinality)
+    install(FakeLLM(latency=args.latency))
+
+    results = {}
+    if "cleaning" in args.only:
+        df = make_dataset(args.rows, **dataset_options)
+        for case, func in cleaning_cases().items():
+            results[case] = time_case(func, len(df), args.repeats, setup=df.copy)
+            print(f"{case:<34} {results[case]['seconds']:9.4f}s {results[case]['rows_per_sec']:>14,.0f} rows/s")
+
+    ai_df = make_dataset(args.ai_rows, **dataset_options)
+    if "ai" in args.only:
+        for case, func in ai_cases(ai_df, args.batch_size, args.workers).items():
+            results[case] = time_case(func, len(ai_df), args.repeats)
+            print(f"{case:<34} {results[case]['seconds']:9.4f}s {results[case]['rows_per_sec']:>14,.0f} rows/s")
+
+    if "endpoints" in args.only:
+        with tempfile.TemporaryDirectory() as workdir:
+            client, server, cases = endpoint_cases(ai_df, workdir)
+            try:
+                with client:
+                    for case, func in cases.items():
+                        results[case] = time_case(func, len(ai_df), args.repeats)
+                        print(f"{case:<34} {results[case]['seconds']:9.4f}s {results[case]['rows_per_sec']:>14,.0f} rows/s")
+            finally:
+                server.shutdown()
+                server.server_close()
+
+    run = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": config,
+        "results": results,
+    }
+    history = load_json(args.history, [])
+    history.append(run)
+    write_json(args.history, history)
+
+    if args.update_baseline:
+        write_json(args.baseline, run)
+        print(f"Baseline stored in {args.baseline}")
+        return 0
+
+    baseline = load_json(args.baseline, None)
+    if baseline is None:
+        print("No baseline yet, run with --update-baseline to store one")
+        return 0
+    # Which cases run and how often does not change their throughput
+    comparable = lambda settings: {key: value for key, value in settings.items() if key not in ("only", "repeats")}
+    if comparable(baseline.get("config", {})) != comparable(config):
+        print("Baseline was recorded with different settings, skipping the regression check")
+        return 0
+    regressions = find_regressions(results, baseline, args.tolerance)
+    for case, expected, actual in regressions:
+        print(f"REGRESSION {case}: {actual:,.0f} rows/s vs baseline {expected:,.0f} rows/s")
+    if regressions:
+        return 1
+    print(f"No regressions against baseline {baseline.get('commit') or baseline.get('timestamp')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
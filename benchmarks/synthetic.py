@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+WORDS = np.array(["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta", "iota", "kappa"])
+
+
+def make_dataset(rows=10000, numeric_columns=4, categorical_columns=2, text_columns=1, null_ratio=0.05,
+                 duplicate_ratio=0.02, outlier_ratio=0.01, cardinality=10, seed=0):
+    """Synthetic frame with controlled nulls, exact duplicates, outliers and category counts.
+
+    ``id`` is a null-free integer column; numeric columns are ``num_<i>``
+    (outliers are injected into every one of them), categorical columns
+    ``cat_<i>`` draw from ``cardinality`` labels and text columns ``text_<i>``
+    hold short free-text strings. ``duplicate_ratio`` of the rows are copies
+    of other rows appended at the end, so the frame has ``rows`` rows in total.
+    """
+    rng = np.random.default_rng(seed)
+    unique_rows = max(rows - int(rows * duplicate_ratio), 1)
+    data = {"id": np.arange(unique_rows)}
+
+    for i in range(numeric_columns):
+        values = rng.normal(100, 20, unique_rows)
+        outliers = rng.random(unique_rows) < outlier_ratio
+        values[outliers] = rng.choice([-1, 1], outliers.sum()) * rng.uniform(1000, 5000, outliers.sum())
+        data[f"num_{i}"] = values
+
+    labels = np.array([f"label_{i}" for i in range(cardinality)], dtype=object)
+    for i in range(categorical_columns):
+        data[f"cat_{i}"] = rng.choice(labels, unique_rows)
+
+    for i in range(text_columns):
+        data[f"text_{i}"] = [" ".join(words) for words in rng.choice(WORDS, (unique_rows, 3))]
+
+    df = pd.DataFrame(data)
+    for column in df.columns[1:]:
+        df.loc[rng.random(unique_rows) < null_ratio, column] = np.nan
+
+    duplicates = df.iloc[rng.integers(0, unique_rows, rows - unique_rows)]
+    return pd.concat([df, duplicates], ignore_index=True)
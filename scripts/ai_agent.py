@@ -1,46 +1,150 @@
-from click import prompt
+import os
 import pandas as pd
-from langgraph.graph import StateGraph, START, END
-from pydantic import BaseModel
-import ollama
+import numpy as np
+from typing import TypedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import json
 import ast
+import time
+import hashlib
+import threading
+import contextvars
 
+from scripts.batch_encoders import get_encoder
+from scripts.metrics import metrics, stage, record_llm_usage
+from scripts.structured_output import ROW_ID, BatchSchema, StreamingResultParser
 
-class CleaningState(BaseModel):
+
+MODEL_NAME = os.getenv("OLLAMA_MODEL", "llama3:latest")   # or whichever model you downloaded in Ollama
+
+PROMPT_TEMPLATE = """
+You are an AI Data Cleaning Agent.
+
+Analyze the dataset below and return ONLY valid JSON.
+Do not add explanations, notes, or markdown.
+Return strictly JSON.
+{context_text}
+Dataset:
+{batch_text}
+
+Return format:
+{{
+    "issues_found": [],
+    "cleaning_strategy": [],
+    "cleaned_data": [
+        {{"column1": "value1", "column2": "value2"}}
+    ]
+}}
+"""
+
+# Clean example rows shown ahead of the dataset when only anomalous rows are sent
+CONTEXT_TEMPLATE = """
+Reference rows (already clean, for context only, do not return them):
+{context_batch}
+
+Keep the _row_id value of every dataset row unchanged in cleaned_data.
+"""
+
+# Structured mode: every dataset row carries a _row_id and the answer must follow the batch's JSON schema
+STRUCTURED_TEMPLATE = """
+Every dataset row has a _row_id. Return exactly one cleaned_data record per dataset row,
+with all of its columns and its _row_id unchanged.
+"""
+
+# Any edit to the prompt changes its version and with it every cache key
+PROMPT_VERSION = hashlib.sha256((PROMPT_TEMPLATE + CONTEXT_TEMPLATE).encode("utf-8")).hexdigest()[:12]
+STRUCTURED_VERSION = hashlib.sha256((PROMPT_TEMPLATE + CONTEXT_TEMPLATE + STRUCTURED_TEMPLATE).encode("utf-8")).hexdigest()[:12]
+
+
+class CleaningState(TypedDict, total=False):
     input_text: str
-    structured_response: str = ""
+    structured_response: str
+    # Structured mode only: JSON schema for Ollama's format and the parser fed with the streamed answer
+    response_format: dict
+    parser: StreamingResultParser
 
 
 class AIAgent:
-    def __init__(self):
-        self.graph = self.create_graph()
+    def __init__(self, max_workers=1, timeout=None, retries=0, retry_backoff=0.5, model=MODEL_NAME, cache=None,
+                 planner=None, split_depth=2, encoder="csv", structured=False, row_retries=1, max_invalid_records=2,
+                 client=None):
+        self.model = model
+        # Optional OllamaPool (anything with ollama.chat's signature); None calls the ollama module's default client
+        self.client = client
+        # How batches are rendered into the prompt: a BatchEncoder or the name of one
+        self.encoder = get_encoder(encoder) if isinstance(encoder, str) else encoder
+        # Optional LLMCache; batches already seen skip the model entirely
+        self.cache = cache
+        # Optional BatchPlanner; batches are sized by token budget instead of row count
+        self.planner = planner
+        # How many times a failed batch is halved before its rows are given up
+        self.split_depth = split_depth
+        # Structured mode streams schema-constrained output, validates records as they arrive, stops a
+        # malformed answer early and re-sends only the missing rows (row_retries times) instead of halving
+        self.structured = structured
+        self.row_retries = row_retries
+        self.max_invalid_records = max_invalid_records
+        # langgraph and ollama are imported and the graph compiled on first use (see the graph property)
+        self._graph = None
+        self._graph_lock = threading.Lock()
+        # Concurrency settings for clean_data (max batches in flight, seconds per batch, extra attempts)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            with self._graph_lock:
+                if self._graph is None:
+                    self._graph = self.create_graph()
+        return self._graph
+
+    #Load the model into the Ollama server ahead of the first batch; keep_alive keeps it resident afterwards
+    def warm_up(self, keep_alive="30m"):
+        if hasattr(self.client, "warm_up"):
+            return self.client.warm_up(self.model, keep_alive)
+        import ollama
+        # A chat without messages only loads the model
+        ollama.chat(model=self.model, messages=[], keep_alive=keep_alive)
 
     def create_graph(self):
+        import ollama
+        from langgraph.graph import StateGraph, END
+
         graph = StateGraph(CleaningState)
 
         def agent_logic(state: CleaningState) -> CleaningState:
+            chat = self.client.chat if self.client is not None else ollama.chat
+            if state.get("parser") is not None:
+                structured_response = self._stream_structured(chat, state["input_text"], state["response_format"], state["parser"])
+                return {"input_text": state["input_text"], "structured_response": structured_response}
+
             # Call the clean_data function and update the state
-            response = ollama.chat(
-                model="llama3:latest",   # or whichever model you downloaded in Ollama
-                messages=[{"role": "user", "content": state.input_text}]
+            response = chat(
+                model=self.model,
+                messages=[{"role": "user", "content": state["input_text"]}]
             )
+            record_llm_usage(response)
 
             # Robust way to extract text from Ollama response
             if isinstance(response, list):
                 # Ollama returns list of messages in older versions
-                state.structured_response = response[0]['content']
+                structured_response = response[0]['content']
+            elif hasattr(response, "message"):
+                # Ollama returns ChatResponse with a single message
+                structured_response = response.message.content
+            elif isinstance(response, dict) and "message" in response:
+                structured_response = response["message"]["content"]
             elif hasattr(response, "messages"):
                 # Ollama returns ChatResponse object in newer versions
-                state.structured_response = response.messages[0].content
+                structured_response = response.messages[0].content
             else:
                 # fallback
-                state.structured_response = str(response)
+                structured_response = str(response)
 
-            return CleaningState(
-                input_text=state.input_text,
-                structured_response=state.structured_response
-            )
+            return {"input_text": state["input_text"], "structured_response": structured_response}
 
         # Define the cleaning node
         graph.add_node("clean_data", agent_logic)
@@ -53,60 +157,314 @@ class AIAgent:
 
         return graph.compile()
 
-    def _clean_batch(self, batch_df):
+    #Stream the answer into the parser and stop as soon as it turns malformed;
+    #closing the stream drops the connection, which ends generation on the server
+    def _stream_structured(self, chat, prompt_text, response_format, parser):
+        chunks = chat(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt_text}],
+            format=response_format,
+            stream=True,
+        )
+        pieces = 0
+        final = None
+        try:
+            for chunk in chunks:
+                pieces += 1
+                parser.feed(chunk["message"]["content"] or "")
+                if chunk.get("done"):
+                    final = chunk
+                if parser.error is not None:
+                    metrics.inc("llm_early_stops_total")
+                    break
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+        # A stopped stream never sends its usage counts; each streamed piece is about one token
+        record_llm_usage(final if final is not None else {"eval_count": pieces})
+        return parser.text
+
+    #(cache key, cached result or None); the key is None without a cache
+    def _cached(self, batch_df, context_df, prompt_version):
+        if self.cache is None:
+            return None, None
+        cache_key = self.cache.make_key(self.model, f"{prompt_version}:{self.encoder.signature}", batch_df, context_df)
+        cached = self.cache.get(cache_key)
+        metrics.inc("llm_cache_requests_total", result="miss" if cached is None else "hit")
+        return cache_key, cached
+
+    def _build_prompt(self, batch_df, context_df=None, instructions=""):
+        with stage("prompt_build", rows=len(batch_df)) as counts:
+            prompt_text = self._render_prompt(batch_df, context_df, instructions)
+            counts["bytes"] = len(prompt_text.encode("utf-8"))
+        return prompt_text
+
+    def _render_prompt(self, batch_df, context_df=None, instructions=""):
         # Convert batch to string (important)
-        batch_text = batch_df.to_string()
+        batch_text = self.encoder.encode(batch_df)
 
-        prompt_text = f"""
-You are an AI Data Cleaning Agent.
+        context_text = ""
+        if context_df is not None and len(context_df):
+            context_text = CONTEXT_TEMPLATE.format(context_batch=self.encoder.encode(context_df))
 
-Analyze the dataset below and return ONLY valid JSON.
-Do not add explanations, notes, or markdown.
-Return strictly JSON.
+        return PROMPT_TEMPLATE.format(batch_text=batch_text, context_text=context_text + instructions)
 
-Dataset:
-{batch_text}
+    def _clean_batch(self, batch_df, context_df=None):
+        if self.structured:
+            return self._clean_batch_structured(batch_df, context_df)
 
-Return format:
-{{
-    "issues_found": [],
-    "cleaning_strategy": [],
-    "cleaned_data": [
-        {{"column1": "value1", "column2": "value2"}}
-    ]
-}}
-"""
+        cache_key, cached = self._cached(batch_df, context_df, PROMPT_VERSION)
+        if cached is not None:
+            return cached
+
+        prompt_text = self._build_prompt(batch_df, context_df)
 
         state = CleaningState(input_text=prompt_text, structured_response="")
-        response = self.graph.invoke(state)
+        with stage("llm_call", rows=len(batch_df)):
+            response = self.graph.invoke(state)
 
         # Extract actual AI text from response
         ai_text = ""
-        if isinstance(response, CleaningState):
-            ai_text = response.structured_response
-        elif isinstance(response, dict):
+        if isinstance(response, dict):
             ai_text = response.get("structured_response", "")
         else:
             ai_text = str(response)
 
         # Parse JSON safely
-        try:
-            ai_json = json.loads(ai_text)
-        except json.JSONDecodeError:
+        with stage("response_parse", nbytes=len(ai_text.encode("utf-8"))):
             try:
-                ai_json = ast.literal_eval(ai_text)
-            except Exception:
-                # Fallback empty structure if parsing fails
-                ai_json = {"issues_found": [], "cleaning_strategy": [], "cleaned_data": []}
+                ai_json = json.loads(ai_text)
+            except json.JSONDecodeError:
+                try:
+                    ai_json = ast.literal_eval(ai_text)
+                except Exception:
+                    # Fallback empty structure if parsing fails
+                    ai_json = {"issues_found": [], "cleaning_strategy": [], "cleaned_data": []}
+
+        # Only cache complete answers so a bad or short generation is retried next run
+        if cache_key and self._complete(ai_json, batch_df):
+            self.cache.set(cache_key, ai_json)
 
         return ai_json
 
-    def clean_data(self, df, batch_size=20):
-        cleaned_results = []
+    #Keep every valid record of each answer and re-send only the rows that came back missing or invalid;
+    #rows still missing after row_retries are returned unchanged and reported in issues_found
+    def _clean_batch_structured(self, batch_df, context_df=None):
+        cache_key, cached = self._cached(batch_df, context_df, STRUCTURED_VERSION)
+        if cached is not None:
+            return cached
+
+        # Rows already numbered by the caller (clean_anomalies) keep their ids, others are numbered here
+        own_ids = ROW_ID not in batch_df.columns
+        if own_ids:
+            batch_df = batch_df.assign(**{ROW_ID: np.arange(len(batch_df))})
+
+        records = {}
+        combined = {"issues_found": [], "cleaning_strategy": []}
+        pending = batch_df
+        for attempt in range(self.row_retries + 1):
+            if attempt:
+                metrics.inc("llm_records_total", len(pending), result="retried")
+            parser = StreamingResultParser(BatchSchema(pending), max_invalid=self.max_invalid_records)
+            state = CleaningState(input_text=self._build_prompt(pending, context_df, STRUCTURED_TEMPLATE),
+                                  structured_response="", response_format=parser.schema.json_schema(), parser=parser)
+            with stage("llm_call", rows=len(pending)):
+                self.graph.invoke(state)
+
+            metrics.inc("llm_records_total", len(parser.records), result="valid")
+            metrics.inc("llm_records_total", len(parser.invalid), result="invalid")
+            records.update((record[ROW_ID], record) for record in parser.records)
+            for key in combined:
+                combined[key].extend(parser.fields[key])
+            pending = pending[~pending[ROW_ID].isin(list(records))]
+            if pending.empty:
+                break
+
+        complete = pending.empty
+        if not complete:
+            metrics.inc("llm_records_total", len(pending), result="unchanged")
+            combined["issues_found"].append(f"{len(pending)} rows could not be cleaned by the model and are returned unchanged")
+            unchanged = pending.astype(object).where(pd.notna(pending), None).to_dict(orient="records")
+            records.update((record[ROW_ID], record) for record in unchanged)
+
+        cleaned_data = [records[row_id] for row_id in batch_df[ROW_ID]]
+        if own_ids:
+            cleaned_data = [{key: value for key, value in record.items() if key != ROW_ID} for record in cleaned_data]
+        result = {**combined, "cleaned_data": cleaned_data}
+
+        # Only complete answers are cached so the unchanged rows are tried again next run
+        if cache_key and complete:
+            self.cache.set(cache_key, result)
+        return result
+
+    def _clean_batch_adaptive(self, batch_df, depth=0, context_df=None):
+        # Unparseable, truncated or short output (fewer records than rows): retry the rows in two halves
+        result = self._clean_batch(batch_df, context_df)
+        if self._complete(result, batch_df):
+            return result
+        if len(batch_df) < 2 or depth >= self.split_depth:
+            # Out of splits: the rows go back unchanged instead of being dropped
+            received = result.get("cleaned_data")
+            received = len(received) if isinstance(received, list) else 0
+            metrics.inc("llm_records_total", len(batch_df), result="unchanged")
+            issue = (f"Model returned {received} records for {len(batch_df)} rows; "
+                     f"the rows are returned unchanged")
+            return {
+                "issues_found": list(result.get("issues_found", [])) + [issue],
+                "cleaning_strategy": list(result.get("cleaning_strategy", [])),
+                "cleaned_data": batch_df.astype(object).where(pd.notna(batch_df), None).to_dict(orient="records"),
+            }
+        middle = len(batch_df) // 2
+        return self.combine_results([
+            self._clean_batch_adaptive(batch_df.iloc[:middle], depth + 1, context_df),
+            self._clean_batch_adaptive(batch_df.iloc[middle:], depth + 1, context_df),
+        ])
+
+    #An answer is complete when it has exactly one cleaned_data record per batch row
+    @staticmethod
+    def _complete(result, batch_df):
+        cleaned_data = result.get("cleaned_data")
+        return isinstance(cleaned_data, list) and len(cleaned_data) == len(batch_df)
+
+    @staticmethod
+    def combine_results(results):
+        # Merge batch results into a single result of the same shape
+        combined = {"issues_found": [], "cleaning_strategy": [], "cleaned_data": []}
+        for result in results:
+            for key in combined:
+                combined[key].extend(result.get(key, []))
+        return combined
+
+    def plan_batches(self, df, batch_size=20, context_df=None):
+        if self.planner is not None:
+            # Overhead of the prompt as it is sent: template, context rows and structured-mode instructions
+            prompt_tokens = self._prompt_tokens(self._planned(df.iloc[:0]), context_df)
+            return [part for batch in self.planner.split(df, prompt_tokens=prompt_tokens)
+                    for part in self._fit_budget(batch, context_df)]
+        return [df.iloc[i:i + batch_size] for i in range(0, len(df), batch_size)]  # use iloc for DataFrame
+
+    #Halve a planned batch until its rendered prompt (dictionary legend included) and the echoed rows fit the budget
+    def _fit_budget(self, batch_df, context_df=None):
+        echo = int(self.planner.estimate_row_tokens(batch_df).sum()) + self.planner.header_tokens(batch_df)
+        if len(batch_df) < 2 or self._prompt_tokens(self._planned(batch_df), context_df) + echo <= self.planner.token_budget:
+            return [batch_df]
+        middle = len(batch_df) // 2
+        return self._fit_budget(batch_df.iloc[:middle], context_df) + self._fit_budget(batch_df.iloc[middle:], context_df)
+
+    def _prompt_tokens(self, batch_df, context_df=None):
+        prompt_text = self._render_prompt(batch_df, context_df, STRUCTURED_TEMPLATE if self.structured else "")
+        return len(prompt_text) // self.planner.chars_per_token
+
+    #The batch as the prompt will show it: structured mode numbers its rows
+    def _planned(self, batch_df):
+        if self.structured and ROW_ID not in batch_df.columns:
+            return batch_df.assign(**{ROW_ID: np.arange(len(batch_df))})
+        return batch_df
+
+    def clean_data(self, df, batch_size=20, max_workers=None, timeout=None, retries=None):
+        # Batches run concurrently but results keep the original batch order
+        return list(self.iter_clean_data(df, batch_size, max_workers, timeout, retries))  # return list of dicts for easier handling in Streamlit
+
+    def iter_clean_data(self, df, batch_size=20, max_workers=None, timeout=None, retries=None, context_df=None):
+        batches = self.plan_batches(df, batch_size, context_df)
+        yield from self._dispatch(
+            batches,
+            max_workers=max_workers or self.max_workers,
+            timeout=timeout if timeout is not None else self.timeout,
+            retries=retries if retries is not None else self.retries,
+            context_df=context_df,
+        )
+
+    def clean_anomalies(self, df, screen, exemplars=3, batch_size=20, **kwargs):
+        # Send only rows flagged by the screen (plus a few clean rows as context) and pass the rest through
+        mask = screen.screen(df).to_numpy()
+        flagged = df[mask].assign(_row_id=np.flatnonzero(mask))
+        context_df = df[~mask].head(exemplars)
+        result = self.combine_results(self.iter_clean_data(flagged, batch_size, context_df=context_df, **kwargs))
+
+        # Merge cleaned rows back by position; rows the model skipped keep their original values
+        records = df.to_dict(orient="records")
+        for record in result["cleaned_data"]:
+            record = dict(record)
+            try:
+                row_id = int(record.pop("_row_id"))
+            except (KeyError, TypeError, ValueError):
+                continue
+            if 0 <= row_id < len(records) and mask[row_id]:
+                records[row_id] = {**records[row_id], **record}
+        return pd.DataFrame(records, index=df.index), result
+
+    def _dispatch(self, batches, max_workers=1, timeout=None, retries=0, context_df=None):
+        # Keep at most max_workers batches in flight and yield results in batch order
+        total = len(batches)
+        done = {}
+        attempts = [0] * total
+        started = {}
+        pending = {}
+        next_submit = 0
+        next_yield = 0
+        executors = [ThreadPoolExecutor(max_workers=max_workers)]
+
+        def run(index, attempt):
+            if attempt:
+                time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+            started[(index, attempt)] = time.monotonic()
+            return self._clean_batch_adaptive(batches[index], context_df=context_df)
+
+        def submit(index):
+            # Run in a copy of the caller's context so stage timings reach its request
+            future = executors[-1].submit(contextvars.copy_context().run, run, index, attempts[index])
+            pending[future] = (index, attempts[index])
+
+        def fail(index, error):
+            attempts[index] += 1
+            if attempts[index] <= retries:
+                submit(index)
+            else:
+                done[index] = self._failed_batch(index, error)
+
+        try:
+            while next_yield < total:
+                while next_submit < total and len(pending) < max_workers:
+                    submit(next_submit)
+                    next_submit += 1
+
+                wait_for = None
+                if timeout:
+                    deadlines = [started[key] + timeout for key in pending.values() if key in started]
+                    wait_for = max(0, min(deadlines) - time.monotonic()) if deadlines else timeout
+
+                finished, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    index, attempt = pending.pop(future)
+                    started.pop((index, attempt), None)
+                    try:
+                        done[index] = future.result()
+                    except Exception as e:
+                        fail(index, e)
+
+                # A timed out call keeps its thread until ollama returns and its result is ignored. Later
+                # batches go to a fresh executor so they never queue behind it; pending still caps the
+                # batches in flight at max_workers, and the old executor's threads exit as their calls end
+                if timeout:
+                    now = time.monotonic()
+                    expired = [(future, key) for future, key in pending.items()
+                               if key in started and now - started[key] >= timeout]
+                    if expired:
+                        executors[-1].shutdown(wait=False)
+                        executors.append(ThreadPoolExecutor(max_workers=max_workers))
+                    for future, key in expired:
+                        del pending[future]
+                        started.pop(key)
+                        fail(key[0], TimeoutError(f"no response after {timeout}s"))
 
-        for i in range(0, len(df), batch_size):
-            batch = df.iloc[i:i + batch_size]  # use iloc for DataFrame
-            cleaned_batch = self._clean_batch(batch)
-            cleaned_results.append(cleaned_batch)
+                while next_yield in done:
+                    yield done.pop(next_yield)
+                    next_yield += 1
+        finally:
+            for executor in executors:
+                executor.shutdown(wait=False, cancel_futures=True)
 
-        return cleaned_results  # return list of dicts for easier handling in Streamlit
\ No newline at end of file
+    def _failed_batch(self, index, error):
+        # Same empty structure as a parse failure, with the reason recorded as an issue
+        return {"issues_found": [f"Batch {index + 1} failed: {error}"], "cleaning_strategy": [], "cleaned_data": []}
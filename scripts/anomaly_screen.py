@@ -0,0 +1,81 @@
+import warnings
+
+import pandas as pd
+
+from scripts.data_cleaning import DataCleaning
+
+
+class AnomalyScreen:
+    """Vectorized rule checks that flag rows worth sending to the LLM.
+
+    A row is suspicious when it has missing values, a numeric value outside
+    the IQR bounds used by ``DataCleaning.remove_outliers``, a cell that
+    fails to parse in a column that is mostly numeric or mostly dates, or a
+    category value rarer than ``rare_share`` of the rows.
+    """
+
+    def __init__(self, rare_share=0.01, max_categories=50, coercion_share=0.8):
+        self.rare_share = rare_share
+        self.max_categories = max_categories
+        self.coercion_share = coercion_share
+        self.data_cleaning = DataCleaning()
+
+    #Rows with at least one missing value
+    def null_mask(self, df):
+        return df.isna().any(axis=1)
+
+    #Rows outside the IQR bounds of any numeric column
+    def outlier_mask(self, df):
+        mask = pd.Series(False, index=df.index)
+        for column in df.select_dtypes(include=["number"]).columns:
+            lower_bound, upper_bound = self.data_cleaning.outlier_bounds(df, column)
+            mask |= (df[column] < lower_bound) | (df[column] > upper_bound)
+        return mask
+
+    #Rows whose value fails to parse in a column that is mostly numbers or dates
+    def coercion_mask(self, df):
+        mask = pd.Series(False, index=df.index)
+        for column in df.select_dtypes(include=["object", "string"]).columns:
+            present = df[column].notna()
+            if not present.any():
+                continue
+            for parsed in (self._to_numeric(df[column]), self._to_datetime(df[column])):
+                ok = parsed.notna()
+                if ok[present].mean() >= self.coercion_share:
+                    mask |= present & ~ok
+                    break
+        return mask
+
+    #Rows holding a rare value of a low-cardinality text column
+    def rare_category_mask(self, df):
+        mask = pd.Series(False, index=df.index)
+        for column in df.select_dtypes(include=["object", "string", "category"]).columns:
+            counts = df[column].value_counts()
+            if len(counts) > self.max_categories:
+                continue
+            rare = counts[counts < self.rare_share * len(df)].index
+            if len(rare):
+                mask |= df[column].isin(rare)
+        return mask
+
+    #One boolean column per check
+    def reasons(self, df):
+        return pd.DataFrame({
+            "missing": self.null_mask(df),
+            "outlier": self.outlier_mask(df),
+            "coercion": self.coercion_mask(df),
+            "rare_category": self.rare_category_mask(df),
+        }, index=df.index)
+
+    def screen(self, df):
+        return self.reasons(df).any(axis=1)
+
+    @staticmethod
+    def _to_numeric(values):
+        return pd.to_numeric(values, errors="coerce")
+
+    @staticmethod
+    def _to_datetime(values):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return pd.to_datetime(values, errors="coerce")
@@ -0,0 +1,59 @@
+import io
+import json
+
+import pandas as pd
+
+MEDIA_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+
+
+#Arrow table from a DataFrame; mixed-type object columns (common in LLM output) become strings
+def to_arrow_table(df, metadata=None):
+    import pyarrow as pa  # deferred: only needed once a Parquet/Arrow file is written or read
+    arrays = []
+    for column in df.columns:
+        values = df[column]
+        if isinstance(values.dtype, pd.SparseDtype):
+            values = values.sparse.to_dense()  # Arrow has no sparse columns
+        try:
+            arrays.append(pa.array(values, from_pandas=True))
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+            arrays.append(pa.array(values.where(values.isna(), values.astype(str)), from_pandas=True))
+    table = pa.Table.from_arrays(arrays, names=[str(c) for c in df.columns])
+    if metadata:
+        table = table.replace_schema_metadata({k: json.dumps(v, default=str) for k, v in metadata.items()})
+    return table
+
+
+#Serialize a DataFrame as Parquet or Arrow IPC (Feather v2) bytes
+def dataframe_to_bytes(df, fmt="parquet", metadata=None, compression=None):
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+    table = to_arrow_table(df, metadata)
+    buffer = io.BytesIO()
+    if fmt == "parquet":
+        pq.write_table(table, buffer, compression=compression or "snappy")
+    elif fmt == "arrow":
+        feather.write_feather(table, buffer, compression=compression or "uncompressed")
+    else:
+        raise ValueError(f"Unsupported format '{fmt}'. Choose 'parquet' or 'arrow'.")
+    return buffer.getvalue()
+
+
+def write_dataframe(df, path, fmt=None, metadata=None):
+    fmt = fmt or ("arrow" if path.endswith((".feather", ".arrow")) else "parquet")
+    with open(path, "wb") as target:
+        target.write(dataframe_to_bytes(df, fmt, metadata))
+
+
+#Read back a DataFrame and the metadata written by dataframe_to_bytes
+def bytes_to_dataframe(data, fmt="parquet"):
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+    source = pa.BufferReader(data)
+    table = pq.read_table(source) if fmt == "parquet" else feather.read_table(source)
+    metadata = {k.decode(): json.loads(v) for k, v in (table.schema.metadata or {}).items() if not k.startswith(b"pandas")}
+    return table.to_pandas(), metadata
@@ -0,0 +1,257 @@
+import re
+import json
+import codecs
+import asyncio
+from urllib.parse import urljoin
+
+import aiohttp
+import pandas as pd
+
+from scripts.data_ingestions import DataIngestion
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class APIFetchError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class JSONArrayStream:
+    """Incremental decoder for a top-level JSON array fed as text chunks."""
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._started = False
+        self._closed = False
+
+    #Items completed by this chunk; pass final=True with the last chunk, which raises ValueError
+    #when the array was malformed, never closed or followed by anything but whitespace
+    def feed(self, text, final=False):
+        self._buffer += text
+        items = []
+        position = 0
+        while not self._closed:
+            position = self._skip(position)
+            if position >= len(self._buffer):
+                break
+            if not self._started:
+                if self._buffer[position] != "[":
+                    raise ValueError("Expected a JSON array")
+                self._started = True
+                position += 1
+                continue
+            if self._buffer[position] == "]":
+                position += 1
+                self._closed = True
+                break
+            try:
+                item, end = self._decoder.raw_decode(self._buffer, position)
+            except json.JSONDecodeError:
+                break
+            # A number at the very end of the buffer may still continue in the next chunk
+            if end >= len(self._buffer) and not final:
+                break
+            items.append(item)
+            position = end
+        self._buffer = self._buffer[position:]
+        if final and (not self._closed or self._buffer.strip()):
+            raise ValueError("Truncated or malformed JSON array")
+        return items
+
+    def _skip(self, position):
+        while position < len(self._buffer) and self._buffer[position] in " \t\r\n,":
+            position += 1
+        return position
+
+
+class AsyncIngestion:
+    """Fetch API data and load other sources concurrently over one pooled HTTP session.
+
+    The aiohttp session keeps connections alive and caps them per host,
+    failed requests (connection errors, 429 and 5xx) are retried with
+    exponential backoff (a server's ``Retry-After`` is honoured up to
+    ``max_retry_after`` seconds), and paginated APIs are followed automatically with
+    ``pagination`` set to one of:
+
+    - ``{"type": "offset", "limit": 100, "limit_param": "limit", "offset_param": "offset"}``
+    - ``{"type": "page", "page_param": "page", "start": 1}``
+    - ``{"type": "cursor", "cursor_param": "cursor", "cursor_field": "next_cursor", "data_field": "data"}``
+    - ``{"type": "link"}`` (follows ``Link: <...>; rel="next"`` headers, relative URLs included)
+    """
+
+    def __init__(self, limit=100, limit_per_host=10, timeout=60, retries=3, backoff=0.5, keepalive_timeout=30, max_pages=1000,
+                 max_retry_after=60):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.keepalive_timeout = keepalive_timeout
+        self.max_pages = max_pages
+        self.max_retry_after = max_retry_after
+        self.session = None
+        self.data_ingestion = DataIngestion()
+
+    async def open(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host, keepalive_timeout=self.keepalive_timeout)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    #GET with retries; the caller must release the returned response
+    async def _get(self, url, params=None):
+        await self.open()
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self.session.get(url, params=params)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.retries:
+                    raise APIFetchError(502, f"API request to {url} failed: {e}")
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+                continue
+            if response.status == 200:
+                return response
+            response.release()
+            if response.status not in RETRY_STATUSES or attempt == self.retries:
+                raise APIFetchError(response.status, f"API request failed with status code {response.status}")
+            retry_after = response.headers.get("Retry-After", "")
+            delay = float(retry_after) if retry_after.isdigit() else self.backoff * 2 ** attempt
+            await asyncio.sleep(min(delay, self.max_retry_after))
+
+    async def _json(self, response):
+        try:
+            return await response.json(content_type=None)
+        except (json.JSONDecodeError, aiohttp.ContentTypeError, UnicodeDecodeError):
+            raise APIFetchError(400, "API did not return valid JSON.")
+        finally:
+            response.release()
+
+    #Decode a large top-level JSON array item by item while it downloads
+    async def iter_json_array(self, url, params=None, chunk_size=64 * 1024):
+        response = await self._get(url, params)
+        parser = JSONArrayStream()
+        # A multi-byte character can be split across chunks, so bytes are decoded incrementally
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        try:
+            async for chunk in response.content.iter_chunked(chunk_size):
+                for item in parser.feed(decoder.decode(chunk)):
+                    yield item
+            for item in parser.feed(decoder.decode(b"", final=True), final=True):
+                yield item
+        except (ValueError, UnicodeDecodeError):
+            raise APIFetchError(400, "API did not return a valid JSON array.")
+        finally:
+            response.release()
+
+    #Yield one list of records per page
+    async def iter_pages(self, url, params=None, pagination=None):
+        params = dict(params or {})
+        if not pagination:
+            yield self._records(await self._json(await self._get(url, params)), None)
+            return
+
+        kind = pagination.get("type", "offset")
+        data_field = pagination.get("data_field")
+        page = pagination.get("start", 1)
+        offset = pagination.get("start", 0)
+        limit = pagination.get("limit", 100)
+        next_url = url
+        for _ in range(self.max_pages):
+            if kind == "offset":
+                params.update({pagination.get("limit_param", "limit"): limit, pagination.get("offset_param", "offset"): offset})
+            elif kind == "page":
+                params[pagination.get("page_param", "page")] = page
+
+            response = await self._get(next_url, params)
+            current_url = str(response.url)
+            link_header = response.headers.get("Link", "")
+            payload = await self._json(response)
+            records = self._records(payload, data_field)
+            if records:
+                yield records
+
+            if kind == "offset":
+                if len(records) < limit:
+                    return
+                offset += limit
+            elif kind == "page":
+                if not records:
+                    return
+                page += 1
+            elif kind == "cursor":
+                cursor = payload.get(pagination.get("cursor_field", "next_cursor")) if isinstance(payload, dict) else None
+                if not cursor:
+                    return
+                params[pagination.get("cursor_param", "cursor")] = cursor
+            elif kind == "link":
+                match = re.search(r'<([^>]+)>\s*;\s*rel="?next"?', link_header)
+                if not match:
+                    return
+                next_url, params = urljoin(current_url, match.group(1)), {}
+            else:
+                raise ValueError(f"Unknown pagination type '{kind}'")
+
+    @staticmethod
+    def _records(payload, data_field):
+        if data_field and isinstance(payload, dict):
+            payload = payload.get(data_field, [])
+        if isinstance(payload, dict):
+            return [payload]
+        return payload or []
+
+    async def fetch_api_data(self, url, params=None, pagination=None, stream=False):
+        if stream:
+            records = [item async for item in self.iter_json_array(url, params)]
+        else:
+            records = []
+            async for page in self.iter_pages(url, params, pagination):
+                records.extend(page)
+        return pd.DataFrame(records)
+
+    #Load one configured source; file and database reads run in worker threads
+    async def load_source(self, source):
+        kind = source["type"]
+        if kind == "api":
+            return await self.fetch_api_data(source["url"], source.get("params"), source.get("pagination"), source.get("stream", False))
+        if kind == "csv":
+            return await asyncio.to_thread(self.data_ingestion.ingest_csv, source["path"])
+        if kind == "excel":
+            return await asyncio.to_thread(self.data_ingestion.load_excel, source["path"], source.get("sheet_name", 0))
+        if kind == "parquet":
+            return await asyncio.to_thread(self.data_ingestion.load_parquet, source["path"])
+        if kind == "db":
+            ingestion = DataIngestion(source["db_url"])
+            return await asyncio.to_thread(ingestion.load_from_db, source["query"])
+        raise ValueError(f"Unknown source type '{kind}'")
+
+    #Load several named sources at once; a failed source maps to None
+    async def ingest(self, sources):
+        async def load(name, source):
+            try:
+                return name, await self.load_source(source)
+            except Exception as e:
+                print(f"Error loading source {name}: {e}")
+                return name, None
+        results = await asyncio.gather(*(load(name, source) for name, source in sources.items()))
+        return dict(results)
+
+
+def ingest_sources(sources, **options):
+    async def run():
+        async with AsyncIngestion(**options) as ingestion:
+            return await ingestion.ingest(sources)
+    return asyncio.run(run())
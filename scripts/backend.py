@@ -1,59 +1,383 @@
 import sys
 import json
 import os
+import shutil
+import tempfile
 import pandas as pd
-import io
-import aiohttp
 from fastapi import FastAPI, UploadFile, File, Query, HTTPException
-from sqlalchemy import create_engine
+from fastapi.responses import StreamingResponse, Response, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
 from pydantic import BaseModel
-from typing import List, Dict, Any
-import requests
+from typing import Dict, Any, Literal
 
 # Ensure the scripts folder is in the system path
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
 from scripts.ai_agent import AIAgent # Import the AIAgent class
 from scripts.data_cleaning import DataCleaning # Import the DataCleaning class
+from scripts.llm_cache import LLMCache # Persistent cache of LLM responses
+from scripts.batch_planner import BatchPlanner # Token-budget batch sizing
+from scripts.anomaly_screen import AnomalyScreen # Rule-based pre-screen for the AI stage
+from scripts.data_ingestions import DataIngestion # Chunked file readers
+from scripts.out_of_core import OutOfCoreCleaner # Two-pass cleaning with whole-file statistics
+from scripts.jobs import JobManager # Background cleaning jobs
+from scripts.db_pool import engine_pool # Engines cached per database URL
+from scripts.arrow_io import dataframe_to_bytes, MEDIA_TYPES # Parquet/Arrow responses
+from scripts.serialization import result_to_json, compress # Columnar JSON encoding and response compression
+from scripts.llm_pool import OllamaPool # Load-balanced Ollama endpoints
+from scripts.async_ingestion import AsyncIngestion, APIFetchError, ingest_sources # Pooled async HTTP ingestion
+from scripts.metrics import metrics, stage, timed_iter, track_request, current_timings, peak_memory_bytes # Stage timings and /metrics
+
+
+#Restart unfinished jobs, open the shared HTTP session and build the agent graph once on startup, release them on shutdown
+#WARM_UP_MODEL=1 also loads the model into Ollama (every pooled endpoint) so the first request does not pay for it
+@asynccontextmanager
+async def lifespan(app):
+    job_manager.resume()
+    await api_ingestion.open()
+    await run_in_threadpool(lambda: ai_agent.graph)
+    if os.getenv("WARM_UP_MODEL", "0") == "1":
+        try:
+            warmed = await run_in_threadpool(ai_agent.warm_up, os.getenv("MODEL_KEEP_ALIVE", "30m"))
+            for host, outcome in (warmed or {}).items():
+                if outcome != "ok":
+                    print(f"Model warm-up failed on {host}: {outcome}")
+        except Exception as e:
+            print(f"Model warm-up failed: {e}")
+    yield
+    await api_ingestion.close()
+    if llm_pool is not None:
+        llm_pool.close()
+    job_manager.shutdown()
+    engine_pool.dispose_all()
+    data_cleaning.executor.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+#Collect stage timings per request and return them in a Server-Timing header
+@app.middleware("http")
+async def request_timings(request, call_next):
+    with track_request() as timings:
+        response = await call_next(request)
+    route = request.scope.get("route")
+    metrics.inc("http_requests_total", route=getattr(route, "path", "unmatched"), status=response.status_code)
+    response.headers["Server-Timing"] = timings.server_timing()
+    return response
+
+#OLLAMA_HOSTS spreads LLM calls over several Ollama servers; unset, the ollama default host is used
+llm_pool = OllamaPool.from_env()
+
+#Initialize the AI Agent (with its response cache) and Data Cleaning instances
+#Both are cheap to construct: langgraph and ollama load when the graph is first built (in lifespan)
+ai_agent = AIAgent(
+    cache=LLMCache(os.getenv("LLM_CACHE_PATH")),
+    planner=BatchPlanner(token_budget=int(os.getenv("LLM_TOKEN_BUDGET", "2048"))),
+    # LLM_STRUCTURED=1: schema-constrained streaming with early stop and row-level retries
+    structured=os.getenv("LLM_STRUCTURED", "0") == "1",
+    client=llm_pool,
+    # Batches in flight: enough to fill every pooled endpoint's slots unless LLM_WORKERS says otherwise
+    max_workers=int(os.getenv("LLM_WORKERS", str(llm_pool.capacity if llm_pool else 1))),
+)
+# single-pass compiled cleaning plan; CLEANING_JOBS > 1 shards columns and row partitions over a pool
+data_cleaning = DataCleaning(fused=True, n_jobs=int(os.getenv("CLEANING_JOBS", "1")), parallel_backend=os.getenv("CLEANING_BACKEND", "thread"))
+api_ingestion = AsyncIngestion()  # one keep-alive connection pool shared by every API request
+data_ingestion = DataIngestion()
+anomaly_screen = AnomalyScreen()
+
+
+#AI stage shared by the endpoints, yielding (DataFrame, result) per LLM batch
+#With prescreen only rule-flagged rows go to the LLM and the whole frame comes back at once
+def ai_clean_batches(cleaned_df, prescreen=False, on_plan=None):
+    #on_plan receives the number of batches about to be cleaned (used for job progress)
+    if on_plan:
+        on_plan(1 if prescreen else len(ai_agent.plan_batches(cleaned_df)))
+    if prescreen:
+        yield ai_agent.clean_anomalies(cleaned_df, anomaly_screen)
+        return
+    for result in ai_agent.iter_clean_data(cleaned_df):
+        yield pd.DataFrame(result.get("cleaned_data", [])), result
+
+
+def ai_clean(cleaned_df, prescreen=False):
+    return collect_chunks(ai_clean_batches(cleaned_df, prescreen))
+
+
+#Rule-based then AI cleaning, one chunk at a time so only a chunk is held in memory
+#Missing-value statistics and duplicate removal are per chunk when the input spans several chunks
+#(database results; uploads go through clean_upload, which re-reads the file for global statistics)
+def clean_chunks(chunks, cleaning_options=None, prescreen=False, on_plan=None):
+    frames = (data_cleaning.clean_data(chunk, **(cleaning_options or {})) for chunk in timed_iter("ingest", chunks))
+    yield from ai_clean_frames(frames, prescreen, on_plan)
+
+
+#AI stage over rule-cleaned frames, skipping empty ones
+def ai_clean_frames(frames, prescreen=False, on_plan=None):
+    for cleaned_df in frames:
+        if cleaned_df.empty:
+            continue
+        yield from ai_clean_batches(cleaned_df, prescreen, on_plan)
+
+
+#Rule-cleaned frames of an upload; read_chunks returns a fresh chunk iterator over it each time it is called
+#An upload that fits in one chunk is cleaned in memory as a whole. A larger one goes through OutOfCoreCleaner's
+#two passes, so missing-value statistics, duplicate removal and outlier bounds cover the whole file and the
+#result does not depend on chunk_size. Inferred types come from the first chunk and are applied to every chunk;
+#near-duplicate removal and memory optimization still work chunk by chunk.
+def clean_upload(read_chunks, cleaning_options):
+    reader = read_chunks()
+    chunks = timed_iter("ingest", reader)
+    try:
+        first = next(chunks, None)
+        single = first is not None and next(chunks, None) is None
+    finally:
+        close = getattr(reader, "close", None)
+        if close:
+            close()
+    if first is None:
+        return
+    if single:
+        yield data_cleaning.clean_data(first, **cleaning_options)
+        return
+
+    options = dict(cleaning_options)
+    #Projection first, as in the fused plan, so dropped columns never take part in duplicate detection
+    irrelevant_columns = options.pop("irrelevant_columns", None)
+    if irrelevant_columns:
+        first = data_cleaning.drop_irrelevant_columns(first, columns=irrelevant_columns)
+    schema = data_cleaning.type_coercer.infer_schema(first) if options.pop("infer_types", False) else None
+    optimize_memory = options.pop("optimize_memory", False)
+    near_duplicates = options.pop("near_duplicates", None)
+    near_duplicate_policy = options.pop("near_duplicate_policy", "first")
+
+    def partitions():
+        for chunk in timed_iter("ingest", read_chunks()):
+            if irrelevant_columns:
+                chunk = data_cleaning.drop_irrelevant_columns(chunk, columns=irrelevant_columns)
+            yield data_cleaning.coerce_types(chunk, schema)[0] if schema else chunk
+
+    for cleaned_df in OutOfCoreCleaner().clean(partitions, **options):
+        with stage("rule_cleaning", rows=len(cleaned_df)):
+            if near_duplicates:
+                columns = None if near_duplicates is True else near_duplicates
+                cleaned_df = data_cleaning.remove_near_duplicates(cleaned_df, columns=columns, policy=near_duplicate_policy)
+            if optimize_memory:
+                cleaned_df, _ = data_cleaning.optimize_memory(cleaned_df)
+        yield cleaned_df
+
+
+COLUMNAR_EXTENSIONS = ('.parquet', '.feather', '.arrow')
+UPLOAD_EXTENSIONS = ('.csv', '.xlsx', '.xls') + COLUMNAR_EXTENSIONS
+
+
+#Pick a chunk reader based on the file extension
+#Columnar files skip exclude_columns at read time instead of loading and dropping them
+def read_upload_chunks(source, filename, chunk_size=50000, exclude_columns=None):
+    file_extension = os.path.splitext(filename)[1].lower()
+    if file_extension == '.parquet':
+        return data_ingestion.iter_parquet_batches(source, batch_size=chunk_size, exclude_columns=exclude_columns)
+    elif file_extension in ('.feather', '.arrow'):
+        return data_ingestion.iter_feather_batches(source, batch_size=chunk_size, exclude_columns=exclude_columns)
+    elif file_extension == '.csv':
+        return data_ingestion.iter_csv_chunks(source, chunksize=chunk_size)
+    elif file_extension == '.xlsx':
+        return data_ingestion.iter_excel_chunks(source, chunksize=chunk_size)
+    elif file_extension == '.xls':
+        return [pd.read_excel(source)]  # legacy .xls can't be streamed by openpyxl
+    raise HTTPException(status_code=400, detail="Unsupported file format. Please upload a CSV, Excel, Parquet or Feather file.")
+
+
+#Chunk reader factory for an upload (for clean_upload), with irrelevant columns pushed down into columnar readers
+#source is a path or a seekable file, rewound for every read
+def upload_chunks(source, filename, chunk_size, cleaning_options):
+    file_extension = os.path.splitext(filename)[1].lower()
+    if file_extension not in UPLOAD_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Unsupported file format. Please upload a CSV, Excel, Parquet or Feather file.")
+    exclude_columns = None
+    if file_extension in COLUMNAR_EXTENSIONS and cleaning_options.get("irrelevant_columns"):
+        exclude_columns = cleaning_options["irrelevant_columns"]
+        cleaning_options = {**cleaning_options, "irrelevant_columns": None}
+
+    def read_chunks():
+        if hasattr(source, "seek"):
+            source.seek(0)
+        return read_upload_chunks(source, filename, chunk_size, exclude_columns)
+    return read_chunks, cleaning_options
+
+
+#Wrap a chunk reader factory so only its first read fills preview (see capture_preview)
+def preview_first_read(read_chunks, rows, preview):
+    reads = []
+
+    def read():
+        reads.append(True)
+        return capture_preview(read_chunks(), rows, preview) if len(reads) == 1 else read_chunks()
+    return read
+
+
+def cleaning_options_from_query(missing_value_strategy='mean', outlier_column=None, irrelevant_columns=None, categorical_column=None, data_type_fixes=None, infer_types=False, optimize_memory=False, near_duplicates=None, near_duplicate_policy='first'):
+    return {
+        "missing_value_strategy": missing_value_strategy,
+        "outlier_column": outlier_column,
+        "irrelevant_columns": irrelevant_columns.split(',') if irrelevant_columns else None,
+        "categorical_column": categorical_column,
+        "data_type_fixes": json.loads(data_type_fixes) if data_type_fixes else None,
+        "infer_types": infer_types,
+        "optimize_memory": optimize_memory,
+        # "all" compares every column, otherwise a comma separated list of columns
+        "near_duplicates": (True if near_duplicates == "all" else near_duplicates.split(',')) if near_duplicates else None,
+        "near_duplicate_policy": near_duplicate_policy,
+    }
+
+
+#Concatenate the per-batch outputs of clean_chunks / ai_clean_batches
+def collect_chunks(chunk_results):
+    frames = []
+    combined = {"issues_found": [], "cleaning_strategy": []}
+    for ai_cleaned_df, ai_result in chunk_results:
+        frames.append(ai_cleaned_df)
+        for key in combined:
+            combined[key].extend(ai_result.get(key, []))
+    ai_cleaned_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    return ai_cleaned_df, combined
+
+
+#JSON-safe records (NaN becomes null)
+def to_records(df):
+    return df.astype(object).where(pd.notna(df), None).to_dict(orient='records')
+
+
+#Pass chunks through unchanged, keeping copies of the first `rows` raw rows in `preview`
+#so the original data can be shown next to the result without reading the source twice
+#Closing it closes the reader too (a pandas reader left to the garbage collector closes the file it reads)
+def capture_preview(chunks, rows, preview):
+    kept = 0
+    try:
+        for chunk in chunks:
+            if kept < rows:
+                preview.append(chunk.head(rows - kept).copy())
+                kept += len(preview[-1])
+            yield chunk
+    finally:
+        close = getattr(chunks, "close", None)
+        if close:
+            close()
+
+
+def preview_frame(preview):
+    return pd.concat(preview, ignore_index=True) if preview else pd.DataFrame()
+
+
+#Cleaned result as JSON (default) or as a Parquet/Arrow file with issues and strategy in its schema metadata
+#JSON is encoded straight from the frame's columns; shape is records, split or columns (see scripts.serialization)
+#preview (from capture_preview) adds the original rows as "original_preview"; compression is gzip or zstd (Content-Encoding)
+def format_response(ai_cleaned_df, ai_result, response_format="json", preview=None, shape="records", compression=None):
+    if response_format not in MEDIA_TYPES and response_format != "json":
+        raise HTTPException(status_code=400, detail="response_format must be 'json', 'parquet' or 'arrow'.")
+    with stage("serialize", rows=len(ai_cleaned_df)) as counts:
+        if response_format in MEDIA_TYPES:
+            metadata = {"issues_found": ai_result["issues_found"], "cleaning_strategy": ai_result["cleaning_strategy"]}
+            if preview is not None:
+                metadata["original_preview"] = to_records(preview_frame(preview))
+            content = dataframe_to_bytes(ai_cleaned_df, response_format, metadata)
+            media_type = MEDIA_TYPES[response_format]
+        else:
+            preview_df = preview_frame(preview) if preview is not None else None
+            content = result_to_json(ai_result, ai_cleaned_df, shape, preview_df).encode("utf-8")
+            media_type = "application/json"
+        headers = {}
+        if compression:
+            try:
+                content = compress(content, compression)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            headers["Content-Encoding"] = compression
+        counts["bytes"] = len(content)
+        return Response(content=content, media_type=media_type, headers=headers)
+
+
+#Emit each batch as soon as it is cleaned: one JSON object per line (ndjson) or server-sent events (sse)
+#A preview (from capture_preview) travels in the first batch event with the rows read by then, or in the last event when there are no batches
+#Batch events are encoded like format_response, in the requested shape
+def stream_response(batch_results, stream, preview=None, shape="records"):
+    if stream not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="stream must be 'ndjson' or 'sse'.")
+
+    def format_event(message):
+        payload = message if isinstance(message, str) else json.dumps(message, default=str)
+        return f"data: {payload}\n\n" if stream == "sse" else payload + "\n"
+
+    def events():
+        batches = 0
+        try:
+            for ai_cleaned_df, ai_result in batch_results:
+                batches += 1
+                batch_preview = preview_frame(preview) if batches == 1 and preview is not None else None
+                yield format_event(result_to_json(ai_result, ai_cleaned_df, shape, batch_preview, batch=batches))
+        except Exception as e:
+            yield format_event({"error": str(e)})
+        # Headers are long gone by now, so the timing breakdown travels in the last event
+        timings = current_timings()
+        message = {"done": True, "batches": batches, "timings": timings.breakdown() if timings else None}
+        if batches == 0 and preview is not None:
+            message["original_preview"] = to_records(preview_frame(preview))
+        yield format_event(message)
+
+    media_type = "text/event-stream" if stream == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type)
+
+#Copy of an upload that a streaming response can own: FastAPI closes the UploadFile when the handler
+#returns, before a StreamingResponse reads it. The anonymous temp file is deleted once closed.
+def copy_upload(upload):
+    copy = tempfile.TemporaryFile()
+    try:
+        shutil.copyfileobj(upload.file, copy)
+        copy.seek(0)
+    except Exception:
+        copy.close()
+        raise
+    return copy
 
-app = FastAPI()
 
-#Initialize the AI Agent and Data Cleaning instances
-ai_agent = AIAgent()
-data_cleaning = DataCleaning()
+#Pass batches through, closing (and so deleting) the upload copy when the stream ends, fails or is abandoned
+def closing_upload(batch_results, copy):
+    with copy:
+        yield from batch_results
 
 #Endpoints
 
 #Endpoint for CSV and Excel
 
+#Sync handlers below run in FastAPI's threadpool, so cleaning never blocks the event loop
 @app.post("/clean-data/")
-async def clean_data(file: UploadFile = File(...), missing_value_strategy: str = Query('mean'), outlier_column: str = Query(None), irrelevant_columns: str = Query(None), categorical_column: str = Query(None), data_type_fixes: str = Query(None)):
+def clean_data(file: UploadFile = File(...), missing_value_strategy: str = Query('mean'), outlier_column: str = Query(None), irrelevant_columns: str = Query(None), categorical_column: str = Query(None), data_type_fixes: str = Query(None), infer_types: bool = Query(False), optimize_memory: bool = Query(False), near_duplicates: str = Query(None), near_duplicate_policy: Literal["first", "last", "most_complete", "coalesce"] = Query("first"), prescreen: bool = Query(False), chunk_size: int = Query(50000), stream: str = Query(None), response_format: str = Query("json"), preview_rows: int = Query(0), shape: Literal["records", "split", "columns"] = Query("records"), compression: Literal["gzip", "zstd"] = Query(None)):
     try:
-        #Read the uploaded file into a DataFrame
-        contents = await file.read()
-        file_extension = os.path.splitext(file.filename)[1].lower()
-        
-        #Load the data into a DataFrame based on the file extension
-        if file_extension == '.csv':
-            df = pd.read_csv(io.StringIO(contents.decode('utf-8')))
-        elif file_extension in ['.xlsx', '.xls']:
-            df = pd.read_excel(io.BytesIO(contents))
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported file format. Please upload a CSV or Excel file.") 
-
-        #step 1: Clean the data using the DataCleaning class
-        cleaned_df = data_cleaning.clean_data(df, missing_value_strategy, outlier_column, irrelevant_columns.split(',') if irrelevant_columns else None, categorical_column, json.loads(data_type_fixes) if data_type_fixes else None)       
-
-        #step 2: AI Agent Cleaning
-        ai_cleaned_df = ai_agent.clean_data(cleaned_df)
-
-        #Ensure AI Output is in DataFrame format
-        if isinstance(ai_cleaned_df, str):
-            from io import StringIO
-            ai_cleaned_df = pd.read_csv(StringIO(ai_cleaned_df))
-
-        return{"cleaned_data": ai_cleaned_df.to_dict(orient='records')}
+        #Read the upload in chunks straight from its spooled temp file, or from a copy when streaming
+        cleaning_options = cleaning_options_from_query(missing_value_strategy, outlier_column, irrelevant_columns, categorical_column, data_type_fixes, infer_types, optimize_memory, near_duplicates, near_duplicate_policy)
+        source = copy_upload(file) if stream else file.file
+        try:
+            read_chunks, cleaning_options = upload_chunks(source, file.filename, chunk_size, cleaning_options)
+            preview = [] if preview_rows > 0 else None
+            if preview is not None:
+                read_chunks = preview_first_read(read_chunks, preview_rows, preview)
+
+            #step 1 and 2: Rule-based and AI Agent cleaning, chunk by chunk; uploads larger than chunk_size rows
+            #are read twice so the rule-based statistics cover the whole file (see clean_upload)
+            batch_results = ai_clean_frames(clean_upload(read_chunks, cleaning_options), prescreen)
+            if stream:
+                return stream_response(closing_upload(batch_results, source), stream, preview, shape)
+        except Exception:
+            if stream:
+                source.close()
+            raise
+        ai_cleaned_df, ai_result = collect_chunks(batch_results)
+
+        return format_response(ai_cleaned_df, ai_result, response_format, preview, shape, compression)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
@@ -62,26 +386,33 @@ async def clean_data(file: UploadFile = File(...), missing_value_strategy: str =
 class DBQuery(BaseModel):
     db_url: str
     query: str
+    prescreen: bool = False
+    stream: str | None = None
+    chunk_size: int = 50000
+    response_format: str = "json"
+    shape: Literal["records", "split", "columns"] = "records"  # layout of cleaned_data in JSON responses
+    compression: Literal["gzip", "zstd"] | None = None
+    preview_rows: int = 0  # also return this many original rows as "original_preview"
+    profile: Literal["cprofile", "tracemalloc", "all"] | None = None  # background jobs only
 
 @app.post("/clean-db-data/")
-async def clean_db_data(db_query: DBQuery):
+def clean_db_data(db_query: DBQuery):
     try:
-        engine = create_engine(db_query.db_url)
-        df = pd.read_sql(db_query.query, engine)
-
-        #step 1: Rule based cleaning
-        cleaned_df = data_cleaning.clean_data(df)
-
-        #step 2: AI Agent Cleaning
-        ai_cleaned_df = ai_agent.clean_data(cleaned_df)
-
-        #Ensure AI Output is in DataFrame format
-        if isinstance(ai_cleaned_df, str):
-            from io import StringIO
-            ai_cleaned_df = pd.read_csv(StringIO(ai_cleaned_df))
-
-        return{"cleaned_data": ai_cleaned_df.to_dict(orient='records')}
+        #Read through a pooled engine and a server-side cursor, chunk_size rows at a time
+        chunks = engine_pool.iter_query(db_query.db_url, db_query.query, db_query.chunk_size)
+        preview = [] if db_query.preview_rows > 0 else None
+        if preview is not None:
+            chunks = capture_preview(chunks, db_query.preview_rows, preview)
+
+        #step 1 and 2: Rule based and AI Agent cleaning, chunk by chunk
+        if db_query.stream:
+            return stream_response(clean_chunks(chunks, None, db_query.prescreen), db_query.stream, preview, db_query.shape)
+        ai_cleaned_df, ai_result = collect_chunks(clean_chunks(chunks, None, db_query.prescreen))
+
+        return format_response(ai_cleaned_df, ai_result, db_query.response_format, preview, db_query.shape, db_query.compression)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
@@ -90,79 +421,47 @@ async def clean_db_data(db_query: DBQuery):
 class APIDataRequest(BaseModel):
     api_url: str
     params: Dict[str, Any] | None = None
-
-# Expected AI Response Model
-class AIResponse(BaseModel):
-    issues_found: List[str]
-    cleaning_strategy: List[str]
-    cleaned_data: List[Dict[str, Any]]
+    pagination: Dict[str, Any] | None = None
+    stream_json: bool = False
+    prescreen: bool = False
+    stream: str | None = None
+    response_format: str = "json"
+    shape: Literal["records", "split", "columns"] = "records"  # layout of cleaned_data in JSON responses
+    compression: Literal["gzip", "zstd"] | None = None
+    preview_rows: int = 0  # also return this many original rows as "original_preview"
+    profile: Literal["cprofile", "tracemalloc", "all"] | None = None  # background jobs only
 
 @app.post("/clean-api-data/")
 async def clean_api_data(api_data_request: APIDataRequest):
     try:
-        # Step 1: Fetch Data from API
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                api_data_request.api_url,
-                params=api_data_request.params
-            ) as response:
-
-                if response.status != 200:
-                    raise HTTPException(
-                        status_code=response.status,
-                        detail=f"API request failed with status code {response.status}"
-                    )
-
-                try:
-                    data = await response.json()
-                except Exception:
-                    raise HTTPException(
-                        status_code=400,
-                        detail="API did not return valid JSON."
-                    )
-
-        if not data:
-            raise HTTPException(
-                status_code=400,
-                detail="API returned empty data."
-            )
-
-        df = pd.DataFrame(data)
+        # Step 1: Fetch Data from API (pooled session, retries and pagination)
+        try:
+            with stage("ingest") as counts:
+                df = await api_ingestion.fetch_api_data(
+                    api_data_request.api_url,
+                    params=api_data_request.params,
+                    pagination=api_data_request.pagination,
+                    stream=api_data_request.stream_json,
+                )
+                counts["rows"] = len(df)
+        except APIFetchError as e:
+            raise HTTPException(status_code=e.status, detail=str(e))
 
         if df.empty:
             raise HTTPException(
                 status_code=400,
-                detail="Converted DataFrame is empty."
-            )
-
-        # Step 2: Rule-Based Cleaning
-        cleaned_df = data_cleaning.clean_data(df)
-
-        # Step 3: AI Agent Cleaning
-        ai_raw_output = ai_agent.clean_data(cleaned_df)
-       
-        # Step 4: Parse & Validate AI JSON
-        if not isinstance(ai_raw_output, str):
-            raise HTTPException(
-                status_code=500,
-                detail="AI agent did not return valid string output."
+                detail="API returned empty data."
             )
 
-        # Remove markdown if model wraps JSON
-        ai_raw_output = ai_raw_output.strip()
-        if ai_raw_output.startswith("```"):
-            ai_raw_output = ai_raw_output.strip("`").replace("json", "").strip()
+        preview = [df.head(api_data_request.preview_rows).copy()] if api_data_request.preview_rows > 0 else None
 
-        try:
-            parsed_ai = AIResponse.model_validate_json(ai_raw_output)
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"AI returned invalid JSON format: {str(e)}"
-            )
+        # Step 2: Rule-Based Cleaning (off the event loop)
+        cleaned_df = await run_in_threadpool(data_cleaning.clean_data, df)
 
-        # Convert cleaned_data to DataFrame
-        ai_cleaned_df = pd.DataFrame(parsed_ai.cleaned_data)
+        # Step 3: AI Agent Cleaning (batches are parsed and merged by the agent)
+        if api_data_request.stream:
+            return stream_response(ai_clean_batches(cleaned_df, api_data_request.prescreen), api_data_request.stream, preview, api_data_request.shape)
+        ai_cleaned_df, ai_result = await run_in_threadpool(ai_clean, cleaned_df, api_data_request.prescreen)
 
         if ai_cleaned_df.empty:
             raise HTTPException(
@@ -170,18 +469,112 @@ async def clean_api_data(api_data_request: APIDataRequest):
                 detail="AI cleaned data is empty."
             )
 
-        # Step 5: Return Cleaned Data
-        return {
-            "issues_found": parsed_ai.issues_found,
-            "cleaning_strategy": parsed_ai.cleaning_strategy,
-            "cleaned_data": ai_cleaned_df.to_dict(orient="records")
-        }
+        # Step 4: Return Cleaned Data
+        return format_response(ai_cleaned_df, ai_result, api_data_request.response_format, preview, api_data_request.shape, api_data_request.compression)
 
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
+#Background jobs: submit returns a job ID, the work runs on the job manager's worker pool
+
+def run_file_job(params, input_path, context):
+    read_chunks, cleaning_options = upload_chunks(input_path, params["filename"], params["chunk_size"], params["cleaning_options"])
+    yield from ai_clean_frames(clean_upload(read_chunks, cleaning_options), params["prescreen"], on_plan=context.add_total)
+
+
+def run_db_job(params, input_path, context):
+    chunks = engine_pool.iter_query(params["db_url"], params["query"], params.get("chunk_size", 50000))
+    yield from clean_chunks(chunks, None, params["prescreen"], on_plan=context.add_total)
+
+
+def run_api_job(params, input_path, context):
+    df = ingest_sources({"api": {"type": "api", "url": params["api_url"], "params": params.get("params"),
+                                 "pagination": params.get("pagination"), "stream": params.get("stream_json", False)}})["api"]
+    if df is None or df.empty:
+        raise ValueError("API returned no data.")
+    yield from clean_chunks([df], None, params["prescreen"], on_plan=context.add_total)
+
+
+job_manager = JobManager(os.getenv("JOBS_DB_PATH"), max_workers=int(os.getenv("JOB_WORKERS", "2")), to_records=to_records)
+job_manager.register("file", run_file_job)
+job_manager.register("db", run_db_job)
+job_manager.register("api", run_api_job)
+
+
+@app.post("/jobs/clean-data/")
+def submit_clean_data_job(file: UploadFile = File(...), missing_value_strategy: str = Query('mean'), outlier_column: str = Query(None), irrelevant_columns: str = Query(None), categorical_column: str = Query(None), data_type_fixes: str = Query(None), infer_types: bool = Query(False), optimize_memory: bool = Query(False), near_duplicates: str = Query(None), near_duplicate_policy: Literal["first", "last", "most_complete", "coalesce"] = Query("first"), prescreen: bool = Query(False), chunk_size: int = Query(50000), profile: Literal["cprofile", "tracemalloc", "all"] = Query(None)):
+    if os.path.splitext(file.filename)[1].lower() not in UPLOAD_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Unsupported file format. Please upload a CSV, Excel, Parquet or Feather file.")
+    params = {
+        "filename": file.filename,
+        "chunk_size": chunk_size,
+        "prescreen": prescreen,
+        "profile": profile,
+        "cleaning_options": cleaning_options_from_query(missing_value_strategy, outlier_column, irrelevant_columns, categorical_column, data_type_fixes, infer_types, optimize_memory, near_duplicates, near_duplicate_policy),
+    }
+    return {"job_id": job_manager.submit("file", params, input_file=file.file, filename=file.filename)}
+
+
+@app.post("/jobs/clean-db-data/")
+def submit_clean_db_job(db_query: DBQuery):
+    return {"job_id": job_manager.submit("db", db_query.model_dump(exclude={"stream", "response_format"}))}
+
+
+@app.post("/jobs/clean-api-data/")
+def submit_clean_api_job(api_data_request: APIDataRequest):
+    return {"job_id": job_manager.submit("api", api_data_request.model_dump(exclude={"stream", "response_format"}))}
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    status = job_manager.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return {**status, **job_manager.report(job_id)}
+
+
+#Partial or final results, starting at batch number offset
+@app.get("/jobs/{job_id}/results")
+def get_job_results(job_id: str, offset: int = Query(0)):
+    status = job_manager.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    results = job_manager.results(job_id, offset)
+    combined = ai_agent.combine_results(results)
+    #Batches can finish between the status and results reads, so the offset follows what was returned
+    return {**status, **combined, "next_offset": offset + len(results)}
+
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    status = job_manager.cancel(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return status
+
+
+#Prometheus scrape endpoint: counters plus cache, memory and Ollama endpoint gauges
+@app.get("/metrics")
+def get_metrics():
+    gauges = {"process_peak_memory_bytes": peak_memory_bytes()}
+    if ai_agent.cache is not None:
+        cache_stats = ai_agent.cache.stats()
+        gauges["llm_cache_hit_ratio"] = cache_stats["hit_rate"]
+        gauges["llm_cache_entries"] = cache_stats["entries"]
+    if llm_pool is not None:
+        endpoints = llm_pool.stats()
+        gauges["llm_endpoint_outstanding"] = {(("endpoint", e["host"]),): e["outstanding"] for e in endpoints}
+        gauges["llm_endpoint_healthy"] = {(("endpoint", e["host"]),): int(e["healthy"]) for e in endpoints}
+    return PlainTextResponse(metrics.render(gauges), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
 #Run Server
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,107 @@
+import pandas as pd
+
+
+class BatchEncoder:
+    """Render a batch DataFrame as prompt text.
+
+    ``dictionary_encode`` replaces repeated values of text columns with short
+    codes listed once above the data. ``max_cell_chars`` cuts long text cells;
+    the model only sees (and returns) the shortened text, so leave it off for
+    columns whose full contents must survive cleaning.
+    """
+
+    name = "table"
+
+    def __init__(self, dictionary_encode=False, max_cell_chars=None, min_repeats=3):
+        self.dictionary_encode = dictionary_encode
+        self.max_cell_chars = max_cell_chars
+        self.min_repeats = min_repeats
+
+    #Identifies the rendering in cache keys so switching encoders never reuses old answers
+    @property
+    def signature(self):
+        return f"{self.name}:dict={int(self.dictionary_encode)}:trunc={self.max_cell_chars}"
+
+    def encode(self, df):
+        df = self._truncate(df)
+        legend = ""
+        if self.dictionary_encode:
+            legend, df = self._dictionary(df)
+        return legend + self._render(df)
+
+    def _render(self, df):
+        return df.to_string()
+
+    def _text_columns(self, df):
+        return df.select_dtypes(include=["object", "string", "category"]).columns
+
+    def _truncate(self, df):
+        if not self.max_cell_chars:
+            return df
+        limit = self.max_cell_chars
+        df = df.copy()
+        for column in self._text_columns(df):
+            values = df[column].astype("string")
+            long_cells = values.str.len() > limit
+            if long_cells.any():
+                df[column] = df[column].where(~long_cells.fillna(False), values.str.slice(0, limit) + "...")
+        return df
+
+    def _dictionary(self, df):
+        # Codes like @1, scoped per column, for values repeated at least min_repeats times
+        lines = []
+        df = df.copy()
+        for column in self._text_columns(df):
+            counts = df[column].value_counts()
+            repeated = [v for v in counts[counts >= self.min_repeats].index if len(str(v)) > 3]
+            if not repeated:
+                continue
+            codes = {value: f"@{i}" for i, value in enumerate(repeated)}
+            df[column] = df[column].map(lambda v: codes.get(v, v))
+            lines.append(f"{column}: " + "; ".join(f"{code}={value}" for value, code in codes.items()))
+        if not lines:
+            return "", df
+        legend = "Value codes (return the decoded values, not the codes):\n" + "\n".join(lines) + "\n\n"
+        return legend, df
+
+
+class CSVEncoder(BatchEncoder):
+    name = "csv"
+
+    def _render(self, df):
+        return df.to_csv(index=False).rstrip("\n")
+
+
+class JSONLinesEncoder(BatchEncoder):
+    name = "jsonl"
+
+    def _render(self, df):
+        return df.to_json(orient="records", lines=True, date_format="iso").rstrip("\n")
+
+
+class ColumnarEncoder(BatchEncoder):
+    """One line per column: the column name once, then its values in row order."""
+
+    name = "columnar"
+
+    def _render(self, df):
+        lines = [f"rows: {len(df)}"]
+        for column in df.columns:
+            values = " | ".join("" if pd.isna(v) else str(v) for v in df[column].tolist())
+            lines.append(f"{column}: {values}")
+        return "\n".join(lines)
+
+
+ENCODERS = {
+    "table": BatchEncoder,
+    "csv": CSVEncoder,
+    "jsonl": JSONLinesEncoder,
+    "columnar": ColumnarEncoder,
+}
+
+
+def get_encoder(name="csv", **options):
+    try:
+        return ENCODERS[name](**options)
+    except KeyError:
+        raise ValueError(f"Unknown batch encoder '{name}'. Choose from: {', '.join(ENCODERS)}")
@@ -0,0 +1,52 @@
+import numpy as np
+
+
+class BatchPlanner:
+    """Split a DataFrame into batches that fit a prompt token budget.
+
+    Tokens are estimated from rendered cell lengths (about ``chars_per_token``
+    characters per token). Every row is counted twice, once in the prompt and
+    once in the model's cleaned_data echo, plus the column names it repeats
+    as JSON keys.
+    """
+
+    def __init__(self, token_budget=2048, chars_per_token=4, min_rows=1, max_rows=None):
+        self.token_budget = token_budget
+        self.chars_per_token = chars_per_token
+        self.min_rows = min_rows
+        self.max_rows = max_rows
+
+    #Estimated prompt tokens per row, vectorized over columns
+    def estimate_row_tokens(self, df):
+        lengths = np.zeros(len(df), dtype=np.int64)
+        for column in df.columns:
+            lengths += df[column].astype(str).str.len().to_numpy(dtype=np.int64) + 1  # cell plus separator
+        return np.ceil(lengths / self.chars_per_token).astype(np.int64)
+
+    def header_tokens(self, df):
+        return int(np.ceil(sum(len(str(c)) + 1 for c in df.columns) / self.chars_per_token))
+
+    #Return (start, stop) row positions packing rows greedily up to the budget
+    def plan(self, df, prompt_tokens=0):
+        if len(df) == 0:
+            return []
+        header = self.header_tokens(df)
+        row_cost = 2 * self.estimate_row_tokens(df) + header
+        available = max(self.token_budget - prompt_tokens - header, 0)
+        cumulative = np.cumsum(row_cost)
+
+        slices = []
+        start = 0
+        while start < len(df):
+            base = cumulative[start - 1] if start else 0
+            stop = int(np.searchsorted(cumulative, base + available, side="right"))
+            stop = max(stop, start + self.min_rows)
+            if self.max_rows:
+                stop = min(stop, start + self.max_rows)
+            stop = min(stop, len(df))
+            slices.append((start, stop))
+            start = stop
+        return slices
+
+    def split(self, df, prompt_tokens=0):
+        return [df.iloc[start:stop] for start, stop in self.plan(df, prompt_tokens)]
@@ -0,0 +1,113 @@
+import pandas as pd
+
+
+class CleaningPlan:
+    """Compiled form of the DataCleaning.clean_data steps.
+
+    Irrelevant columns are dropped before anything else, the fill
+    statistics are computed once over all numeric columns and applied in
+    place, and the missing-row, duplicate and outlier filters are combined
+    into a single boolean mask so the rows are copied at most once.
+
+    Execution runs under pandas copy-on-write, so the projection and column
+    selections are views and the caller's frame is left untouched.
+
+    With ``infer_types`` every column is coerced to its inferred type right
+    after the projection, so numbers stored as text are imputed and
+    compared as numbers. ``optimize_memory`` then shrinks the dtypes
+    (categoricals, downcast numerics, Arrow strings) before the heavy steps
+    and keeps high-cardinality dummy columns sparse.
+
+    ``near_duplicates`` (True or a list of columns) removes fuzzy duplicates
+    from the rows that survive the combined filter.
+
+    Results match the step-by-step chain except that dropped columns no
+    longer take part in duplicate detection or in dropping rows with
+    missing values.
+    """
+
+    def __init__(self, missing_value_strategy='mean', outlier_column=None, irrelevant_columns=None, categorical_column=None, data_type_fixes=None, infer_types=False, optimize_memory=False,
+                 near_duplicates=None, near_duplicate_policy='first'):
+        self.missing_value_strategy = missing_value_strategy
+        self.outlier_column = outlier_column
+        self.irrelevant_columns = irrelevant_columns
+        self.categorical_column = categorical_column
+        self.data_type_fixes = data_type_fixes
+        self.infer_types = infer_types
+        self.optimize_memory = optimize_memory
+        self.near_duplicates = near_duplicates
+        self.near_duplicate_policy = near_duplicate_policy
+        self.steps = self._compile()
+
+    def _compile(self):
+        steps = []
+        if self.irrelevant_columns:
+            steps.append("drop_irrelevant_columns")
+        if self.infer_types:
+            steps.append("coerce_types")
+        if self.optimize_memory:
+            steps.append("optimize_memory")
+        if self.missing_value_strategy in ("mean", "median", "mode"):
+            steps.append(f"fill_{self.missing_value_strategy}")
+        filters = ["missing_rows"] if self.missing_value_strategy not in ("mean", "median", "mode") else []
+        filters.append("duplicates")
+        if self.outlier_column:
+            filters.append("outliers")
+        steps.append("filter(" + ", ".join(filters) + ")")
+        if self.near_duplicates:
+            steps.append(f"remove_near_duplicates[{self.near_duplicate_policy}]")
+        if self.categorical_column:
+            steps.append("encode_categorical_variables")
+        if self.data_type_fixes:
+            steps.append("fix_data_types")
+        return steps
+
+    def explain(self):
+        return " -> ".join(self.steps)
+
+    def execute(self, df, cleaner):
+        with pd.option_context("mode.copy_on_write", True):
+            return self._execute(df, cleaner)
+
+    def _execute(self, df, cleaner):
+        #Projection first so dropped columns are never imputed or compared
+        if self.irrelevant_columns:
+            df = df.drop(columns=self.irrelevant_columns)
+        if self.infer_types:
+            df, _ = cleaner.coerce_types(df)
+        if self.optimize_memory:
+            df, _ = cleaner.optimize_memory(df)
+
+        #Fill statistics for every numeric column in one pass (copy-on-write only copies filled columns)
+        mask = None
+        strategy = self.missing_value_strategy
+        if strategy in ("mean", "median"):
+            numeric_cols = df.select_dtypes(include=["number"]).columns
+            if len(numeric_cols):
+                values = cleaner.column_statistics(df[numeric_cols], strategy)
+                df = cleaner.executor.fillna(df, values)
+        elif strategy == "mode":
+            df = cleaner.executor.fillna(df, cleaner.column_modes(df))
+        else:
+            mask = df.notna().all(axis=1).to_numpy()
+
+        #Duplicate and outlier filters combined into one mask
+        duplicates = ~cleaner.executor.duplicated(df)
+        mask = duplicates if mask is None else mask & duplicates
+        if self.outlier_column:
+            kept = df[self.outlier_column][mask]
+            lower_bound, upper_bound = cleaner.outlier_bounds(kept.to_frame(), self.outlier_column)
+            mask &= cleaner.executor.between(df, self.outlier_column, lower_bound, upper_bound)
+        if not mask.all():
+            df = df[mask]
+        if self.near_duplicates:
+            columns = None if self.near_duplicates is True else self.near_duplicates
+            df = cleaner.remove_near_duplicates(df, columns=columns, policy=self.near_duplicate_policy)
+
+        if self.categorical_column:
+            sparse = self.optimize_memory and cleaner.memory_optimizer.use_sparse(df[self.categorical_column])
+            df = cleaner.encode_categorical_variables(df, column=self.categorical_column, sparse=sparse)
+        if self.data_type_fixes:
+            for column, new_type in self.data_type_fixes.items():
+                df = cleaner.fix_data_types(df, column, new_type)
+        return df
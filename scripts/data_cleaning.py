@@ -1,64 +1,139 @@
 import pandas as pd
 import numpy as np
 
+from scripts.cleaning_plan import CleaningPlan
+from scripts.metrics import metrics, stage
+from scripts.type_coercion import TypeCoercer
+from scripts.memory_optimizer import MemoryOptimizer
+from scripts.near_duplicates import NearDuplicateDetector
+from scripts.parallel import ParallelExecutor
+
 class DataCleaning:
+
+    #fused=True runs clean_data as a single compiled CleaningPlan instead of the step chain
+    #n_jobs > 1 (or -1 for all cores) shards statistics, imputation and row filters over a thread or process pool
+    def __init__(self, fused=False, type_coercer=None, memory_optimizer=None, near_duplicate_detector=None, n_jobs=1, parallel_backend="thread"):
+        self.fused = fused
+        self.executor = ParallelExecutor(n_jobs, parallel_backend)
+        self.type_coercer = type_coercer or TypeCoercer()
+        self.memory_optimizer = memory_optimizer or MemoryOptimizer()
+        self.near_duplicate_detector = near_duplicate_detector or NearDuplicateDetector()
     
     #Handeling missing values
     def handle_missing_values(self, df, strategy="mean"):
      if strategy == "mean":
         numeric_cols = df.select_dtypes(include=["number"]).columns
-        df[numeric_cols] = df[numeric_cols].fillna(df[numeric_cols].mean())
+        df[numeric_cols] = self.executor.fillna(df[numeric_cols], self.column_statistics(df[numeric_cols], "mean"))
         return df
 
      elif strategy == "median":
         numeric_cols = df.select_dtypes(include=["number"]).columns
-        df[numeric_cols] = df[numeric_cols].fillna(df[numeric_cols].median())
+        df[numeric_cols] = self.executor.fillna(df[numeric_cols], self.column_statistics(df[numeric_cols], "median"))
         return df
 
      elif strategy == "mode":
-        return df.fillna(df.mode().iloc[0])
+        return self.executor.fillna(df, self.column_modes(df))
 
      else:
         return df.dropna()
 
 
+    #Most frequent value of every column
+    def column_modes(self, df):
+        return self.column_statistics(df, "mode")
+
+    #mean, median or mode of every column, computed on column shards in parallel when n_jobs > 1
+    def column_statistics(self, df, statistic):
+        return self.executor.column_statistics(df, statistic)
+
     #Remove duplicates from the DataFrame    
     def remove_duplicates(self, df):
+        if self.executor.enabled(df):
+            return df[~self.executor.duplicated(df)]
         return df.drop_duplicates()
+
+    #Remove rows that are duplicates up to case, spacing, punctuation and small typos (MinHash-LSH over columns)
+    #policy picks the surviving row: first, last, most_complete or coalesce
+    def remove_near_duplicates(self, df, columns=None, policy="first"):
+        with stage("near_duplicates", rows=len(df)):
+            df, _ = self.near_duplicate_detector.deduplicate(df, columns, policy)
+        return df
     
-    #fix data types of columns into int
+    #fix data types of a column: int, nullable_int, float, bool, datetime, category, string (or "auto" to infer it)
+    #generic types are downcast; explicit dtype names such as "int64" or "float64" are kept exactly
+    #cells that can't be converted become missing instead of raising
     def fix_data_types(self, df, column, new_type):
-        df[column] = df[column].astype(int)
+        target = self.type_coercer.infer_type(df[column]) if new_type == "auto" else new_type
+        if target is None:
+            return df
+        coerced, failed, rounded = self.type_coercer.coerce_column(df[column], target)
+        #Cells that became missing or were rounded are reported rather than changed silently
+        if failed.any() or rounded.any():
+            report = self.type_coercer.column_report(df[column], coerced, failed, rounded)
+            print(f"fix_data_types: {column} to {report['to']}: {report['failed']} cells could not be converted and are now missing, "
+                  f"{report['rounded']} fractional values rounded; failed examples: {report['failed_examples']}")
+            metrics.inc("type_coercion_cells_total", report["failed"], column=str(column), result="failed")
+            metrics.inc("type_coercion_cells_total", report["rounded"], column=str(column), result="rounded")
+        df[column] = coerced
         return df
+
+    #infer and fix the type of every column, returns the frame and a report of conversions and failed cells
+    def coerce_types(self, df, schema=None):
+        return self.type_coercer.coerce(df, schema)
     
-    #Remove outliers using the IQR method
-    def remove_outliers(self, df, column):
-        Q1 = df[column].quantile(0.25)
-        Q3 = df[column].quantile(0.75)
+    #IQR bounds used to detect outliers in a column
+    def outlier_bounds(self, df, column):
+        Q1, Q3 = df[column].quantile([0.25, 0.75])  # both quartiles from one pass over the column
         IQR = Q3 - Q1
         lower_bound = Q1 - 1.5 * IQR
         upper_bound = Q3 + 1.5 * IQR
-        return df[(df[column] >= lower_bound) & (df[column] <= upper_bound)]
+        return lower_bound, upper_bound
+
+    #Remove outliers using the IQR method
+    def remove_outliers(self, df, column):
+        lower_bound, upper_bound = self.outlier_bounds(df, column)
+        return df[self.executor.between(df, column, lower_bound, upper_bound)]
     
     #drop irrelevant columns from the DataFrame
     def drop_irrelevant_columns(self, df, columns):
         return df.drop(columns=columns)
     
-    #convert categorical variables into dummy/indicator variables
-    def encode_categorical_variables(self, df, column):
-        return pd.get_dummies(df, columns=[column], drop_first=True)
+    #convert categorical variables into dummy/indicator variables (sparse=True stores the mostly-zero dummies sparsely)
+    def encode_categorical_variables(self, df, column, sparse=False):
+        return pd.get_dummies(df, columns=[column], drop_first=True, sparse=sparse)
+
+    #categoricals, downcast numerics and Arrow strings, returns the frame and a before/after memory report
+    def optimize_memory(self, df):
+        with stage("optimize_memory", rows=len(df)):
+            df, report = self.memory_optimizer.optimize(df)
+        metrics.inc("memory_saved_bytes_total", report["saved_bytes"])
+        return df, report
     
     #clean the data by applying all the cleaning steps
-    def clean_data(self, df, missing_value_strategy='mean', outlier_column=None, irrelevant_columns=None, categorical_column=None, data_type_fixes=None):
-        df = self.handle_missing_values(df, strategy=missing_value_strategy)
-        df = self.remove_duplicates(df)
-        if outlier_column:
-            df = self.remove_outliers(df, column=outlier_column)
-        if irrelevant_columns:
-            df = self.drop_irrelevant_columns(df, columns=irrelevant_columns)
-        if categorical_column:
-            df = self.encode_categorical_variables(df, column=categorical_column)
-        if data_type_fixes:
-            for column, new_type in data_type_fixes.items():
-                df = self.fix_data_types(df, column, new_type)
-        return df
\ No newline at end of file
+    def clean_data(self, df, missing_value_strategy='mean', outlier_column=None, irrelevant_columns=None, categorical_column=None, data_type_fixes=None, fused=None, infer_types=False, optimize_memory=False, near_duplicates=None, near_duplicate_policy='first'):
+        with stage("rule_cleaning", rows=len(df)):
+            if self.fused if fused is None else fused:
+                plan = CleaningPlan(missing_value_strategy, outlier_column, irrelevant_columns, categorical_column, data_type_fixes, infer_types, optimize_memory,
+                                    near_duplicates, near_duplicate_policy)
+                return plan.execute(df, self)
+            if infer_types:
+                df, _ = self.coerce_types(df)
+            if optimize_memory:
+                df, _ = self.optimize_memory(df)
+            df = self.handle_missing_values(df, strategy=missing_value_strategy)
+            df = self.remove_duplicates(df)
+            #near_duplicates: True for all columns or a list of columns to compare
+            if near_duplicates:
+                columns = None if near_duplicates is True else near_duplicates
+                df = self.remove_near_duplicates(df, columns=columns, policy=near_duplicate_policy)
+            if outlier_column:
+                df = self.remove_outliers(df, column=outlier_column)
+            if irrelevant_columns:
+                df = self.drop_irrelevant_columns(df, columns=irrelevant_columns)
+            if categorical_column:
+                sparse = optimize_memory and self.memory_optimizer.use_sparse(df[categorical_column])
+                df = self.encode_categorical_variables(df, column=categorical_column, sparse=sparse)
+            if data_type_fixes:
+                for column, new_type in data_type_fixes.items():
+                    df = self.fix_data_types(df, column, new_type)
+            return df
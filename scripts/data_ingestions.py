@@ -1,14 +1,15 @@
 import os
 import pandas as pd
 import requests
-from sqlalchemy import create_engine
-import openpyxl
+
+from scripts.db_pool import engine_pool
 
 dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
 
 class DataIngestion:
     def __init__(self, db_url = None):
-        self.engine = create_engine(db_url) if db_url else None
+        self.db_url = db_url
+        self.engine = engine_pool.get(db_url) if db_url else None
 
     def ingest_csv(self, file_path):
         file_path = os.path.join(dir, file_path)
@@ -30,9 +31,104 @@ class DataIngestion:
             print(f"Error ingesting data from {file_path}: {e}")
             return None
 
+    #Read a CSV in chunks of chunksize rows (path under data/ or an open file object)
+    def iter_csv_chunks(self, source, chunksize=50000):
+        if isinstance(source, str):
+            source = os.path.join(dir, source)
+        return pd.read_csv(source, chunksize=chunksize)
+
+    #Callable returning a fresh chunk iterator over a CSV each time it is called, the chunk_factory
+    #OutOfCoreCleaner reads its two passes from, so a file larger than memory is never loaded whole
+    def csv_chunk_factory(self, source, chunksize=500000):
+        return lambda: self.iter_csv_chunks(source, chunksize=chunksize)
+
+    #Stream an .xlsx sheet with openpyxl's read-only mode, chunksize rows at a time
+    def iter_excel_chunks(self, source, chunksize=50000, sheet_name=0):
+        if isinstance(source, str):
+            source = os.path.join(dir, source)
+        import openpyxl  # deferred: only needed for .xlsx uploads
+        workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+        try:
+            sheet = workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) == chunksize:
+                    yield pd.DataFrame(batch, columns=header)
+                    batch = []
+            if batch:
+                yield pd.DataFrame(batch, columns=header)
+        finally:
+            workbook.close()
+
+    #Columns to load: all in the file schema except exclude_columns (never read from disk)
+    @staticmethod
+    def _project(schema_names, columns=None, exclude_columns=None):
+        names = list(columns) if columns else list(schema_names)
+        if exclude_columns:
+            names = [name for name in names if name not in set(exclude_columns)]
+        return names
+
+    #Parquet is memory-mapped and only the projected columns are read
+    def load_parquet(self, file_name, columns=None, exclude_columns=None):
+        file_path = os.path.join(dir, file_name)
+        import pyarrow.parquet as pq  # deferred: only needed for Parquet sources
+        try:
+            parquet_file = pq.ParquetFile(file_path, memory_map=True)
+            names = self._project(parquet_file.schema_arrow.names, columns, exclude_columns)
+            df = parquet_file.read(columns=names).to_pandas()
+            print(f"Successfully ingested data from {file_path}")
+            return df
+        except Exception as e:
+            print(f"Error ingesting data from {file_path}: {e}")
+            return None
+
+    #Uncompressed Feather/Arrow IPC files map straight into memory without copying
+    def load_feather(self, file_name, columns=None, exclude_columns=None):
+        file_path = os.path.join(dir, file_name)
+        import pyarrow.feather as feather  # deferred: only needed for Feather/Arrow sources
+        try:
+            table = feather.read_table(file_path, memory_map=True)
+            names = self._project(table.schema.names, columns, exclude_columns)
+            df = table.select(names).to_pandas()
+            print(f"Successfully ingested data from {file_path}")
+            return df
+        except Exception as e:
+            print(f"Error ingesting data from {file_path}: {e}")
+            return None
+
+    #Stream a Parquet file row group by row group, batch_size rows at a time
+    def iter_parquet_batches(self, source, batch_size=50000, columns=None, exclude_columns=None):
+        if isinstance(source, str):
+            source = os.path.join(dir, source)
+        import pyarrow.parquet as pq  # deferred: only needed for Parquet sources
+        parquet_file = pq.ParquetFile(source, memory_map=isinstance(source, str))
+        names = self._project(parquet_file.schema_arrow.names, columns, exclude_columns)
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=names):
+            yield batch.to_pandas()
+
+    #Stream the record batches of a Feather/Arrow IPC file
+    def iter_feather_batches(self, source, batch_size=50000, columns=None, exclude_columns=None):
+        import pyarrow as pa  # deferred: only needed for Feather/Arrow sources
+        if isinstance(source, str):
+            source = pa.memory_map(os.path.join(dir, source))
+        elif not isinstance(source, pa.NativeFile):
+            source = pa.PythonFile(source, mode="r")
+        reader = pa.ipc.open_file(source)
+        names = self._project(reader.schema.names, columns, exclude_columns)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i).select(names)
+            for start in range(0, batch.num_rows, batch_size):
+                yield batch.slice(start, batch_size).to_pandas()
+
     def connect_db(self, db_url):
         try:
-            self.engine = create_engine(db_url)
+            self.engine = engine_pool.get(db_url)
+            self.db_url = db_url
             print(f"Successfully connected to database at {db_url}")
         except Exception as e:
             print(f"Error connecting to database at {db_url}: {e}")
@@ -50,6 +146,13 @@ class DataIngestion:
             print(f"Error loading data from database with query: {query}: {e}")
             return None            
         
+    #Stream a query result in chunks of chunksize rows instead of loading it whole
+    def iter_from_db(self, query, chunksize=50000):
+        if not self.engine:
+            print("Database connection not established.")
+            return iter(())
+        return engine_pool.iter_query(self.db_url, query, chunksize=chunksize)
+
     def fetch_api_data(self, url, params=None):
       try:
         response = requests.get(url, params=params)
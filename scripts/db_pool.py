@@ -0,0 +1,82 @@
+import time
+import threading
+
+import pandas as pd
+
+
+class EnginePool:
+    """One SQLAlchemy engine (and connection pool) per database URL.
+
+    Engines are created on first use with bounded pool limits, reused by
+    every later request for the same URL, and disposed once they have been
+    idle for ``idle_timeout`` seconds, or least recently used first when a
+    new URL would take the count past ``max_engines``.
+    """
+
+    def __init__(self, pool_size=5, max_overflow=10, pool_recycle=1800, idle_timeout=600, max_engines=16):
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_recycle = pool_recycle
+        self.idle_timeout = idle_timeout
+        self.max_engines = max_engines
+        self._engines = {}
+        self._last_used = {}
+        self._lock = threading.Lock()
+
+    def get(self, db_url):
+        with self._lock:
+            self._evict_idle(db_url)
+            engine = self._engines.get(db_url)
+            if engine is None:
+                engine = self._create(db_url)
+                self._engines[db_url] = engine
+            self._last_used[db_url] = time.monotonic()
+            return engine
+
+    def _create(self, db_url):
+        from sqlalchemy import create_engine  # deferred: sqlalchemy is only needed once a database is used
+        # SQLite uses its own single-file pools that take no size limits
+        if db_url.startswith("sqlite"):
+            return create_engine(db_url)
+        return create_engine(
+            db_url,
+            pool_size=self.pool_size,
+            max_overflow=self.max_overflow,
+            pool_recycle=self.pool_recycle,
+            pool_pre_ping=True,
+        )
+
+    #Dispose engines idle for too long, then the least recently used while a new engine for
+    #requested_url would exceed max_engines; the requested URL's own engine is never evicted
+    def _evict_idle(self, requested_url):
+        now = time.monotonic()
+        by_age = sorted(self._last_used.items(), key=lambda item: item[1])
+        open_engines = len(by_age)
+        for db_url, last_used in by_age:
+            if db_url == requested_url:
+                continue
+            over_limit = requested_url not in self._engines and open_engines >= self.max_engines
+            if now - last_used > self.idle_timeout or over_limit:
+                self._engines.pop(db_url).dispose()
+                del self._last_used[db_url]
+                open_engines -= 1
+
+    def dispose_all(self):
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+            self._last_used.clear()
+
+    #Stream a query result chunksize rows at a time through a server-side cursor
+    def iter_query(self, db_url, query, chunksize=50000):
+        from sqlalchemy import text
+        engine = self.get(db_url)
+        with engine.connect() as connection:
+            connection = connection.execution_options(stream_results=True, max_row_buffer=chunksize)
+            for chunk in pd.read_sql(text(query), connection, chunksize=chunksize):
+                yield chunk
+
+
+# Shared by DataIngestion and the backend so every caller reuses the same pools
+engine_pool = EnginePool()
@@ -0,0 +1,244 @@
+import os
+import json
+import time
+import sqlite3
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from scripts.data_cleaning import DataCleaning
+from scripts.out_of_core import QuantileSketch
+from scripts.arrow_io import write_dataframe
+
+dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+
+class IncrementalCleaner:
+    """Clean only the rows of a source that are new or changed since the last run.
+
+    For every ``source_id`` it keeps in SQLite a watermark (the largest value
+    of ``watermark_column`` seen), one fingerprint per row key, and the
+    running statistics used for imputation and outlier bounds (counts, sums,
+    quantile sketches, value counts). A run hashes the incoming rows, cleans
+    the delta with the global statistics, optionally passes it through
+    ``ai_stage``, and writes it as one new Parquet part file, so the cost of
+    a run follows the size of its delta rather than of the history.
+
+    Each fingerprint records the part holding the row's current version;
+    ``load_output`` shows only those, so older versions of changed rows drop
+    out without rewriting earlier parts. A part file is written before the
+    state that refers to it is committed (in one transaction), so a run
+    that fails halfway leaves the previous output and state in place.
+    ``compact`` folds all parts into one when they pile up.
+
+    Without ``key_columns`` rows are identified by their contents, so an
+    edited row shows up as a new one. Statistics only ever accumulate: a
+    changed row adds its new values but the old ones are not subtracted.
+    """
+
+    def __init__(self, state_path=None, output_dir=None, sketch_size=20000):
+        self.state_path = state_path or os.path.join(dir, 'incremental.sqlite')
+        self.output_dir = output_dir or os.path.join(dir, 'incremental')
+        self.sketch_size = sketch_size
+        self.data_cleaning = DataCleaning()
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._conn = sqlite3.connect(self.state_path)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS sources ("
+            "source_id TEXT PRIMARY KEY, watermark TEXT, stats TEXT NOT NULL, parts INTEGER NOT NULL DEFAULT 0, "
+            "updated_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS fingerprints ("
+            "source_id TEXT NOT NULL, row_key TEXT NOT NULL, row_hash TEXT NOT NULL, part INTEGER NOT NULL, "
+            "PRIMARY KEY (source_id, row_key));"
+        )
+        self._conn.commit()
+
+    #Largest watermark value cleaned so far, e.g. to filter the next query at the source
+    def get_watermark(self, source_id):
+        row = self._conn.execute("SELECT watermark FROM sources WHERE source_id = ?", (source_id,)).fetchone()
+        stored = json.loads(row[0]) if row and row[0] is not None else None
+        return self._decode_watermark(stored) if stored is not None else None
+
+    def part_path(self, source_id, part):
+        return os.path.join(self.output_dir, source_id, f"part-{part:05d}.parquet")
+
+    #The current cleaned output: every row's latest version, read from all committed parts
+    def load_output(self, source_id):
+        output = self._current_rows(source_id)
+        return output.drop(columns="_row_key") if output is not None else None
+
+    #Rewrite the current output as one new part and delete the older ones
+    def compact(self, source_id):
+        parts = self._parts(source_id)
+        output = self._current_rows(source_id, parts)
+        if output is None:
+            return
+        self._write_part(source_id, parts + 1, output)
+        with self._conn:
+            self._conn.execute("UPDATE fingerprints SET part = ? WHERE source_id = ?", (parts + 1, source_id))
+            self._conn.execute("UPDATE sources SET parts = ? WHERE source_id = ?", (parts + 1, source_id))
+        for part in range(1, parts + 1):
+            if os.path.exists(self.part_path(source_id, part)):
+                os.remove(self.part_path(source_id, part))
+
+    #Cleans the new and changed rows and returns them; load_output has the full result
+    def run(self, source_id, df, key_columns=None, watermark_column=None, missing_value_strategy='mean', outlier_column=None, ai_stage=None):
+        watermark = self.get_watermark(source_id)
+        if watermark_column and watermark is not None:
+            df = df[df[watermark_column] > watermark]
+
+        delta = self._changed_rows(source_id, df, key_columns)
+        stats = self._update_statistics(self._load_statistics(source_id), delta, outlier_column)
+        cleaned = self._clean_delta(delta, stats, missing_value_strategy, outlier_column)
+        if ai_stage is not None and len(cleaned):
+            # ai_stage must return one row per input row, in order (e.g. AIAgent.clean_anomalies)
+            row_keys = cleaned["_row_key"].to_numpy()
+            cleaned = ai_stage(cleaned.drop(columns="_row_key")).assign(_row_key=row_keys)
+
+        new_watermark = watermark
+        if watermark_column and len(df):
+            new_watermark = df[watermark_column].max()
+            new_watermark = new_watermark if watermark is None else max(new_watermark, watermark)
+
+        part = self._parts(source_id)
+        if len(delta):
+            # Written first but only visible once the state below commits; a failed run's part is overwritten by the next
+            part += 1
+            self._write_part(source_id, part, cleaned.reset_index(drop=True))
+        self._save_state(source_id, delta, stats, new_watermark, part)
+        print(f"Incremental run for {source_id}: {len(df)} rows read, {len(delta)} new or changed, {len(cleaned)} cleaned")
+        return cleaned.drop(columns="_row_key").reset_index(drop=True)
+
+    #Rows whose key is unseen or whose contents hash changed
+    def _changed_rows(self, source_id, df, key_columns):
+        row_hash = pd.util.hash_pandas_object(df, index=False).astype(str)
+        row_key = pd.util.hash_pandas_object(df[key_columns], index=False).astype(str) if key_columns else row_hash
+        previous = row_key.map(self._known_hashes(source_id, row_key.unique().tolist()))
+        changed = (previous != row_hash).to_numpy()
+        delta = df[changed].assign(_row_key=row_key[changed].to_numpy(), _row_hash=row_hash[changed].to_numpy())
+        # The last version of a key wins within one run
+        return delta.drop_duplicates(subset="_row_key", keep="last")
+
+    #Stored hash per incoming key, looked up through the primary key index a chunk of keys at a time,
+    #so a run reads only the fingerprints of its own rows, not the source's whole history
+    def _known_hashes(self, source_id, keys, chunk_size=500):
+        known = {}
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start:start + chunk_size]
+            known.update(self._conn.execute(
+                f"SELECT row_key, row_hash FROM fingerprints WHERE source_id = ? AND row_key IN ({','.join('?' * len(chunk))})",
+                (source_id, *chunk),
+            ))
+        return known
+
+    def _load_statistics(self, source_id):
+        row = self._conn.execute("SELECT stats FROM sources WHERE source_id = ?", (source_id,)).fetchone()
+        return json.loads(row[0]) if row else {"columns": {}, "value_counts": {}}
+
+    #Fold the delta into the running counts, sums, sketches and value counts
+    def _update_statistics(self, stats, delta, outlier_column):
+        data = delta.drop(columns=["_row_key", "_row_hash"])
+        for column in data.select_dtypes(include=["number"]).columns:
+            entry = stats["columns"].setdefault(column, {"count": 0, "sum": 0.0, "sketch": None})
+            values = data[column]
+            entry["count"] += int(values.count())
+            entry["sum"] += float(values.sum())
+            sketch = QuantileSketch.from_dict(entry["sketch"]) if entry["sketch"] else QuantileSketch(self.sketch_size)
+            sketch.update(values.to_numpy())
+            entry["sketch"] = sketch.to_dict()
+        for column in data.columns:
+            counts = pd.Series(stats["value_counts"].get(column, {}), dtype="float64")
+            counts = counts.add(data[column].astype(str).value_counts(), fill_value=0).nlargest(1000)
+            stats["value_counts"][column] = counts.to_dict()
+        return stats
+
+    def _fill_values(self, stats, data, strategy):
+        fill_values = {}
+        for column, entry in stats["columns"].items():
+            if strategy == "mean" and entry["count"]:
+                fill_values[column] = entry["sum"] / entry["count"]
+            elif strategy == "median" and entry["sketch"]:
+                fill_values[column] = QuantileSketch.from_dict(entry["sketch"]).quantile(0.5)
+        if strategy == "mode":
+            for column, counts in stats["value_counts"].items():
+                if counts and column in data:
+                    # Counts are kept by string value; map back to the column's own values
+                    by_text = {str(v): v for v in data[column].dropna().unique()}
+                    candidates = [value for value in sorted(counts, key=counts.get, reverse=True) if value in by_text]
+                    if candidates:
+                        fill_values[column] = by_text[candidates[0]]
+        return fill_values
+
+    #Same steps as DataCleaning.clean_data, using the global statistics
+    def _clean_delta(self, delta, stats, strategy, outlier_column):
+        data = delta
+        if strategy in ("mean", "median", "mode"):
+            data = data.fillna(self._fill_values(stats, delta, strategy))
+        else:
+            data = data.dropna()
+        data = data.drop_duplicates(subset=[c for c in data.columns if c not in ("_row_key", "_row_hash")])
+        if outlier_column and outlier_column in stats["columns"]:
+            sketch = QuantileSketch.from_dict(stats["columns"][outlier_column]["sketch"])
+            Q1, Q3 = sketch.quantile(0.25), sketch.quantile(0.75)
+            IQR = Q3 - Q1
+            data = data[(data[outlier_column] >= Q1 - 1.5 * IQR) & (data[outlier_column] <= Q3 + 1.5 * IQR)]
+        return data.drop(columns="_row_hash")
+
+    #Number of committed parts for the source
+    def _parts(self, source_id):
+        row = self._conn.execute("SELECT parts FROM sources WHERE source_id = ?", (source_id,)).fetchone()
+        return row[0] if row else 0
+
+    def _write_part(self, source_id, part, df):
+        path = self.part_path(source_id, part)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_dataframe(df, path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+    #Rows (with _row_key) whose fingerprint points at the part they are stored in
+    def _current_rows(self, source_id, parts=None):
+        parts = self._parts(source_id) if parts is None else parts
+        current = pd.read_sql(
+            "SELECT row_key, part FROM fingerprints WHERE source_id = ?", self._conn, params=(source_id,)
+        ).set_index("row_key")["part"]
+        frames = []
+        for part in range(1, parts + 1):
+            path = self.part_path(source_id, part)
+            if os.path.exists(path):
+                frame = pd.read_parquet(path)
+                frames.append(frame[(frame["_row_key"].map(current) == part).to_numpy()])
+        return pd.concat(frames, ignore_index=True) if frames else None
+
+    #Fingerprints, statistics, watermark and part count in one transaction
+    def _save_state(self, source_id, delta, stats, watermark, parts):
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO fingerprints (source_id, row_key, row_hash, part) VALUES (?, ?, ?, ?)",
+                zip([source_id] * len(delta), delta["_row_key"], delta["_row_hash"], [parts] * len(delta)),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sources (source_id, watermark, stats, parts, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (source_id, json.dumps(self._encode_watermark(watermark)), json.dumps(stats), parts, time.time()),
+            )
+
+    #Watermarks keep their type across runs: timestamps and dates as ISO strings tagged with their kind
+    @staticmethod
+    def _encode_watermark(value):
+        if value is None:
+            return None
+        if isinstance(value, (pd.Timestamp, datetime, np.datetime64)):
+            return {"kind": "timestamp", "value": pd.Timestamp(value).isoformat()}
+        if isinstance(value, date):
+            return {"kind": "date", "value": value.isoformat()}
+        if isinstance(value, np.generic):
+            value = value.item()
+        return {"kind": "value", "value": value}
+
+    @staticmethod
+    def _decode_watermark(stored):
+        if stored["kind"] == "timestamp":
+            return pd.Timestamp(stored["value"])
+        if stored["kind"] == "date":
+            return date.fromisoformat(stored["value"])
+        return stored["value"]
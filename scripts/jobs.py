@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts.metrics import track_request, profiled
+
+dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED = "queued", "running", "completed", "failed", "cancelled"
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobContext:
+    """Handle given to a job runner to report progress and observe cancellation or shutdown."""
+
+    def __init__(self, manager, job_id, cancel_event):
+        self.manager = manager
+        self.job_id = job_id
+        self._cancel_event = cancel_event
+
+    #True once the job should stop: it was cancelled or the manager is shutting down
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set() or self.manager.stopping
+
+    def add_total(self, batches):
+        self.manager._execute("UPDATE jobs SET batches_total = batches_total + ?, updated_at = ? WHERE id = ?",
+                              (batches, time.time(), self.job_id))
+
+
+class JobManager:
+    """Run cleaning jobs on a worker pool and keep their state in SQLite.
+
+    A runner is a callable ``runner(params, input_path, context)`` registered
+    per job kind that yields one ``(DataFrame, result)`` pair per cleaned
+    batch. Every batch is stored as soon as it is produced, so progress and
+    partial results can be read while the job runs. Jobs that were queued or
+    running when the process stopped, whether it crashed or ``shutdown`` was
+    called, keep their status and input and are started again by ``resume``.
+    """
+
+    def __init__(self, path=None, max_workers=2, to_records=None):
+        self.path = path or os.path.join(dir, 'jobs.sqlite')
+        self.inputs_dir = os.path.join(os.path.dirname(os.path.abspath(self.path)), 'job_inputs')
+        os.makedirs(self.inputs_dir, exist_ok=True)
+        self.to_records = to_records or (lambda df: df.to_dict(orient='records'))
+        self.runners = {}
+        self._cancel_events = {}
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cleaning-job")
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, params TEXT NOT NULL, "
+            "input_path TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL, "
+            "batches_done INTEGER NOT NULL DEFAULT 0, batches_total INTEGER NOT NULL DEFAULT 0, error TEXT);"
+            "CREATE TABLE IF NOT EXISTS job_results ("
+            "job_id TEXT NOT NULL, batch INTEGER NOT NULL, result TEXT NOT NULL, PRIMARY KEY (job_id, batch));"
+            "CREATE TABLE IF NOT EXISTS job_reports (job_id TEXT PRIMARY KEY, report TEXT NOT NULL);"
+        )
+        self._conn.commit()
+
+    def register(self, kind, runner):
+        self.runners[kind] = runner
+
+    #Create a job; input_file is an open file copied to disk so the job survives a restart
+    def submit(self, kind, params, input_file=None, filename=None):
+        if kind not in self.runners:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        job_id = uuid.uuid4().hex
+        input_path = None
+        if input_file is not None:
+            input_path = os.path.join(self.inputs_dir, job_id + os.path.splitext(filename or "")[1].lower())
+            with open(input_path, "wb") as target:
+                shutil.copyfileobj(input_file, target)
+        now = time.time()
+        self._execute(
+            "INSERT INTO jobs (id, kind, status, params, input_path, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, QUEUED, json.dumps(params), input_path, now, now),
+        )
+        self._start(job_id)
+        return job_id
+
+    #Restart jobs left queued or running by a previous process
+    def resume(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT id FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)).fetchall()
+        for (job_id,) in rows:
+            self._execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+            self._execute("DELETE FROM job_reports WHERE job_id = ?", (job_id,))
+            self._execute("UPDATE jobs SET status = ?, batches_done = 0, batches_total = 0, updated_at = ? WHERE id = ?",
+                          (QUEUED, time.time(), job_id))
+            self._start(job_id)
+        return [job_id for (job_id,) in rows]
+
+    def status(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, status, created_at, updated_at, batches_done, batches_total, error FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ["job_id", "kind", "status", "created_at", "updated_at", "batches_done", "batches_total", "error"]
+        return dict(zip(keys, row))
+
+    #Stage timing breakdown (and profile, if one was requested) of a finished job
+    def report(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT report FROM job_reports WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    #Batches stored so far, starting at batch number offset
+    def results(self, job_id, offset=0):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT result FROM job_results WHERE job_id = ? AND batch >= ? ORDER BY batch", (job_id, offset)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def cancel(self, job_id):
+        status = self.status(job_id)
+        if status is None or status["status"] in (COMPLETED, FAILED, CANCELLED):
+            return status
+        event = self._cancel_events.get(job_id)
+        if event is not None:
+            event.set()
+        self._set_status(job_id, CANCELLED)
+        if status["status"] == QUEUED:
+            #A running job removes its own input when it stops; a queued one never gets there
+            self._remove_input(job_id)
+        return self.status(job_id)
+
+    @property
+    def stopping(self):
+        return self._stopping.is_set()
+
+    #Stop taking work; running jobs stop at their next batch and stay queued or running for resume()
+    def shutdown(self):
+        self._stopping.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _start(self, job_id):
+        event = threading.Event()
+        self._cancel_events[job_id] = event
+        self._executor.submit(self._run, job_id, event)
+
+    def _run(self, job_id, cancel_event):
+        with self._lock:
+            kind, params, input_path, status = self._conn.execute(
+                "SELECT kind, params, input_path, status FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if status != QUEUED or cancel_event.is_set() or self.stopping:
+            if status == CANCELLED:
+                self._remove_input(job_id)
+            return
+        self._set_status(job_id, RUNNING)
+        context = JobContext(self, job_id, cancel_event)
+        params = json.loads(params)
+        outcome, error = COMPLETED, None
+        #Stage timings are always kept; a cProfile/tracemalloc capture only when params ask for one
+        with track_request() as timings, profiled(params.get("profile")) as profile:
+            try:
+                batches = self.runners[kind](params, input_path, context)
+                try:
+                    for batch, (ai_cleaned_df, ai_result) in enumerate(batches):
+                        if context.cancelled:
+                            raise JobCancelled()
+                        result = {
+                            "issues_found": ai_result.get("issues_found", []),
+                            "cleaning_strategy": ai_result.get("cleaning_strategy", []),
+                            "cleaned_data": self.to_records(ai_cleaned_df),
+                        }
+                        self._execute("INSERT OR REPLACE INTO job_results (job_id, batch, result) VALUES (?, ?, ?)",
+                                      (job_id, batch, json.dumps(result, default=str)))
+                        self._execute("UPDATE jobs SET batches_done = batches_done + 1, "
+                                      "batches_total = MAX(batches_total, batches_done + 1), updated_at = ? WHERE id = ?",
+                                      (time.time(), job_id))
+                finally:
+                    close = getattr(batches, "close", None)
+                    if close:
+                        close()
+            except JobCancelled:
+                outcome = CANCELLED
+            except Exception as e:
+                outcome, error = FAILED, str(e)
+            finally:
+                self._cancel_events.pop(job_id, None)
+        if cancel_event.is_set():
+            outcome = CANCELLED
+        elif self.stopping:
+            #Interrupted by shutdown: left running, with its input, for resume() in the next process
+            return
+        self._set_status(job_id, outcome, error=error)
+        self._remove_input(job_id)
+        report = {"timings": timings.breakdown()}
+        if profile:
+            report["profile"] = profile
+        self._execute("INSERT OR REPLACE INTO job_reports (job_id, report) VALUES (?, ?)", (job_id, json.dumps(report)))
+
+    #Delete a job's copied upload, if it has one left
+    def _remove_input(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT input_path FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        input_path = row[0] if row else None
+        if input_path:
+            try:
+                os.remove(input_path)
+            except FileNotFoundError:
+                pass  # already removed, by cancel() or _run()
+
+    def _set_status(self, job_id, status, error=None):
+        self._execute("UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                      (status, error, time.time(), job_id))
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            self._conn.execute(sql, params)
+            self._conn.commit()
@@ -0,0 +1,94 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+
+class LLMCache:
+    """SQLite-backed cache of parsed LLM responses, keyed by batch content.
+
+    Entries expire after ``ttl`` seconds and the least recently used ones are
+    evicted once the cache holds more than ``max_entries`` rows.
+    """
+
+    def __init__(self, path=None, max_entries=10000, ttl=7 * 24 * 3600):
+        self.path = path or os.path.join(dir, 'llm_cache.sqlite')
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._conn.commit()
+
+    #Hash of model, prompt version and the batch contents (index and cell padding ignored)
+    @staticmethod
+    def make_key(model, prompt_version, batch_df, context_df=None):
+        contents = batch_df.to_json(orient="split", index=False, date_format="iso")
+        context = context_df.to_json(orient="split", index=False, date_format="iso") if context_df is not None else None
+        payload = json.dumps([model, prompt_version, contents, context])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.ttl and now - row[1] > self.ttl):
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, default=str), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    #Drop expired rows, then the least recently used ones above max_entries
+    def _evict(self):
+        if self.ttl:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+        if self.max_entries:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
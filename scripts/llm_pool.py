@@ -0,0 +1,278 @@
+import os
+import time
+import threading
+
+from scripts.metrics import metrics
+
+# How a call ended, as far as routing is concerned (also the result label of llm_endpoint_requests_total)
+OK, FAILED, MODEL_MISSING, REJECTED = "ok", "error", "model_missing", "rejected"
+
+
+class OllamaEndpoint:
+    """One Ollama server in a pool, with its reusable client and routing state."""
+
+    def __init__(self, host, max_concurrency):
+        self.host = host
+        self.max_concurrency = max_concurrency
+        self.client = None  # keep-alive HTTP client, created when the pool starts
+        self.probe = None  # short-timeout client for health checks
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0  # consecutive
+        self.ejected_until = 0.0
+        self.models = set()  # models last seen loaded on the server
+        self.missing = set()  # models the server answered "not found" for
+
+    def ejected(self, now=None):
+        return self.ejected_until > (time.monotonic() if now is None else now)
+
+    def stats(self):
+        return {
+            "host": self.host,
+            "outstanding": self.outstanding,
+            "max_concurrency": self.max_concurrency,
+            "requests": self.requests,
+            "failures": self.failures,
+            "healthy": not self.ejected(),
+            "models": sorted(self.models),
+            "missing": sorted(self.missing),
+        }
+
+
+class OllamaPool:
+    """Route chat calls over several Ollama servers with least-outstanding-requests balancing.
+
+    A drop-in for ``ollama.chat``. Each call goes to the endpoint with the
+    fewest requests in flight relative to its limit, preferring one that
+    already has the model loaded, and waits while every endpoint is at
+    ``max_concurrency``. An endpoint is ejected for ``eject_seconds`` after
+    ``failure_threshold`` consecutive connection errors, timeouts or 5xx
+    responses, and the failed call is retried on another endpoint. A server
+    that answers 404 for the model is not counted as failing, but is marked
+    as missing that model, avoided for it while others have a free slot,
+    and the call is retried elsewhere. A background thread polls
+    every endpoint's loaded models every ``health_interval`` seconds,
+    ejecting endpoints that do not answer and readmitting ones that
+    recover. Every call passes ``keep_alive`` so models stay resident
+    between batches.
+
+    Each endpoint keeps one ``ollama.Client``, and with it a keep-alive
+    connection pool, for the life of the pool. Streaming calls hold their
+    endpoint slot until the stream is exhausted or closed; they fail over
+    only until their first chunk arrives.
+    """
+
+    def __init__(self, hosts, max_concurrency=2, keep_alive="30m", failure_threshold=3, eject_seconds=30.0,
+                 health_interval=10.0, timeout=None, probe_timeout=2.0):
+        if not hosts:
+            raise ValueError("OllamaPool needs at least one host")
+        # hosts: URLs, or (url, max_concurrency) pairs for per-endpoint limits
+        self.endpoints = [OllamaEndpoint(*host) if isinstance(host, (tuple, list)) else OllamaEndpoint(host, max_concurrency)
+                          for host in hosts]
+        self.keep_alive = keep_alive
+        self.failure_threshold = failure_threshold
+        self.eject_seconds = eject_seconds
+        self.health_interval = health_interval
+        self.timeout = timeout
+        self.probe_timeout = probe_timeout
+        self._condition = threading.Condition()
+        self._started = False
+        self._stop = threading.Event()
+        self._health_thread = None
+
+    #Pool from OLLAMA_HOSTS ("http://gpu1:11434=4,http://gpu2:11434", =N sets that endpoint's limit), or None when unset
+    @classmethod
+    def from_env(cls):
+        hosts = [host.strip() for host in os.getenv("OLLAMA_HOSTS", "").split(",") if host.strip()]
+        if not hosts:
+            return None
+        default_limit = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))
+        parsed = []
+        for host in hosts:
+            url, _, limit = host.rpartition("=")
+            parsed.append((url, int(limit)) if url and limit.isdigit() else (host, default_limit))
+        return cls(parsed, keep_alive=os.getenv("MODEL_KEEP_ALIVE", "30m"),
+                   health_interval=float(os.getenv("OLLAMA_HEALTH_INTERVAL", "10")))
+
+    @property
+    def capacity(self):
+        return sum(endpoint.max_concurrency for endpoint in self.endpoints)
+
+    def chat(self, model=None, messages=None, stream=False, **kwargs):
+        kwargs.setdefault("keep_alive", self.keep_alive)
+        if stream:
+            return self._chat_stream(model, messages, kwargs)
+        tried, last_error = [], None
+        while True:
+            endpoint = self._acquire(model, tried)
+            if endpoint is None:
+                raise last_error
+            try:
+                response = endpoint.client.chat(model=model, messages=messages, **kwargs)
+            except Exception as e:
+                outcome = self._outcome(e)
+                self._release(endpoint, model, outcome)
+                if outcome == REJECTED:
+                    raise
+                last_error = e
+                tried.append(endpoint)
+                continue
+            self._release(endpoint, model, OK)
+            return response
+
+    #Fails over like chat until the first chunk arrives; after that errors reach the caller
+    def _chat_stream(self, model, messages, kwargs):
+        tried, last_error = [], None
+        while True:
+            endpoint = self._acquire(model, tried)
+            if endpoint is None:
+                raise last_error
+            chunks = endpoint.client.chat(model=model, messages=messages, stream=True, **kwargs)
+            try:
+                first = next(chunks)
+            except StopIteration:
+                self._release(endpoint, model, OK)
+                return
+            except Exception as e:
+                outcome = self._outcome(e)
+                self._release(endpoint, model, outcome)
+                if outcome == REJECTED:
+                    raise
+                last_error = e
+                tried.append(endpoint)
+                continue
+            break
+
+        outcome = OK
+        try:
+            yield first
+            yield from chunks
+        except Exception as e:
+            outcome = self._outcome(e)
+            raise
+        finally:
+            chunks.close()
+            self._release(endpoint, model, outcome)
+
+    #Load the model on every endpoint that is not ejected; returns host -> "ok" or the error
+    def warm_up(self, model, keep_alive=None):
+        self._start()
+        results = {}
+        for endpoint in self.endpoints:
+            if endpoint.ejected():
+                results[endpoint.host] = "ejected"
+                continue
+            try:
+                # A chat without messages only loads the model
+                endpoint.client.chat(model=model, messages=[], keep_alive=keep_alive or self.keep_alive)
+            except Exception as e:
+                results[endpoint.host] = str(e)
+                continue
+            with self._condition:
+                endpoint.models.add(model)
+                endpoint.missing.discard(model)
+            results[endpoint.host] = "ok"
+        return results
+
+    def stats(self):
+        with self._condition:
+            return [endpoint.stats() for endpoint in self.endpoints]
+
+    def close(self):
+        self._stop.set()
+        if self._health_thread is not None:
+            self._health_thread.join(timeout=self.probe_timeout + 1)
+        for endpoint in self.endpoints:
+            for client in (endpoint.client, endpoint.probe):
+                if client is not None:
+                    client.close()
+
+    #Clients are built and health checks started on first use, so importing ollama stays off the startup path
+    def _start(self):
+        with self._condition:
+            if self._started:
+                return
+            import ollama
+            for endpoint in self.endpoints:
+                endpoint.client = ollama.Client(host=endpoint.host, timeout=self.timeout)
+                endpoint.probe = ollama.Client(host=endpoint.host, timeout=self.probe_timeout)
+            if self.health_interval:
+                self._health_thread = threading.Thread(target=self._health_loop, name="ollama-health", daemon=True)
+                self._health_thread.start()
+            self._started = True
+
+    #Least outstanding requests among endpoints with a free slot (model already loaded breaks ties),
+    #skipping ones known to miss the model while another is free; waits while all are busy, and
+    #falls back to ejected endpoints when no other is left
+    def _acquire(self, model, exclude):
+        self._start()
+        with self._condition:
+            while True:
+                candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude]
+                if not candidates:
+                    return None
+                now = time.monotonic()
+                candidates = [endpoint for endpoint in candidates if not endpoint.ejected(now)] or candidates
+                free = [endpoint for endpoint in candidates if endpoint.outstanding < endpoint.max_concurrency]
+                if free:
+                    endpoint = min(free, key=lambda e: (model in e.missing, e.outstanding / e.max_concurrency,
+                                                        model not in e.models, e.requests))
+                    endpoint.outstanding += 1
+                    endpoint.requests += 1
+                    return endpoint
+                # Released slots notify; the timeout notices ejections running out
+                self._condition.wait(timeout=1.0)
+
+    #outcome: OK, FAILED (counts against the endpoint), MODEL_MISSING or REJECTED (a bad request; neither)
+    def _release(self, endpoint, model, outcome):
+        with self._condition:
+            endpoint.outstanding -= 1
+            if outcome == OK:
+                endpoint.failures = 0
+                endpoint.models.add(model)
+                endpoint.missing.discard(model)
+            elif outcome == MODEL_MISSING:
+                endpoint.models.discard(model)
+                endpoint.missing.add(model)
+            elif outcome == FAILED:
+                self._record_failure(endpoint)
+            self._condition.notify_all()
+        metrics.inc("llm_endpoint_requests_total", endpoint=endpoint.host, result=outcome)
+
+    # Called with the condition held
+    def _record_failure(self, endpoint):
+        endpoint.failures += 1
+        if endpoint.failures >= self.failure_threshold and not endpoint.ejected():
+            endpoint.ejected_until = time.monotonic() + self.eject_seconds
+            endpoint.models.clear()
+            metrics.inc("llm_endpoint_ejections_total", endpoint=endpoint.host)
+
+    #Connection errors, timeouts and server errors count against the endpoint, a 404 means it lacks
+    #the model, and any other error is the request's own fault
+    @staticmethod
+    def _outcome(error):
+        import httpx
+        from ollama import ResponseError
+        if isinstance(error, ResponseError):
+            if error.status_code == 404:
+                return MODEL_MISSING
+            return FAILED if error.status_code >= 500 else REJECTED
+        return FAILED if isinstance(error, (ConnectionError, httpx.TransportError)) else REJECTED
+
+    def _health_loop(self):
+        while not self._stop.wait(self.health_interval):
+            for endpoint in self.endpoints:
+                try:
+                    models = {model.model for model in endpoint.probe.ps().models}
+                except Exception:
+                    with self._condition:
+                        endpoint.failures = max(endpoint.failures, self.failure_threshold - 1)
+                        self._record_failure(endpoint)
+                    continue
+                with self._condition:
+                    if endpoint.ejected():
+                        endpoint.ejected_until = 0.0
+                        endpoint.failures = 0
+                        self._condition.notify_all()
+                    endpoint.models = models
+                    endpoint.missing -= models
@@ -1,6 +1,15 @@
-from data_ingestions import DataIngestion
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
 from data_cleaning import DataCleaning
 from ai_agent import AIAgent
+from llm_cache import LLMCache
+from anomaly_screen import AnomalyScreen
+from incremental import IncrementalCleaner
+from out_of_core import OutOfCoreCleaner
+from data_ingestions import DataIngestion
+from async_ingestion import ingest_sources
 import pandas as pd
 import numpy as np
 
@@ -14,28 +23,58 @@ DB_PASSWORD = "    "
 DB_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
 # Initialize components
-data_ingestion = DataIngestion()
 data_cleaning = DataCleaning()
-ai_agent = AIAgent()
+ai_agent = AIAgent(cache=LLMCache())  # re-runs over unchanged data skip the LLM
+
+# Incremental mode: only rows new or changed since the last run are cleaned and sent to the AI agent
+INCREMENTAL = os.getenv("INCREMENTAL", "0") == "1"
+incremental_cleaner = IncrementalCleaner() if INCREMENTAL else None
+anomaly_screen = AnomalyScreen()
 
-# Load and clean data from CSV
-df_csv = data_ingestion.ingest_csv("../data/sale.csv")
-if df_csv is not None:
+# Out-of-core mode: the CSV is rule-cleaned partition by partition (two passes over the file) and written
+# to data/sale_cleaned.csv, so files larger than memory work; OUT_OF_CORE_CHUNK_SIZE rows are held at a time
+OUT_OF_CORE = os.getenv("OUT_OF_CORE", "0") == "1"
+CSV_PATH = "../data/sale.csv"
+
+# Load every source at once: file and database reads in threads, API pages over one pooled session
+source_config = {
+    "csv": {"type": "csv", "path": CSV_PATH},
+    "excel": {"type": "excel", "path": "../data/country-code.xlsx"},
+    "db": {"type": "db", "db_url": DB_URL, "query": "SELECT * FROM sample_table"},
+    "api": {"type": "api", "url": "https://jsonplaceholder.typicode.com/posts"},
+}
+if OUT_OF_CORE:
+    del source_config["csv"]  # never loaded whole
+sources = ingest_sources(source_config)
+
+# Clean data from CSV
+df_csv = sources.get("csv")
+if OUT_OF_CORE:
+    output_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'sale_cleaned.csv')
+    chunk_factory = DataIngestion().csv_chunk_factory(CSV_PATH, chunksize=int(os.getenv("OUT_OF_CORE_CHUNK_SIZE", "500000")))
+    rows = OutOfCoreCleaner().clean_to_csv(chunk_factory, output_path)
+    print(f"Cleaned CSV out of core: {rows} rows written to {output_path}")
+elif df_csv is not None and INCREMENTAL:
+    print("Data loaded from CSV:", df_csv.head(5))
+    df_csv_new = incremental_cleaner.run("sale_csv", df_csv, ai_stage=lambda df: ai_agent.clean_anomalies(df, anomaly_screen)[0])
+    print("AI Cleaned new or changed rows from CSV: ", df_csv_new.head(5))
+    df_csv_cleaned = incremental_cleaner.load_output("sale_csv")
+elif df_csv is not None:
     print("Data loaded from CSV:", df_csv.head(5))
     df_csv_cleaned = data_cleaning.clean_data(df_csv)
     df_csv_cleaned = ai_agent.clean_data(df_csv_cleaned)
     print("AI Cleaned Data from CSV: ", df_csv_cleaned.head(5))
 
-# Load and clean data from Excel
-df_excel = data_ingestion.load_excel("../data/country-code.xlsx")
+# Clean data from Excel
+df_excel = sources["excel"]
 if df_excel is not None:
     print("Data loaded from Excel:", df_excel.head(5))
     df_excel_cleaned = data_cleaning.clean_data(df_excel)
     df_excel_cleaned = ai_agent.clean_data(df_excel_cleaned)
     print("AI Cleaned Data from Excel: ", df_excel_cleaned.head(5))
 
-# Load and clean data from Database
-df_db = data_ingestion.load_from_db("SELECT * FROM sample_table")
+# Clean data from Database
+df_db = sources["db"]
 if df_db is not None:
     print("Data loaded from Database:", df_db.head(5))
     df_db_cleaned = data_cleaning.clean_data(df_db)
@@ -45,9 +84,8 @@ if df_db is not None:
 
 #Fetch and clean data from API
 
-#Fetch Api data
-api_url = "https://jsonplaceholder.typicode.com/posts"
-df_api = data_ingestion.fetch_api_data(api_url)
+#Fetched Api data
+df_api = sources["api"]
 
 if df_api is not None:
     print("Data loaded from API:", df_api.head())
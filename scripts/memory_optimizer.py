@@ -0,0 +1,82 @@
+from importlib.util import find_spec
+
+import numpy as np
+import pandas as pd
+
+# pyarrow backs the "string[pyarrow]" dtype; only check that it is installed, pandas imports it when first used
+ARROW_STRINGS = find_spec("pyarrow") is not None
+
+
+class MemoryOptimizer:
+    """Shrink a DataFrame's in-memory footprint without changing its values.
+
+    String columns whose distinct values make up at most
+    ``max_category_share`` of the rows become ``category``, the remaining
+    strings become Arrow-backed ``string[pyarrow]`` (when pyarrow is
+    installed), integers are downcast to the smallest signed or unsigned
+    dtype and floats to float32 when every value survives the round trip.
+    Dummy columns for categoricals with more than ``sparse_threshold``
+    levels are emitted as sparse columns.
+    """
+
+    def __init__(self, max_category_share=0.5, arrow_strings=True, downcast_floats=True, sparse_threshold=50):
+        self.max_category_share = max_category_share
+        self.arrow_strings = arrow_strings and ARROW_STRINGS
+        self.downcast_floats = downcast_floats
+        self.sparse_threshold = sparse_threshold
+
+    @staticmethod
+    def memory_usage(df):
+        return int(df.memory_usage(index=True, deep=True).sum())
+
+    #Optimized copy of df and a before/after report
+    def optimize(self, df):
+        before = self.memory_usage(df)
+        df = df.copy()
+        columns = {}
+        for column in df.columns:
+            series = df[column]
+            optimized = self.optimize_column(series)
+            if optimized.dtype != series.dtype:
+                columns[column] = {"from": str(series.dtype), "to": str(optimized.dtype)}
+                df[column] = optimized
+        after = self.memory_usage(df)
+        report = {"before_bytes": before, "after_bytes": after, "saved_bytes": before - after, "columns": columns}
+        return df, report
+
+    def optimize_column(self, series):
+        if pd.api.types.is_bool_dtype(series) or isinstance(series.dtype, (pd.CategoricalDtype, pd.SparseDtype)):
+            return series
+        if pd.api.types.is_integer_dtype(series):
+            return self._downcast_integers(series)
+        if pd.api.types.is_float_dtype(series):
+            return self._downcast_floats(series)
+        if pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            # Only pure string columns; mixed objects are left for the type coercion step
+            if pd.api.types.infer_dtype(series, skipna=True) != "string":
+                return series
+            values = series.dropna()
+            if len(values) and values.nunique() <= len(series) * self.max_category_share:
+                return series.astype("category")
+            if self.arrow_strings:
+                return series.astype("string[pyarrow]")
+        return series
+
+    #Dummies for a categorical column with more levels than sparse_threshold hold mostly zeros
+    def use_sparse(self, series):
+        return series.nunique() > self.sparse_threshold
+
+    def _downcast_integers(self, series):
+        if series.hasnans:
+            return series  # nullable integers keep their dtype
+        if len(series) and series.min() >= 0:
+            return pd.to_numeric(series, downcast="unsigned")
+        return pd.to_numeric(series, downcast="integer")
+
+    def _downcast_floats(self, series):
+        if not self.downcast_floats or series.dtype == np.float32:
+            return series
+        narrow = series.astype(np.float32)
+        if np.array_equal(narrow.to_numpy(np.float64), series.to_numpy(np.float64), equal_nan=True):
+            return narrow
+        return series
@@ -0,0 +1,243 @@
+import io
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import contextvars
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+PREFIX = "datacleaning_"
+
+HELP = {
+    "stage_seconds_total": "Time spent in each pipeline stage.",
+    "stage_calls_total": "Number of times each pipeline stage ran.",
+    "stage_rows_total": "Rows processed by each pipeline stage.",
+    "stage_bytes_total": "Bytes processed by each pipeline stage.",
+    "llm_tokens_total": "LLM tokens by direction (prompt or completion).",
+    "llm_cache_requests_total": "LLM cache lookups by result (hit or miss).",
+    "http_requests_total": "HTTP requests by route and status code.",
+    "memory_saved_bytes_total": "Bytes saved by the memory optimizer (deep memory usage before minus after).",
+    "llm_records_total": "Structured-mode cleaned_data records by result (valid, invalid, retried or unchanged).",
+    "llm_early_stops_total": "Structured-mode generations stopped early because the output turned malformed.",
+    "llm_endpoint_requests_total": "LLM calls per Ollama endpoint by result (ok, error, model_missing or rejected).",
+    "llm_endpoint_ejections_total": "Times an Ollama endpoint was taken out of rotation after failing.",
+    "type_coercion_cells_total": "Cells fix_data_types could not convert (failed, now missing) or rounded to an integer.",
+}
+
+
+class Metrics:
+    """Process-wide counters rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe_stage(self, stage, seconds, rows=None, nbytes=None):
+        self.inc("stage_seconds_total", seconds, stage=stage)
+        self.inc("stage_calls_total", stage=stage)
+        if rows is not None:
+            self.inc("stage_rows_total", rows, stage=stage)
+        if nbytes is not None:
+            self.inc("stage_bytes_total", nbytes, stage=stage)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+
+    #gauges maps name -> value (or -> {labels tuple: value}) for values read at scrape time
+    def render(self, gauges=None):
+        by_name = {}
+        for (name, labels), value in sorted(self.snapshot().items()):
+            by_name.setdefault(name, []).append((labels, value))
+        lines = []
+        for name, samples in by_name.items():
+            lines.append(f"# HELP {PREFIX}{name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {PREFIX}{name} counter")
+            lines.extend(f"{PREFIX}{name}{_labels(labels)} {_number(value)}" for labels, value in samples)
+        for name, value in (gauges or {}).items():
+            if value is None:
+                continue
+            lines.append(f"# TYPE {PREFIX}{name} gauge")
+            samples = value.items() if isinstance(value, dict) else [((), value)]
+            lines.extend(f"{PREFIX}{name}{_labels(labels)} {_number(sample)}" for labels, sample in samples)
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class RequestTimings:
+    """Stage timings, counts and LLM tokens collected for a single request or job."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.tokens = {"prompt": 0, "completion": 0}
+
+    def record(self, stage, seconds, rows=None, nbytes=None):
+        with self._lock:
+            entry = self.stages.setdefault(stage, {"seconds": 0.0, "calls": 0, "rows": 0, "bytes": 0})
+            entry["seconds"] += seconds
+            entry["calls"] += 1
+            entry["rows"] += rows or 0
+            entry["bytes"] += nbytes or 0
+
+    def add_tokens(self, prompt, completion):
+        with self._lock:
+            self.tokens["prompt"] += prompt
+            self.tokens["completion"] += completion
+
+    def breakdown(self):
+        with self._lock:
+            stages = {stage: {**entry, "seconds": round(entry["seconds"], 6)} for stage, entry in self.stages.items()}
+            return {"total_seconds": round(time.perf_counter() - self.started, 6), "stages": stages, "llm_tokens": dict(self.tokens)}
+
+    #Value for a Server-Timing header (durations in milliseconds)
+    def server_timing(self):
+        breakdown = self.breakdown()
+        parts = [f"{stage};dur={entry['seconds'] * 1000:.1f}" for stage, entry in breakdown["stages"].items()]
+        parts.append(f"total;dur={breakdown['total_seconds'] * 1000:.1f}")
+        return ", ".join(parts)
+
+
+metrics = Metrics()
+
+# Timings of the request being handled; copied into worker threads with the context
+_current_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def current_timings():
+    return _current_timings.get()
+
+
+@contextmanager
+def track_request():
+    timings = RequestTimings()
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+#Time a block; the yielded dict lets the block set rows/bytes once they are known
+@contextmanager
+def stage(name, rows=None, nbytes=None):
+    counts = {"rows": rows, "bytes": nbytes}
+    started = time.perf_counter()
+    try:
+        yield counts
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.observe_stage(name, elapsed, counts["rows"], counts["bytes"])
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.record(name, elapsed, counts["rows"], counts["bytes"])
+
+
+#Time how long each item of a lazy iterable (e.g. a chunk reader) takes to produce
+def timed_iter(name, iterable):
+    iterator = iter(iterable)
+    while True:
+        with stage(name) as counts:
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            counts["rows"] = len(item) if hasattr(item, "__len__") else None
+            if hasattr(item, "memory_usage"):
+                counts["bytes"] = int(item.memory_usage(index=False).sum())
+        yield item
+
+
+#Token counts reported by ollama (ChatResponse object or plain dict)
+def record_llm_usage(response):
+    def field(key):
+        value = response.get(key) if isinstance(response, dict) else getattr(response, key, None)
+        return value or 0
+
+    prompt, completion = field("prompt_eval_count"), field("eval_count")
+    metrics.inc("llm_tokens_total", prompt, direction="prompt")
+    metrics.inc("llm_tokens_total", completion, direction="completion")
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add_tokens(prompt, completion)
+
+
+def peak_memory_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # kilobytes on Linux
+
+
+_profile_lock = threading.Lock()
+
+
+#Capture a cProfile and/or tracemalloc report around a block (mode: "cprofile", "tracemalloc" or "all")
+#cProfile only sees the calling thread, so LLM calls made on the agent's workers show up as waits
+@contextmanager
+def profiled(mode=None, top=25):
+    report = {}
+    if not mode:
+        yield report
+        return
+    if mode not in ("cprofile", "tracemalloc", "all"):
+        raise ValueError("profile must be 'cprofile', 'tracemalloc' or 'all'")
+    # Both profilers are process-wide, so only one capture runs at a time
+    if not _profile_lock.acquire(blocking=False):
+        report["error"] = "another profile capture is already running"
+        yield report
+        return
+
+    profiler = cProfile.Profile() if mode in ("cprofile", "all") else None
+    trace = mode in ("tracemalloc", "all") and not tracemalloc.is_tracing()
+    try:
+        if trace:
+            tracemalloc.start()
+        if profiler:
+            profiler.enable()
+        yield report
+    finally:
+        try:
+            if profiler:
+                profiler.disable()
+                output = io.StringIO()
+                pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(top)
+                report["cprofile"] = output.getvalue()
+            if trace:
+                snapshot = tracemalloc.take_snapshot()
+                current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                report["tracemalloc"] = {
+                    "current_bytes": current,
+                    "peak_bytes": peak,
+                    "top": [str(statistic) for statistic in snapshot.statistics("lineno")[:top]],
+                }
+        finally:
+            _profile_lock.release()
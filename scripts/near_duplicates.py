@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+
+MERGE_POLICIES = ("first", "last", "most_complete", "coalesce")
+
+
+class NearDuplicateDetector:
+    """Find rows that are duplicates up to case, spacing, punctuation and small typos.
+
+    The selected columns are normalized and joined into one key per row.
+    Rows with equal keys are duplicates outright; the distinct keys are then
+    MinHashed over character shingles and bucketed with LSH (``bands`` bands
+    of ``num_perm / bands`` rows), so only keys that share a bucket are
+    compared. A candidate pair is kept when the share of matching MinHash
+    values (an estimate of shingle Jaccard similarity) reaches
+    ``threshold``. Within a bucket every key is compared with the next one
+    and with the bucket's first key, and clusters are the connected
+    components of the matching pairs, so hashing, bucketing and clustering
+    are all vectorized and grow with the number of rows, not the number of
+    pairs.
+
+    Punctuation is only dropped from text columns; numeric columns keep
+    their sign and decimals. Rows whose selected columns are all empty are
+    never merged. Keys are truncated to ``max_chars`` characters before
+    shingling.
+    """
+
+    def __init__(self, columns=None, threshold=0.8, num_perm=64, bands=16, shingle_size=3, max_chars=128,
+                 chunk_size=20000, seed=0):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        if not 1 <= shingle_size <= 8:
+            raise ValueError("shingle_size must be between 1 and 8")
+        self.columns = columns
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.max_chars = max_chars
+        self.chunk_size = chunk_size
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hash family: odd 64-bit multipliers and random offsets
+        self._multipliers = rng.integers(1, 2**63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._offsets = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+        self._band_weights = rng.integers(1, 2**63, num_perm // bands, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+    #Key per row: text lower-cased with punctuation dropped and whitespace collapsed, numbers in one canonical form
+    def normalize(self, df, columns=None):
+        columns = list(columns or self.columns or df.columns)
+        key = None
+        for column in columns:
+            values = df[column]
+            if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+                # Signs and decimal points matter here, and 15 and 15.0 are the same value
+                text = values.astype("Float64").astype("string").fillna("")
+            else:
+                text = values.astype("string").fillna("").str.lower()
+                text = text.str.replace(r"[^\w\s]", "", regex=True).str.replace(r"\s+", " ", regex=True).str.strip()
+            key = text if key is None else key + "\x1f" + text
+        return key.astype(object)
+
+    #Cluster label per row: rows with the same label are near duplicates of each other
+    def find(self, df, columns=None):
+        if df.empty:
+            return pd.Series(np.zeros(0, dtype=np.int64), index=df.index)
+        key = self.normalize(df, columns)
+        # Rows with nothing in the selected columns carry no evidence of being duplicates; each is its own cluster
+        empty = (key.str.replace("\x1f", "", regex=False) == "").to_numpy()
+        codes, keys = pd.factorize(key[~empty])
+        signatures = self.signatures(keys)
+        edges = [self._similar_pairs(signatures, left, right) for left, right in self._candidate_pairs(signatures)]
+        left = np.concatenate([pair[0] for pair in edges]) if edges else np.zeros(0, dtype=np.int64)
+        right = np.concatenate([pair[1] for pair in edges]) if edges else np.zeros(0, dtype=np.int64)
+        components = self._components(len(keys), left, right)
+        labels = np.empty(len(df), dtype=np.int64)
+        labels[~empty] = components[codes]
+        labels[empty] = len(keys) + np.arange(empty.sum())
+        # Renumber clusters by first appearance so labels are stable
+        return pd.Series(pd.factorize(labels)[0], index=df.index)
+
+    #MinHash signature per key, shape (len(keys), num_perm)
+    def signatures(self, keys):
+        signatures = np.empty((len(keys), self.num_perm), dtype=np.uint32)
+        for start in range(0, len(keys), self.chunk_size):
+            chunk = keys[start:start + self.chunk_size]
+            signatures[start:start + len(chunk)] = self._minhash(chunk)
+        return signatures
+
+    def _minhash(self, keys):
+        encoded = np.array([key.encode("utf-8")[:self.max_chars] for key in keys])
+        # Width of the longest key in the chunk, at least one shingle
+        chars = max(encoded.dtype.itemsize, self.shingle_size)
+        encoded = encoded.astype(f"S{chars}")
+        lengths = np.char.str_len(encoded)
+        data = encoded.view(np.uint8).reshape(len(keys), chars).astype(np.uint64)
+
+        # Shingle ids: k consecutive bytes packed into one integer
+        width = chars - self.shingle_size + 1
+        shingles = np.zeros((len(keys), width), dtype=np.uint64)
+        for offset in range(self.shingle_size):
+            shingles = (shingles << np.uint64(8)) | data[:, offset:offset + width]
+        # Positions past the end of a key repeat its first shingle, so they never lower the minimum
+        valid = np.arange(width) < np.maximum(lengths - self.shingle_size + 1, 1)[:, None]
+        shingles = np.where(valid, shingles, shingles[:, :1])
+
+        signature = np.empty((len(keys), self.num_perm), dtype=np.uint32)
+        for i in range(self.num_perm):
+            hashed = (shingles * self._multipliers[i] + self._offsets[i]) >> np.uint64(32)
+            signature[:, i] = hashed.min(axis=1)
+        return signature
+
+    #Pairs of keys that share an LSH bucket: each key with the next one in its bucket and with the bucket's first key
+    def _candidate_pairs(self, signatures):
+        rows = self.num_perm // self.bands
+        for band in range(self.bands):
+            block = signatures[:, band * rows:(band + 1) * rows].astype(np.uint64)
+            bucket = (block * self._band_weights).sum(axis=1)
+            order = np.argsort(bucket, kind="stable")
+            same = bucket[order][1:] == bucket[order][:-1]
+            yield order[:-1][same], order[1:][same]
+            heads = order[np.maximum.accumulate(np.where(np.r_[True, ~same], np.arange(len(order)), 0))]
+            star = np.r_[False, same] & (heads != order)
+            yield heads[star], order[star]
+
+    #Candidate pairs whose estimated similarity reaches the threshold, compared chunk_size pairs at a time
+    def _similar_pairs(self, signatures, left, right):
+        keep = np.zeros(len(left), dtype=bool)
+        for start in range(0, len(left), self.chunk_size):
+            end = start + self.chunk_size
+            matches = (signatures[left[start:end]] == signatures[right[start:end]]).mean(axis=1)
+            keep[start:end] = matches >= self.threshold
+        return left[keep], right[keep]
+
+    #Connected components of the pair graph by min-label propagation with pointer jumping
+    @staticmethod
+    def _components(count, left, right):
+        labels = np.arange(count)
+        while True:
+            previous = labels.copy()
+            np.minimum.at(labels, left, labels[right])
+            np.minimum.at(labels, right, labels[left])
+            labels = labels[labels]
+            if np.array_equal(labels, previous):
+                return labels
+
+    #Keep one row per cluster; returns the deduplicated frame and a small report
+    #policy: first / last row, the most_complete row (fewest missing cells) or coalesce (first non-missing value per column)
+    def deduplicate(self, df, columns=None, policy="first"):
+        if policy not in MERGE_POLICIES:
+            raise ValueError(f"policy must be one of {', '.join(MERGE_POLICIES)}")
+        labels = self.find(df, columns)
+        report = {"rows": len(df), "clusters": int(labels.nunique()), "removed": int(len(df) - labels.nunique())}
+        if not report["removed"]:
+            return df, report
+
+        if policy == "coalesce":
+            # Labels are numbered by first appearance, so group order matches the first row of each cluster
+            merged = df.groupby(labels.to_numpy(), sort=True, dropna=False).first()
+            merged.index = df.index[~labels.duplicated().to_numpy()]
+            return merged[df.columns], report
+
+        if policy == "most_complete":
+            missing = df.isna().sum(axis=1).to_numpy()
+            order = np.lexsort((np.arange(len(df)), missing))
+            keep = ~pd.Series(labels.to_numpy()[order]).duplicated().to_numpy()
+            return df.iloc[np.sort(order[keep])], report
+
+        keep = ~labels.duplicated(keep="last" if policy == "last" else "first")
+        return df[keep.to_numpy()], report
@@ -0,0 +1,230 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from scripts.data_cleaning import DataCleaning
+
+
+class QuantileSketch:
+    """Fixed-size uniform reservoir sample that answers approximate quantiles."""
+
+    def __init__(self, size=20000, seed=0):
+        self.size = size
+        self.count = 0
+        self.sample = np.empty(0, dtype=np.float64)
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        room = self.size - len(self.sample)
+        if room > 0:
+            self.sample = np.concatenate([self.sample, values[:room]])
+            self.count += min(room, len(values))
+            values = values[room:]
+        if len(values) == 0:
+            return
+        # Value at global position p replaces a random slot with probability size / p
+        positions = self.count + np.arange(1, len(values) + 1)
+        keep = self._rng.random(len(values)) < self.size / positions
+        self.sample[self._rng.integers(0, self.size, keep.sum())] = values[keep]
+        self.count += len(values)
+
+    def update_constant(self, value, repeats):
+        # Add `repeats` copies of one value without materialising them all at once
+        step = max(self.size, 1)
+        for start in range(0, repeats, step):
+            self.update(np.full(min(step, repeats - start), value))
+
+    def quantile(self, q):
+        return float(np.quantile(self.sample, q)) if len(self.sample) else np.nan
+
+    def to_dict(self):
+        return {"size": self.size, "count": self.count, "sample": self.sample.tolist()}
+
+    @classmethod
+    def from_dict(cls, state):
+        sketch = cls(state["size"], seed=state["count"])
+        sketch.count = state["count"]
+        sketch.sample = np.asarray(state["sample"], dtype=np.float64)
+        return sketch
+
+
+class SpillingHashSet:
+    """Set of 64-bit row hashes kept in memory up to ``max_memory_items``.
+
+    Beyond that the buffer is sorted and written to a memory-mapped run file
+    in ``spill_dir``; lookups binary-search every run, so memory stays
+    bounded by the buffer size whatever the number of distinct rows.
+    """
+
+    def __init__(self, max_memory_items=5_000_000, spill_dir=None):
+        self.max_memory_items = max_memory_items
+        self._spill_dir = spill_dir
+        self._own_dir = None
+        self._buffer = np.empty(0, dtype=np.uint64)
+        self._runs = []
+
+    #Mask of hashes seen for the first time (also within this call), which are then added
+    def first_seen(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        new = ~pd.Series(hashes).duplicated().to_numpy()
+        new &= ~self._contains(hashes)
+        self._add(hashes[new])
+        return new
+
+    def _contains(self, hashes):
+        found = self._in_sorted(self._buffer, hashes)
+        for run in self._runs:
+            found |= self._in_sorted(run, hashes)
+        return found
+
+    @staticmethod
+    def _in_sorted(sorted_values, hashes):
+        if len(sorted_values) == 0:
+            return np.zeros(len(hashes), dtype=bool)
+        index = np.searchsorted(sorted_values, hashes).clip(max=len(sorted_values) - 1)
+        return np.asarray(sorted_values[index] == hashes)
+
+    def _add(self, hashes):
+        self._buffer = np.union1d(self._buffer, hashes)
+        if len(self._buffer) > self.max_memory_items:
+            self._spill()
+
+    def _spill(self):
+        if self._own_dir is None and self._spill_dir is None:
+            self._own_dir = tempfile.mkdtemp(prefix="dedup-")
+        directory = self._spill_dir or self._own_dir
+        path = os.path.join(directory, f"run-{len(self._runs)}.u64")
+        self._buffer.tofile(path)
+        self._runs.append(np.memmap(path, dtype=np.uint64, mode="r"))
+        self._buffer = np.empty(0, dtype=np.uint64)
+
+    def close(self):
+        self._runs = []
+        if self._own_dir:
+            shutil.rmtree(self._own_dir, ignore_errors=True)
+            self._own_dir = None
+
+
+class OutOfCoreCleaner:
+    """Run DataCleaning.clean_data over partitions of a dataset larger than RAM.
+
+    ``chunk_factory`` is a callable returning a fresh iterator of DataFrame
+    partitions (for example ``lambda: pd.read_csv(path, chunksize=500_000)``);
+    it is called twice. The first pass gathers global statistics: running
+    sums and counts for means, reservoir sketches for medians and the IQR
+    bounds of ``remove_outliers``, value counts for modes and the categories
+    to encode. The second pass applies them partition by partition and
+    removes duplicates with a hash set that spills to disk.
+
+    Medians and outlier bounds are approximate, and the bounds are taken on
+    the imputed column before duplicates are removed.
+    """
+
+    def __init__(self, sketch_size=20000, max_tracked_values=100000, max_memory_hashes=5_000_000, spill_dir=None):
+        self.sketch_size = sketch_size
+        self.max_tracked_values = max_tracked_values
+        self.max_memory_hashes = max_memory_hashes
+        self.spill_dir = spill_dir
+        self.data_cleaning = DataCleaning()
+
+    #First pass: global statistics for imputation, outliers and encoding
+    def collect_statistics(self, chunks, missing_value_strategy='mean', outlier_column=None, categorical_column=None):
+        sums, counts, nulls, sketches, value_counts = {}, {}, {}, {}, {}
+        outlier_sketch = QuantileSketch(self.sketch_size)
+        categories = set()
+        rows = 0
+
+        for chunk in chunks:
+            rows += len(chunk)
+            numeric_cols = chunk.select_dtypes(include=["number"]).columns
+            for column in numeric_cols:
+                values = chunk[column]
+                sums[column] = sums.get(column, 0.0) + float(values.sum())
+                counts[column] = counts.get(column, 0) + int(values.count())
+                nulls[column] = nulls.get(column, 0) + int(values.isna().sum())
+                if missing_value_strategy == "median":
+                    sketches.setdefault(column, QuantileSketch(self.sketch_size)).update(values.to_numpy())
+            if missing_value_strategy == "mode":
+                for column in chunk.columns:
+                    merged = value_counts.get(column, pd.Series(dtype="int64")).add(chunk[column].value_counts(), fill_value=0)
+                    if len(merged) > self.max_tracked_values:
+                        merged = merged.nlargest(self.max_tracked_values // 2)
+                    value_counts[column] = merged
+            if outlier_column and outlier_column in chunk:
+                kept = chunk if missing_value_strategy in ("mean", "median", "mode") else chunk[chunk.notna().all(axis=1)]
+                outlier_sketch.update(kept[outlier_column].to_numpy())
+            if categorical_column and categorical_column in chunk:
+                categories.update(chunk[categorical_column].dropna().unique().tolist())
+
+        fill_values = {}
+        if missing_value_strategy == "mean":
+            fill_values = {c: sums[c] / counts[c] for c in sums if counts[c]}
+        elif missing_value_strategy == "median":
+            fill_values = {c: sketch.quantile(0.5) for c, sketch in sketches.items()}
+        elif missing_value_strategy == "mode":
+            fill_values = {c: counts_.idxmax() for c, counts_ in value_counts.items() if len(counts_)}
+
+        bounds = None
+        if outlier_column:
+            # Imputed cells also count towards the quantiles, as they do in the in-memory chain
+            if outlier_column in fill_values and nulls.get(outlier_column):
+                outlier_sketch.update_constant(fill_values[outlier_column], nulls[outlier_column])
+            Q1, Q3 = outlier_sketch.quantile(0.25), outlier_sketch.quantile(0.75)
+            IQR = Q3 - Q1
+            bounds = (Q1 - 1.5 * IQR, Q3 + 1.5 * IQR)
+
+        return {
+            "rows": rows,
+            "fill_values": fill_values,
+            "outlier_bounds": bounds,
+            "categories": sorted(categories, key=str),
+        }
+
+    #Second pass: yield cleaned partitions using the global statistics
+    def clean(self, chunk_factory, missing_value_strategy='mean', outlier_column=None, irrelevant_columns=None, categorical_column=None, data_type_fixes=None):
+        stats = self.collect_statistics(chunk_factory(), missing_value_strategy, outlier_column, categorical_column)
+        seen = SpillingHashSet(self.max_memory_hashes, self.spill_dir)
+        try:
+            for chunk in chunk_factory():
+                if missing_value_strategy in ("mean", "median", "mode"):
+                    chunk = chunk.fillna(stats["fill_values"])
+                else:
+                    chunk = chunk.dropna()
+
+                # Partitions infer dtypes on their own (1 in one, 1.0 in another with a gap), so numbers hash as float64
+                numeric_cols = chunk.select_dtypes(include=["number"]).columns
+                hashes = pd.util.hash_pandas_object(chunk.astype(dict.fromkeys(numeric_cols, "float64")), index=False).to_numpy()
+                chunk = chunk[seen.first_seen(hashes)]
+
+                if outlier_column:
+                    lower_bound, upper_bound = stats["outlier_bounds"]
+                    chunk = chunk[(chunk[outlier_column] >= lower_bound) & (chunk[outlier_column] <= upper_bound)]
+                if irrelevant_columns:
+                    chunk = self.data_cleaning.drop_irrelevant_columns(chunk, columns=irrelevant_columns)
+                if categorical_column:
+                    # Same dummy columns in every partition
+                    chunk = chunk.assign(**{categorical_column: pd.Categorical(chunk[categorical_column], categories=stats["categories"])})
+                    chunk = self.data_cleaning.encode_categorical_variables(chunk, column=categorical_column)
+                if data_type_fixes:
+                    for column, new_type in data_type_fixes.items():
+                        chunk = self.data_cleaning.fix_data_types(chunk, column, new_type)
+                if len(chunk):
+                    yield chunk
+        finally:
+            seen.close()
+
+    #Write every cleaned partition to one CSV file, header once
+    def clean_to_csv(self, chunk_factory, output_path, **options):
+        rows = 0
+        with open(output_path, "w", newline="") as target:
+            for i, chunk in enumerate(self.clean(chunk_factory, **options)):
+                chunk.to_csv(target, header=(i == 0), index=False)
+                rows += len(chunk)
+        return rows
@@ -0,0 +1,115 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+
+class ParallelExecutor:
+    """Run DataFrame work on a thread or process pool, sharded by column or by row partition.
+
+    Column shards suit per-column statistics and imputation; row partitions
+    suit filters and row hashing. Shards are contiguous and results are
+    reassembled in shard order, so the output does not depend on which
+    worker finishes first. Frames with fewer than ``min_cells`` cells run
+    inline, where the pool overhead would outweigh the gain.
+
+    Threads share the frame without copying and help wherever pandas and
+    NumPy release the GIL (numeric reductions, sorting, hashing). Processes
+    also parallelize Python-heavy work such as modes of object columns, but
+    pay for pickling each shard; their functions must be module-level.
+    """
+
+    def __init__(self, n_jobs=1, backend="thread", min_cells=1_000_000):
+        if backend not in ("thread", "process"):
+            raise ValueError("backend must be 'thread' or 'process'")
+        self.n_jobs = (os.cpu_count() or 1) if n_jobs in (None, -1) else max(int(n_jobs), 1)
+        self.backend = backend
+        self.min_cells = min_cells
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def enabled(self, df):
+        return self.n_jobs > 1 and df.size >= self.min_cells
+
+    @property
+    def pool(self):
+        with self._lock:
+            if self._pool is None:
+                pool_class = ThreadPoolExecutor if self.backend == "thread" else ProcessPoolExecutor
+                self._pool = pool_class(max_workers=self.n_jobs)
+            return self._pool
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+    def _run(self, func, shards):
+        return list(self.pool.map(func, shards))
+
+    #func(frame) on column shards; returns the per-shard results in column order
+    def map_columns(self, func, df):
+        if not self.enabled(df) or df.shape[1] < 2:
+            return [func(df)]
+        groups = np.array_split(np.arange(df.shape[1]), min(self.n_jobs, df.shape[1]))
+        return self._run(func, [df.iloc[:, group] for group in groups if len(group)])
+
+    #func(frame) on row partitions; returns the per-partition results in row order
+    def map_partitions(self, func, df):
+        if not self.enabled(df) or len(df) < 2:
+            return [func(df)]
+        bounds = np.linspace(0, len(df), min(self.n_jobs, len(df)) + 1).astype(int)
+        return self._run(func, [df.iloc[start:end] for start, end in zip(bounds[:-1], bounds[1:])])
+
+    #Per-column mean, median or mode as one Series indexed like df.columns
+    def column_statistics(self, df, statistic):
+        return pd.concat(self.map_columns(partial(_column_statistic, statistic=statistic), df))
+
+    #fillna with per-column values, imputing column shards in parallel
+    def fillna(self, df, values):
+        if not self.enabled(df):
+            return df.fillna(values)
+        parts = self.map_columns(partial(_fillna, values=values), df)
+        return pd.concat(parts, axis=1)[df.columns]
+
+    #Boolean mask from func(partition) -> array, concatenated in row order
+    def row_mask(self, func, df):
+        return np.concatenate([np.asarray(part, dtype=bool) for part in self.map_partitions(func, df)])
+
+    #Rows whose column value lies within [lower, upper], evaluated per row partition
+    def between(self, df, column, lower, upper):
+        return self.row_mask(partial(_between, column=column, lower=lower, upper=upper), df)
+
+    #True for rows that repeat an earlier row; rows are hashed per partition (64-bit), then compared globally
+    def duplicated(self, df):
+        if not self.enabled(df):
+            return df.duplicated().to_numpy()
+        hashes = np.concatenate(self.map_partitions(_row_hashes, df))
+        return pd.Series(hashes).duplicated().to_numpy()
+
+
+def _column_statistic(frame, statistic):
+    if statistic == "mean":
+        return frame.mean()
+    if statistic == "median":
+        return frame.median()
+    if statistic == "mode":
+        modes = frame.mode()
+        return modes.iloc[0] if len(modes) else pd.Series(np.nan, index=frame.columns)
+    raise ValueError(f"Unknown statistic '{statistic}'")
+
+
+def _fillna(frame, values):
+    return frame.fillna(values)
+
+
+def _between(frame, column, lower, upper):
+    return frame[column].between(lower, upper).to_numpy()
+
+
+def _row_hashes(frame):
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
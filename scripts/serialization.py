@@ -0,0 +1,91 @@
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+
+try:
+    import zstandard
+except ImportError:  # zstd responses need the optional zstandard package
+    zstandard = None
+
+RESPONSE_SHAPES = ("records", "split", "columns")
+COMPRESSIONS = ("gzip", "zstd")
+
+# NaN, NaT, None and +/-inf become null, datetimes ISO 8601; 15 significant digits is the encoder's maximum,
+# so float columns that need more to round-trip are written with Python's shortest exact repr (see _exact_floats)
+JSON_OPTIONS = {"date_format": "iso", "double_precision": 15, "force_ascii": False}
+
+LIST_FIELDS = ("issues_found", "cleaning_strategy")
+
+
+#JSON text of a DataFrame, encoded column by column in pandas' C encoder without building Python dicts
+#shape: records [{column: value}, ...], split {"columns": [...], "data": [[...], ...]} or columns {column: [values]}
+def frame_to_json(df, shape="records"):
+    if shape not in RESPONSE_SHAPES:
+        raise ValueError(f"shape must be one of {', '.join(RESPONSE_SHAPES)}")
+    exact = _exact_floats(df)
+    if shape == "columns":
+        arrays = (f"{json.dumps(str(column))}:{_dumps(exact[i]) if i in exact else _column_json(df.iloc[:, i])}"
+                  for i, column in enumerate(df.columns))
+        return "{" + ",".join(arrays) + "}"
+    if shape == "records":
+        text = df.to_json(orient="records", **JSON_OPTIONS)
+    else:
+        text = df.to_json(orient="split", index=False, **JSON_OPTIONS)
+    if not exact:
+        return text
+    # Only frames holding such floats pay for re-encoding the parsed output in Python
+    parsed = json.loads(text)
+    rows = parsed if shape == "records" else parsed["data"]
+    for i, values in exact.items():
+        key = str(df.columns[i]) if shape == "records" else i
+        for row, value in zip(rows, values):
+            row[key] = value
+    return _dumps(parsed)
+
+
+def _column_json(series):
+    # A nullable integer/boolean Series with missing values would be written as floats
+    if isinstance(series.dtype, pd.api.extensions.ExtensionDtype) and series.dtype.kind in "iub" and series.hasnans:
+        series = series.astype(object)
+    return series.to_json(orient="values", **JSON_OPTIONS)
+
+
+#Column position -> values (Python floats, None for NaN/inf) of the float columns the encoder would round
+def _exact_floats(df):
+    exact = {}
+    for i in range(df.shape[1]):
+        series = df.iloc[:, i]
+        if series.dtype.kind != "f":
+            continue
+        values = series.to_numpy(dtype="float64", na_value=np.nan)
+        finite = np.isfinite(values)
+        written = np.array(json.loads(_column_json(series)), dtype="float64")
+        if not np.array_equal(written[finite], values[finite]):
+            exact[i] = [value if ok else None for value, ok in zip(values.tolist(), finite.tolist())]
+    return exact
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+#A cleaning result as one JSON object: fields first, then issues/strategy, cleaned_data and the optional original_preview
+def result_to_json(ai_result, df, shape="records", preview=None, **fields):
+    parts = [f"{json.dumps(key)}:{json.dumps(value, default=str)}" for key, value in fields.items()]
+    parts += [f'"{key}":{json.dumps(ai_result.get(key, []), default=str)}' for key in LIST_FIELDS]
+    parts.append(f'"cleaned_data":{frame_to_json(df, shape)}')
+    if preview is not None:
+        parts.append(f'"original_preview":{frame_to_json(preview, shape)}')
+    return "{" + ",".join(parts) + "}"
+
+
+def compress(content, encoding):
+    if encoding == "gzip":
+        return gzip.compress(content, compresslevel=5)
+    if encoding == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd compression needs the zstandard package")
+        return zstandard.ZstdCompressor(level=3).compress(content)
+    raise ValueError(f"compression must be one of {', '.join(COMPRESSIONS)}")
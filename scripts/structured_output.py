@@ -0,0 +1,208 @@
+import json
+
+import pandas as pd
+
+ROW_ID = "_row_id"
+LIST_FIELDS = ("issues_found", "cleaning_strategy")
+
+
+class MalformedOutput(ValueError):
+    """The streamed response stopped being the JSON object the schema asks for."""
+
+
+#JSON type(s) a cleaned value may take for a column of this dtype
+def _value_types(dtype):
+    if pd.api.types.is_bool_dtype(dtype):
+        return ["boolean", "null"]
+    if pd.api.types.is_numeric_dtype(dtype):
+        return ["number", "null"]
+    return ["string", "number", "boolean", "null"]
+
+
+class BatchSchema:
+    """Expected shape of the model's answer for one batch.
+
+    Every dataset row comes back as one ``cleaned_data`` record holding all
+    of the batch's columns and the row's ``_row_id``. ``json_schema`` is
+    passed to Ollama's ``format`` so generation is constrained to it, and
+    ``errors`` checks each record again as it is parsed, since a model or
+    server without structured outputs only gets the schema as a hint.
+    """
+
+    def __init__(self, batch_df):
+        self.columns = [column for column in batch_df.columns if column != ROW_ID]
+        self.types = {column: _value_types(batch_df[column].dtype) for column in self.columns}
+        self.row_ids = [int(row_id) for row_id in batch_df[ROW_ID]]
+        self._expected = set(self.row_ids)
+
+    def json_schema(self):
+        properties = {column: {"type": types} for column, types in self.types.items()}
+        properties[ROW_ID] = {"type": "integer", "enum": self.row_ids}
+        record = {"type": "object", "properties": properties, "required": [ROW_ID, *self.columns],
+                  "additionalProperties": False}
+        fields = {field: {"type": "array", "items": {"type": "string"}} for field in LIST_FIELDS}
+        return {"type": "object", "properties": {**fields, "cleaned_data": {"type": "array", "items": record}},
+                "required": [*LIST_FIELDS, "cleaned_data"]}
+
+    #Reasons the record does not fit the schema (empty when it does); seen holds row ids already returned
+    def errors(self, record, seen=()):
+        if not isinstance(record, dict):
+            return ["record is not an object"]
+        errors = []
+        row_id = record.get(ROW_ID)
+        if isinstance(row_id, bool) or not isinstance(row_id, int) or row_id not in self._expected:
+            errors.append(f"unknown {ROW_ID} {row_id!r}")
+        elif row_id in seen:
+            errors.append(f"duplicate {ROW_ID} {row_id}")
+        missing = [column for column in self.columns if column not in record]
+        if missing:
+            errors.append(f"missing columns {missing}")
+        extra = [key for key in record if key != ROW_ID and key not in self.types]
+        if extra:
+            errors.append(f"unexpected columns {extra}")
+        for column in self.columns:
+            if column in record and not _matches(record[column], self.types[column]):
+                errors.append(f"{column}: {record[column]!r} is not {'/'.join(self.types[column])}")
+        return errors
+
+
+def _matches(value, types):
+    if value is None:
+        return "null" in types
+    if isinstance(value, bool):
+        return "boolean" in types
+    if isinstance(value, (int, float)):
+        return "number" in types
+    return isinstance(value, str) and "string" in types
+
+
+class StreamingResultParser:
+    """Incremental parser for a streamed ``{"issues_found", "cleaning_strategy", "cleaned_data"}`` answer.
+
+    ``feed`` takes text as the model produces it and tracks nesting, strings
+    and escapes one character at a time, so each ``cleaned_data`` record is
+    parsed and validated the moment its closing brace arrives instead of
+    after the whole completion. ``error`` is set, and no further input is
+    read, as soon as the text can no longer become the expected object
+    (text before it, a mismatched bracket, a record that is not valid JSON
+    or grows past ``max_record_chars``) or more than ``max_invalid``
+    records failed validation; ``done`` is set when the top-level object
+    closes. Either way the caller can stop generating.
+    """
+
+    def __init__(self, schema, max_invalid=2, max_record_chars=20000):
+        self.schema = schema
+        self.max_invalid = max_invalid
+        self.max_record_chars = max_record_chars
+        self.records = []
+        self.invalid = []
+        self.fields = {field: [] for field in LIST_FIELDS}
+        self.error = None
+        self.done = False
+        self._seen = set()
+        self._text = []
+        self._length = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._expect_key = False
+        self._key = None
+        self._value_start = None
+        self._record_start = None
+
+    @property
+    def text(self):
+        return "".join(self._text)
+
+    @property
+    def stopped(self):
+        return self.done or self.error is not None
+
+    #Consume the next piece of output; returns the records completed by it
+    def feed(self, text):
+        if self.stopped or not text:
+            return []
+        offset = self._length
+        self._text.append(text)
+        self._length += len(text)
+        completed = len(self.records)
+        try:
+            for i, char in enumerate(text):
+                self._step(char, offset + i)
+                if self.stopped:
+                    break
+            if self._record_start is not None and self._length - self._record_start > self.max_record_chars:
+                raise MalformedOutput(f"record longer than {self.max_record_chars} characters")
+        except MalformedOutput as e:
+            self.error = str(e)
+        return self.records[completed:]
+
+    #Everything parsed so far in the agent's result shape
+    def result(self):
+        return {**{field: list(values) for field, values in self.fields.items()}, "cleaned_data": list(self.records)}
+
+    def _step(self, char, position):
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                if self._expect_key and len(self._stack) == 1:
+                    self._key = self._load(self._string_start, position + 1)
+                    self._expect_key = False
+            return
+        if char.isspace():
+            return
+        if not self._stack and char != "{":
+            raise MalformedOutput(f"expected a JSON object, got {char!r}")
+
+        depth = len(self._stack)
+        if char == '"':
+            self._in_string = True
+            self._string_start = position
+        elif char in "{[":
+            self._stack.append(char)
+            if depth == 0:
+                self._expect_key = True
+            elif depth == 1:
+                self._value_start = position
+            elif depth == 2 and char == "{" and self._key == "cleaned_data" and self._stack[1] == "[":
+                self._record_start = position
+        elif char in "}]":
+            if not self._stack or self._stack.pop() != ("{" if char == "}" else "["):
+                raise MalformedOutput(f"unexpected {char!r}")
+            depth = len(self._stack)
+            if depth == 0:
+                self.done = True
+            elif depth == 1 and self._key in LIST_FIELDS:
+                value = self._load(self._value_start, position + 1)
+                self.fields[self._key] = value if isinstance(value, list) else [value]
+            elif depth == 2 and self._record_start is not None:
+                self._add_record(self._load(self._record_start, position + 1))
+                self._record_start = None
+        elif char == "," and depth == 1:
+            self._expect_key = True
+
+    def _add_record(self, record):
+        errors = self.schema.errors(record, self._seen)
+        if errors:
+            self.invalid.append({"record": record, "errors": errors})
+            if len(self.invalid) > self.max_invalid:
+                raise MalformedOutput(f"{len(self.invalid)} records failed validation, last: {'; '.join(errors)}")
+            return
+        self._seen.add(record[ROW_ID])
+        self.records.append(record)
+
+    def _load(self, start, end):
+        try:
+            return json.loads(self._slice(start, end))
+        except json.JSONDecodeError as e:
+            raise MalformedOutput(f"invalid JSON: {e}")
+
+    def _slice(self, start, end):
+        if len(self._text) > 1:
+            self._text = ["".join(self._text)]
+        return self._text[0][start:end]
@@ -0,0 +1,224 @@
+import numpy as np
+import pandas as pd
+
+TRUE_VALUES = {"true", "t", "yes", "y", "1"}
+FALSE_VALUES = {"false", "f", "no", "n", "0"}
+
+# Generic names accepted for a target type (e.g. in clean_data's data_type_fixes); numeric results are downcast.
+# Explicit numeric dtype names ("int64", "Int32", "float64", ...) are kept exactly as given.
+TYPE_ALIASES = {
+    "int": "int", "integer": "int",
+    "nullable_int": "nullable_int",
+    "float": "float", "double": "float", "number": "float", "numeric": "float",
+    "bool": "bool", "boolean": "bool",
+    "datetime": "datetime", "date": "datetime", "datetime64": "datetime", "timestamp": "datetime",
+    "category": "category", "categorical": "category",
+    "str": "string", "string": "string", "text": "string",
+}
+
+NULLABLE_INTS = [(pd.Int8Dtype(), np.int8), (pd.Int16Dtype(), np.int16), (pd.Int32Dtype(), np.int32), (pd.Int64Dtype(), np.int64)]
+
+
+class TypeCoercer:
+    """Infer column types from a sample and coerce whole columns with vectorized pandas calls.
+
+    Numbers stored as text (thousands separators, currency signs, stray
+    spaces), boolean words, dates in mixed formats and low-cardinality
+    strings are recognised when at least ``threshold`` of the sampled
+    non-null values parse. Cells that fail to parse become missing instead
+    of raising, and are counted in the coercion report; for integer targets
+    that includes infinities and values outside the dtype's range.
+    Fractional values converted to an integer type are rounded to the
+    nearest integer (halves to even) and counted as rounded. Generic targets ("int", "float", ...)
+    are downcast to the smallest dtype that holds the values exactly; an
+    explicit dtype name is honoured as given, with numpy integer dtypes
+    becoming their nullable counterpart when cells are missing.
+    """
+
+    def __init__(self, sample_size=1000, threshold=0.95, max_category_share=0.05, max_categories=1000,
+                 downcast=True, dayfirst=False, examples=5):
+        self.sample_size = sample_size
+        self.threshold = threshold
+        self.max_category_share = max_category_share
+        self.max_categories = max_categories
+        self.downcast = downcast
+        self.dayfirst = dayfirst
+        self.examples = examples
+
+    #Target type for one column, or None to leave it as it is
+    def infer_type(self, series):
+        values = series.dropna()
+        if values.empty:
+            return None
+        if pd.api.types.is_bool_dtype(values):
+            return "bool"
+        if pd.api.types.is_datetime64_any_dtype(values):
+            return "datetime"
+        if pd.api.types.is_numeric_dtype(values):
+            if pd.api.types.is_float_dtype(values) and np.isfinite(values).all() and (values % 1 == 0).all():
+                return "nullable_int" if series.isna().any() else "int"
+            return "int" if pd.api.types.is_integer_dtype(values) else "float"
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            return None
+
+        sample = values.sample(self.sample_size, random_state=0) if len(values) > self.sample_size else values
+        text = sample.astype(str).str.strip()
+        lowered = text.str.lower()
+        if lowered.isin(TRUE_VALUES | FALSE_VALUES).all() and not lowered.isin({"1", "0"}).all():
+            return "bool"
+
+        numbers = self._to_numeric(text)
+        if numbers.notna().mean() >= self.threshold:
+            parsed = numbers.dropna()
+            if np.isfinite(parsed).all() and (parsed % 1 == 0).all():
+                return "nullable_int" if series.isna().any() or numbers.isna().any() else "int"
+            return "float"
+
+        if text.str.contains(r"\d", regex=True).mean() >= self.threshold:
+            dates = self._to_datetime(text)
+            if dates.notna().mean() >= self.threshold:
+                return "datetime"
+
+        unique = values.nunique()
+        if unique <= self.max_categories and unique <= max(len(values) * self.max_category_share, 1):
+            return "category"
+        return None
+
+    def infer_schema(self, df):
+        schema = {}
+        for column in df.columns:
+            target = self.infer_type(df[column])
+            if target is not None:
+                schema[column] = target
+        return schema
+
+    #Coerce one column; returns the new series, a mask of cells that could not be converted (now missing)
+    #and a mask of fractional values rounded to fit an integer type
+    def coerce_column(self, series, target):
+        target = TYPE_ALIASES.get(target, target)
+        exact = None if target in TYPE_ALIASES.values() else self._numeric_dtype(target)
+        present = series.notna()
+        rounded = pd.Series(False, index=series.index)
+
+        if target in ("int", "nullable_int", "float") or exact is not None:
+            integer = target in ("int", "nullable_int") or (exact is not None and exact.kind in "iu")
+            if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                numbers = series.astype("float64") if integer and not pd.api.types.is_integer_dtype(series) else series
+            else:
+                numbers = self._to_numeric(series)
+            failed = present & numbers.isna()
+            if integer:
+                fractional = numbers.notna() & (numbers % 1 != 0)
+                if fractional.any():
+                    numbers = numbers.round()
+                # inf and values outside the target's range would wrap around or raise in astype
+                info = np.iinfo(getattr(exact, "numpy_dtype", exact) if exact is not None else np.int64)
+                overflow = numbers.notna() & ~((numbers >= info.min) & (numbers < info.max + 1))
+                if overflow.any():
+                    failed = failed | overflow
+                    numbers = numbers.where(~overflow)
+                rounded = fractional & ~overflow
+            if exact is not None:
+                result = self._exact(numbers, exact)
+            elif integer:
+                result = self._integers(numbers)
+            else:
+                result = self._floats(numbers.astype("float64"))
+        elif target == "bool":
+            lowered = series.astype("string").str.strip().str.lower()
+            result = pd.Series(pd.NA, index=series.index, dtype="boolean")
+            result[lowered.isin(TRUE_VALUES).fillna(False).to_numpy(bool)] = True
+            result[lowered.isin(FALSE_VALUES).fillna(False).to_numpy(bool)] = False
+            failed = present & result.isna()
+            if not result.isna().any():
+                result = result.astype(bool)
+        elif target == "datetime":
+            result = series if pd.api.types.is_datetime64_any_dtype(series) else self._to_datetime(series)
+            failed = present & result.isna()
+        elif target == "category":
+            result, failed = series.astype("category"), pd.Series(False, index=series.index)
+        elif target == "string":
+            result, failed = series.astype("string"), pd.Series(False, index=series.index)
+        else:
+            # Any other pandas/numpy dtype name is passed straight to astype
+            result, failed = series.astype(target), pd.Series(False, index=series.index)
+        return result, failed.to_numpy(bool), rounded.to_numpy(bool)
+
+    #Coerce df to schema (inferred when None); returns the new frame and a per-column report
+    def coerce(self, df, schema=None):
+        schema = self.infer_schema(df) if schema is None else schema
+        df = df.copy()
+        report = {}
+        for column, target in schema.items():
+            before = str(df[column].dtype)
+            coerced, failed, rounded = self.coerce_column(df[column], target)
+            entry = self.column_report(df[column], coerced, failed, rounded)
+            if entry["from"] == entry["to"] and not entry["failed"] and not entry["rounded"]:
+                continue
+            report[column] = entry
+            df[column] = coerced
+        return df, report
+
+    #Report entry for one coerced column: dtypes, failed and rounded counts, and a few failed cells
+    def column_report(self, before, after, failed, rounded):
+        examples = before[failed].head(self.examples)
+        return {
+            "from": str(before.dtype),
+            "to": str(after.dtype),
+            "failed": int(failed.sum()),
+            "rounded": int(rounded.sum()),
+            "failed_examples": [{"row": index, "value": value} for index, value in examples.items()],
+        }
+
+    #Parse in one C pass, then clean up only the cells that failed:
+    #thousands separators, currency signs, spaces and "(12)" accounting negatives
+    @staticmethod
+    def _to_numeric(values):
+        numbers = pd.to_numeric(values, errors="coerce")
+        retry = numbers.isna() & values.notna()
+        if retry.any():
+            text = values[retry].astype(str).str.replace(r"[,\s$€£¥]", "", regex=True)
+            text = text.str.replace(r"^\((.*)\)$", r"-\1", regex=True)
+            numbers = numbers.astype("float64")
+            numbers[retry] = pd.to_numeric(text, errors="coerce")
+        return numbers
+
+    def _to_datetime(self, values):
+        return pd.to_datetime(values, errors="coerce", format="mixed", dayfirst=self.dayfirst)
+
+    #Smallest integer dtype for the values; nullable when any are missing
+    def _integers(self, numbers):
+        if numbers.isna().any():
+            if not self.downcast:
+                return numbers.astype("Int64")
+            low, high = numbers.min(), numbers.max()
+            for dtype, numpy_type in NULLABLE_INTS:
+                if pd.isna(low) or (np.iinfo(numpy_type).min <= low and high <= np.iinfo(numpy_type).max):
+                    return numbers.astype(dtype)
+            return numbers.astype("Int64")
+        integers = numbers.astype("int64")
+        return pd.to_numeric(integers, downcast="integer") if self.downcast else integers
+
+    #Explicit numeric dtype name ("int64", "Int32", "float64", ...) or None
+    @staticmethod
+    def _numeric_dtype(target):
+        try:
+            dtype = pd.api.types.pandas_dtype(target)
+        except (TypeError, ValueError):
+            return None
+        return dtype if dtype.kind in "iuf" else None
+
+    #The requested dtype as given; a numpy integer dtype cannot hold missing values, so those use the nullable one
+    @staticmethod
+    def _exact(numbers, dtype):
+        if isinstance(dtype, np.dtype) and dtype.kind in "iu" and numbers.isna().any():
+            dtype = pd.api.types.pandas_dtype(dtype.name.replace("uint", "UInt") if dtype.kind == "u" else dtype.name.replace("int", "Int"))
+        return numbers.astype(dtype)
+
+    #float32 only when every value survives the round trip
+    def _floats(self, numbers):
+        if self.downcast:
+            narrow = numbers.astype("float32")
+            if np.array_equal(narrow.astype("float64").to_numpy(), numbers.to_numpy(), equal_nan=True):
+                return narrow
+        return numbers
@@ -0,0 +1,121 @@
+import json
+import threading
+import time
+
+import ollama
+import pandas as pd
+import pytest
+
+from scripts.ai_agent import AIAgent
+
+
+class SleepyChat:
+    """Stub for ollama.chat: sleeps, then echoes the batch's first column back as cleaned_data."""
+
+    def __init__(self, latency=0.1, delays=None, failures=0):
+        self.latency = latency
+        self.delays = delays or {}  # call number -> latency for that call
+        self.failures = failures  # the first calls raise instead of answering
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, model=None, messages=None, **kwargs):
+        with self._lock:
+            call = self.calls
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delays.get(call, self.latency))
+            if call < self.failures:
+                raise ConnectionError("ollama unavailable")
+            lines = messages[-1]["content"].split("Dataset:", 1)[1].split("Return format:", 1)[0].split()
+            cleaned_data = [{"id": int(line.split(",")[0])} for line in lines[1:]]
+            content = json.dumps({"issues_found": [], "cleaning_strategy": [], "cleaned_data": cleaned_data})
+            return {"message": {"role": "assistant", "content": content}}
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({"id": range(40), "value": [i * 1.5 for i in range(40)]})
+
+
+def run(monkeypatch, stub, df, **kwargs):
+    monkeypatch.setattr(ollama, "chat", stub)
+    agent = AIAgent(encoder="csv", **kwargs)
+    agent.graph  # compile outside the timed region
+    start = time.perf_counter()
+    results = agent.clean_data(df, batch_size=5)
+    return results, time.perf_counter() - start
+
+
+def cleaned_ids(results):
+    return [record["id"] for result in results for record in result["cleaned_data"]]
+
+
+def test_results_keep_batch_order(monkeypatch, frame):
+    # Later batches finish first, results still come back in order
+    stub = SleepyChat(latency=0.01, delays={0: 0.2, 1: 0.15})
+    results, _ = run(monkeypatch, stub, frame, max_workers=4)
+    assert len(results) == 8
+    assert cleaned_ids(results) == list(range(40))
+
+
+def test_concurrency_scales_up_to_max_workers(monkeypatch, frame):
+    serial, serial_seconds = run(monkeypatch, SleepyChat(latency=0.1), frame, max_workers=1)
+    stub = SleepyChat(latency=0.1)
+    parallel, parallel_seconds = run(monkeypatch, stub, frame, max_workers=4)
+    assert stub.max_in_flight == 4
+    assert cleaned_ids(parallel) == cleaned_ids(serial)
+    assert serial_seconds / parallel_seconds > 3
+
+
+def test_timeout_bounds_total_runtime(monkeypatch, frame):
+    # The first call hangs; it must not hold up the other batches or their worker
+    stub = SleepyChat(latency=0.01, delays={0: 3.0})
+    results, seconds = run(monkeypatch, stub, frame, max_workers=1, timeout=0.2)
+    assert seconds < 1.0
+    assert results[0]["cleaned_data"] == []
+    assert "no response after 0.2s" in results[0]["issues_found"][0]
+    assert cleaned_ids(results[1:]) == list(range(5, 40))
+
+
+def test_failed_batch_is_retried(monkeypatch, frame):
+    stub = SleepyChat(latency=0.01, failures=1)
+    results, _ = run(monkeypatch, stub, frame.head(5), max_workers=1, retries=1, retry_backoff=0.0)
+    assert stub.calls == 2
+    assert cleaned_ids(results) == list(range(5))
+
+
+def test_short_answers_are_split_then_returned_unchanged(monkeypatch):
+    # The model always drops the last record; no split can fix that, so the rows must come back as they were
+    def short(model=None, messages=None, **kwargs):
+        lines = messages[-1]["content"].split("Dataset:", 1)[1].split("Return format:", 1)[0].split()
+        cleaned_data = [{"id": int(line.split(",")[0]), "value": 0.0} for line in lines[1:-1]]
+        return {"message": {"content": json.dumps({"issues_found": [], "cleaning_strategy": [], "cleaned_data": cleaned_data})}}
+
+    monkeypatch.setattr(ollama, "chat", short)
+    df = pd.DataFrame({"id": range(4), "value": [1.5, 2.5, 3.5, 4.5]})
+    result = AIAgent(encoder="csv", split_depth=1)._clean_batch_adaptive(df)
+    assert result["cleaned_data"] == df.to_dict(orient="records")
+    assert result["issues_found"] == ["Model returned 1 records for 2 rows; the rows are returned unchanged"] * 2
+
+
+def test_planned_prompts_fit_the_token_budget():
+    from scripts.batch_encoders import get_encoder
+    from scripts.batch_planner import BatchPlanner
+
+    df = pd.DataFrame({"city": ["Amsterdam", "Barcelona", "Copenhagen"] * 40, "amount": range(120)})
+    context_df = pd.DataFrame({"city": [f"Reference city number {i}, already clean" for i in range(20)], "amount": range(20)})
+    planner = BatchPlanner(token_budget=600)
+    agent = AIAgent(planner=planner, structured=True, encoder=get_encoder("csv", dictionary_encode=True))
+    batches = agent.plan_batches(df, context_df=context_df)
+    assert pd.concat(batches).equals(df)
+    for batch in batches:
+        echo = planner.estimate_row_tokens(batch).sum() + planner.header_tokens(batch)
+        assert agent._prompt_tokens(agent._planned(batch), context_df) + echo <= planner.token_budget
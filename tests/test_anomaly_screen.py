@@ -0,0 +1,57 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+
+from scripts.ai_agent import AIAgent
+from scripts.anomaly_screen import AnomalyScreen
+
+
+def frame():
+    return pd.DataFrame({
+        "amount": [10.0 + i % 5 for i in range(5)] + [1000.0, 12.0, None] + [10.0 + i % 5 for i in range(92)],
+        "when": ["2024-01-01"] * 3 + ["not a date"] + ["2024-01-02"] * 96,
+        "kind": ["a", "b"] * 49 + ["zzz", "a"],
+    })
+
+
+def test_each_check_flags_its_rows():
+    # Rare means fewer than rare_share of the rows: the single "zzz" (and "not a date") among 100 rows
+    screen = AnomalyScreen(rare_share=0.02)
+    reasons = screen.reasons(frame())
+    assert np.flatnonzero(reasons["missing"]).tolist() == [7]
+    assert np.flatnonzero(reasons["outlier"]).tolist() == [5]
+    assert np.flatnonzero(reasons["coercion"]).tolist() == [3]
+    assert np.flatnonzero(reasons["rare_category"]).tolist() == [3, 98]
+    assert np.flatnonzero(screen.screen(frame())).tolist() == [3, 5, 7, 98]
+
+
+def test_clean_rows_are_not_flagged():
+    df = pd.DataFrame({"amount": [1.0, 2.0, 3.0, 2.5], "kind": ["a", "b", "a", "b"]})
+    assert not AnomalyScreen().screen(df).any()
+
+
+class FillingChat:
+    """Stub chat: fills missing amounts with 0 in the dataset rows and keeps their _row_id."""
+
+    def __init__(self):
+        self.rows_sent = []
+
+    def chat(self, model=None, messages=None, **kwargs):
+        dataset = messages[-1]["content"].split("Dataset:\n", 1)[1].split("\n\nReturn format:", 1)[0]
+        rows = pd.read_csv(io.StringIO(dataset))
+        self.rows_sent += rows["_row_id"].tolist()
+        cleaned = rows.fillna({"amount": 0.0}).to_dict(orient="records")
+        content = json.dumps({"issues_found": ["missing amount"], "cleaning_strategy": [], "cleaned_data": cleaned})
+        return {"message": {"role": "assistant", "content": content}}
+
+
+def test_clean_anomalies_sends_only_flagged_rows_and_merges_them_back():
+    df = pd.DataFrame({"amount": [1.0, None, 3.0, 2.0, None, 2.5], "kind": ["a", "b", "a", "b", "a", "b"]})
+    chat = FillingChat()
+    cleaned, result = AIAgent(client=chat).clean_anomalies(df, AnomalyScreen(), batch_size=1)
+    assert sorted(chat.rows_sent) == [1, 4]
+    assert cleaned["amount"].tolist() == [1.0, 0.0, 3.0, 2.0, 0.0, 2.5]
+    assert cleaned.columns.tolist() == ["amount", "kind"]
+    assert result["issues_found"].count("missing amount") >= 1
@@ -0,0 +1,56 @@
+import json
+import os
+
+import pytest
+import requests
+
+pytest.importorskip("streamlit")
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app", "app.py")
+
+
+class StreamedClean:
+    """Stand-in for requests.post to the backend: one ndjson batch (with the preview) and the done event."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, url, json=None, stream=False, **kwargs):
+        self.calls.append((url, json))
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    status_code = 200
+    text = ""
+
+    def iter_lines(self):
+        batch = {"batch": 1, "issues_found": ["missing"], "cleaning_strategy": ["fill"], "cleaned_data": [{"a": 1}],
+                 "original_preview": [{"a": None}]}
+        yield json.dumps(batch).encode("utf-8")
+        yield json.dumps({"done": True, "batches": 1}).encode("utf-8")
+
+
+def test_database_result_is_kept_for_the_session_without_refetching(monkeypatch):
+    backend = StreamedClean()
+    monkeypatch.setattr(requests, "post", backend)
+    at = AppTest.from_file(APP, default_timeout=30).run()
+    at.sidebar.selectbox[0].select("Database").run()
+    at.text_input[0].input("sqlite:///example.db").run()
+    at.text_area[0].input("SELECT * FROM t").run()
+    at.button[0].click().run()
+    assert not at.exception
+    assert len(backend.calls) == 1
+    assert backend.calls[0][1]["preview_rows"] == 10
+    assert len(at.dataframe) == 2  # original preview and cleaned rows
+
+    # A rerun from another widget shows the cached result instead of calling the backend again
+    at.run()
+    assert len(backend.calls) == 1
+    assert len(at.dataframe) == 2
+    assert len(at.session_state["cleaning_results"]) == 1
@@ -0,0 +1,58 @@
+import io
+
+import pandas as pd
+import pytest
+
+from scripts.arrow_io import bytes_to_dataframe, dataframe_to_bytes, write_dataframe
+from scripts.data_ingestions import DataIngestion
+
+
+def frame():
+    return pd.DataFrame({
+        "id": [1, 2, 3, 4, 5],
+        "amount": [1.5, None, 3.0, 4.25, 5.0],
+        "city": ["Paris", "Rome", None, "Oslo", "Lima"],
+        "when": pd.to_datetime(["2024-01-01", "2024-01-02", None, "2024-01-04", "2024-01-05"]),
+    })
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_round_trip_keeps_values_dtypes_and_metadata(fmt):
+    metadata = {"issues_found": ["missing amount"], "cleaning_strategy": []}
+    df, read_metadata = bytes_to_dataframe(dataframe_to_bytes(frame(), fmt, metadata), fmt)
+    pd.testing.assert_frame_equal(df, frame())
+    assert read_metadata == metadata
+
+
+def test_mixed_and_sparse_columns_are_written():
+    df = pd.DataFrame({"mixed": [1, "two", None], "dummy": pd.arrays.SparseArray([0, 1, 0])})
+    read, _ = bytes_to_dataframe(dataframe_to_bytes(df))
+    assert read["mixed"].tolist() == ["1", "two", None]
+    assert read["dummy"].tolist() == [0, 1, 0]
+
+
+def test_unknown_format_raises():
+    with pytest.raises(ValueError):
+        dataframe_to_bytes(frame(), "orc")
+
+
+@pytest.mark.parametrize("extension", [".parquet", ".feather"])
+def test_loaders_read_only_the_projected_columns(tmp_path, extension):
+    path = str(tmp_path / ("frame" + extension))
+    write_dataframe(frame(), path)
+    ingestion = DataIngestion()
+    load = ingestion.load_parquet if extension == ".parquet" else ingestion.load_feather
+    assert load(path, columns=["id", "city"]).columns.tolist() == ["id", "city"]
+    assert load(path, exclude_columns=["when"]).columns.tolist() == ["id", "amount", "city"]
+
+
+def test_batch_readers_stream_the_whole_file(tmp_path):
+    path = str(tmp_path / "frame.parquet")
+    write_dataframe(frame(), path)
+    ingestion = DataIngestion()
+    batches = list(ingestion.iter_parquet_batches(path, batch_size=2, exclude_columns=["when"]))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    pd.testing.assert_frame_equal(pd.concat(batches, ignore_index=True), frame().drop(columns="when"))
+    feather = io.BytesIO(dataframe_to_bytes(frame(), "arrow"))
+    batches = list(ingestion.iter_feather_batches(feather, batch_size=2, columns=["id"]))
+    assert pd.concat(batches, ignore_index=True)["id"].tolist() == [1, 2, 3, 4, 5]
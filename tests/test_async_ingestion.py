@@ -0,0 +1,151 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from scripts.async_ingestion import AsyncIngestion, APIFetchError, JSONArrayStream
+
+RECORDS = [{"id": i, "name": f"Zoë {i} — café ✓"} for i in range(23)]
+
+
+class StubAPI:
+    """Local HTTP server with flaky, paginated and streamed endpoints."""
+
+    def __init__(self):
+        self.requests = []
+        self.failures_left = 2
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                stub.requests.append(url.path)
+                if url.path == "/flaky":
+                    if stub.failures_left:
+                        stub.failures_left -= 1
+                        return self._send(503, {"error": "busy"})
+                    return self._send(200, RECORDS)
+                if url.path == "/missing":
+                    return self._send(404, {"error": "not found"})
+                if url.path == "/offset":
+                    offset, limit = int(query["offset"]), int(query["limit"])
+                    return self._send(200, RECORDS[offset:offset + limit])
+                if url.path == "/page":
+                    page = int(query["page"])
+                    return self._send(200, RECORDS[(page - 1) * 10:page * 10])
+                if url.path == "/cursor":
+                    start = int(query.get("cursor", 0))
+                    end = start + 10
+                    return self._send(200, {"data": RECORDS[start:end], "next_cursor": str(end) if end < len(RECORDS) else None})
+                if url.path == "/link":
+                    page = int(query.get("page", 0))
+                    headers = {"Link": f'<{stub.url}/link?page={page + 1}>; rel="next"'} if (page + 1) * 10 < len(RECORDS) else {}
+                    return self._send(200, RECORDS[page * 10:(page + 1) * 10], headers)
+                if url.path == "/relative/link":
+                    page = int(query.get("page", 0))
+                    headers = {"Link": f'<link?page={page + 1}>; rel="next"'} if (page + 1) * 10 < len(RECORDS) else {}
+                    return self._send(200, RECORDS[page * 10:(page + 1) * 10], headers)
+                if url.path == "/throttled":
+                    if stub.failures_left:
+                        stub.failures_left -= 1
+                        return self._send(429, {"error": "slow down"}, {"Retry-After": "3600"})
+                    return self._send(200, RECORDS)
+                self._send(404, {"error": "not found"})
+
+            def _send(self, status, payload, headers=None):
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+@pytest.fixture
+def api():
+    stub = StubAPI()
+    yield stub
+    stub.close()
+
+
+def fetch(**kwargs):
+    async def run():
+        async with AsyncIngestion(backoff=0.01) as ingestion:
+            return await ingestion.fetch_api_data(**kwargs)
+    return asyncio.run(run())
+
+
+def test_retries_server_errors_with_backoff(api):
+    df = fetch(url=f"{api.url}/flaky")
+    assert df.to_dict(orient="records") == RECORDS
+    assert api.requests.count("/flaky") == 3
+
+
+def test_client_errors_are_not_retried(api):
+    with pytest.raises(APIFetchError) as error:
+        fetch(url=f"{api.url}/missing")
+    assert error.value.status == 404
+    assert api.requests.count("/missing") == 1
+
+
+@pytest.mark.parametrize("path, pagination", [
+    ("/offset", {"type": "offset", "limit": 10}),
+    ("/page", {"type": "page"}),
+    ("/cursor", {"type": "cursor", "data_field": "data"}),
+    ("/link", {"type": "link"}),
+    ("/relative/link", {"type": "link"}),
+])
+def test_pagination_collects_every_page(api, path, pagination):
+    df = fetch(url=f"{api.url}{path}", pagination=pagination)
+    assert df.to_dict(orient="records") == RECORDS
+
+
+def test_streamed_array_with_characters_split_across_chunks(api):
+    async def run():
+        async with AsyncIngestion() as ingestion:
+            # Seven-byte chunks cut through the multi-byte characters in the names
+            return [item async for item in ingestion.iter_json_array(f"{api.url}/flaky", chunk_size=7)]
+    api.failures_left = 0
+    assert asyncio.run(run()) == RECORDS
+
+
+def test_retry_after_is_capped(api):
+    async def run():
+        async with AsyncIngestion(max_retry_after=0.01) as ingestion:
+            return await ingestion.fetch_api_data(f"{api.url}/throttled")
+    assert asyncio.run(run()).to_dict(orient="records") == RECORDS
+    assert api.requests.count("/throttled") == 3
+
+
+@pytest.mark.parametrize("text", ['[1, 2, {"a": 3', '[1, 2, {"a": garbage}, 4]', '[1, 2] trailing', '[1, 2'])
+def test_malformed_or_truncated_arrays_raise(text):
+    stream = JSONArrayStream()
+    stream.feed(text[:5])
+    with pytest.raises(ValueError):
+        stream.feed(text[5:], final=True)
@@ -0,0 +1,137 @@
+import io
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The backend builds its job store and LLM cache at import time; keep them out of data/
+state_dir = tempfile.mkdtemp()
+os.environ.setdefault("JOBS_DB_PATH", os.path.join(state_dir, "jobs.sqlite"))
+os.environ.setdefault("LLM_CACHE_PATH", os.path.join(state_dir, "llm_cache.sqlite"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from scripts import backend  # noqa: E402
+
+
+def sales():
+    rng = np.random.default_rng(0)
+    amount = rng.normal(100, 10, 60).round(2)
+    amount[[5, 33]] = np.nan
+    amount[47] = 10_000.0
+    df = pd.DataFrame({"region": rng.choice(["north", "south"], 60), "amount": amount})
+    # Duplicates of early rows land in later chunks
+    return pd.concat([df, df.iloc[[1, 2, 3]]], ignore_index=True)
+
+
+def sales_csv():
+    return sales().to_csv(index=False).encode("utf-8")
+
+
+def sales_file(extension):
+    if extension == ".csv":
+        return sales_csv()
+    buffer = io.BytesIO()
+    sales().to_excel(buffer, index=False) if extension == ".xlsx" else sales().to_parquet(buffer)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Rule-based cleaning only: the AI stage passes the frame through
+    monkeypatch.setattr(backend, "ai_clean_batches", lambda df, prescreen=False, on_plan=None: iter([(df, {})]))
+    return TestClient(backend.app)
+
+
+def clean(client, chunk_size, extension=".csv", **params):
+    response = client.post("/clean-data/", params={"chunk_size": chunk_size, "outlier_column": "amount", **params},
+                           files={"file": ("sales" + extension, sales_file(extension))})
+    assert response.status_code == 200, response.text
+    return pd.DataFrame(response.json()["cleaned_data"])
+
+
+@pytest.mark.parametrize("extension", [".csv", ".xlsx", ".parquet"])
+def test_result_does_not_depend_on_chunk_size(client, extension):
+    whole = clean(client, 10_000, extension)
+    chunked = clean(client, 7, extension)
+    pd.testing.assert_frame_equal(chunked, whole)
+    # Global mean fill, cross-chunk duplicates and the outlier are all handled
+    assert whole["amount"].notna().all()
+    assert not whole.duplicated().any()
+    assert whole["amount"].max() < 10_000
+
+
+def test_chunked_upload_matches_in_memory_cleaning(client):
+    df = pd.read_csv(io.BytesIO(sales_csv()))
+    expected = backend.data_cleaning.clean_data(df.copy(), outlier_column="amount")
+    chunked = clean(client, 7)
+    np.testing.assert_allclose(chunked["amount"].to_numpy(), expected["amount"].to_numpy())
+    assert chunked["region"].tolist() == expected["region"].tolist()
+
+
+@pytest.mark.parametrize("stream", [None, "ndjson"])
+def test_preview_comes_from_the_first_read(client, stream):
+    response = client.post("/clean-data/", params={"chunk_size": 7, "preview_rows": 3, "stream": stream},
+                           files={"file": ("sales.csv", sales_csv(), "text/csv")})
+    assert response.status_code == 200
+    first = response.json() if stream is None else json.loads(response.text.splitlines()[0])
+    assert len(first["original_preview"]) == 3
+
+
+def test_unsupported_upload_is_rejected(client):
+    response = client.post("/clean-data/", files={"file": ("sales.txt", b"a,b\n1,2\n", "text/plain")})
+    assert response.status_code == 400
+
+
+def in_batches(df, prescreen=False, on_plan=None, fail_after=None):
+    for batch, start in enumerate(range(0, len(df), 20)):
+        if batch == fail_after:
+            raise RuntimeError("model went away")
+        yield df.iloc[start:start + 20], {"issues_found": [f"batch {batch}"], "cleaning_strategy": []}
+
+
+def stream_events(response, stream):
+    if stream == "sse":
+        return [json.loads(event[len("data: "):]) for event in response.text.split("\n\n") if event]
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+@pytest.mark.parametrize("stream", ["ndjson", "sse"])
+def test_stream_sends_one_event_per_batch_then_done(client, monkeypatch, stream):
+    monkeypatch.setattr(backend, "ai_clean_batches", in_batches)
+    response = client.post("/clean-data/", params={"stream": stream, "outlier_column": "amount"},
+                           files={"file": ("sales.csv", sales_csv())})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream" if stream == "sse" else "application/x-ndjson")
+    *batches, done = stream_events(response, stream)
+    assert [event["batch"] for event in batches] == [1, 2, 3]
+    assert [event["issues_found"] for event in batches] == [["batch 0"], ["batch 1"], ["batch 2"]]
+    streamed = pd.DataFrame([row for event in batches for row in event["cleaned_data"]])
+    pd.testing.assert_frame_equal(streamed, clean(client, 10_000))
+    assert done["done"] is True and done["batches"] == 3
+
+
+def test_stream_reports_a_failure_and_still_finishes(client, monkeypatch):
+    monkeypatch.setattr(backend, "ai_clean_batches", lambda df, prescreen=False, on_plan=None: in_batches(df, fail_after=1))
+    response = client.post("/clean-data/", params={"stream": "ndjson"}, files={"file": ("sales.csv", sales_csv())})
+    batch, error, done = stream_events(response, "ndjson")
+    assert batch["batch"] == 1
+    assert error == {"error": "model went away"}
+    assert done["batches"] == 1
+
+
+def test_unknown_stream_format_is_rejected(client):
+    response = client.post("/clean-data/", params={"stream": "websocket"}, files={"file": ("sales.csv", sales_csv())})
+    assert response.status_code == 400
+
+
+def test_requests_get_server_timing_and_show_up_in_metrics(client):
+    response = client.post("/clean-data/", files={"file": ("sales.csv", sales_csv())})
+    assert "rule_cleaning;dur=" in response.headers["server-timing"]
+    scrape = client.get("/metrics")
+    assert scrape.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'datacleaning_http_requests_total{route="/clean-data/",status="200"}' in scrape.text
+    assert 'datacleaning_stage_calls_total{stage="rule_cleaning"}' in scrape.text
@@ -0,0 +1,49 @@
+import io
+
+import pandas as pd
+import pytest
+
+from scripts.batch_encoders import ENCODERS, get_encoder
+
+
+def frame():
+    return pd.DataFrame({
+        "city": ["Paris", "Paris", "Paris", "Rome", "Milan"],
+        "amount": [1.5, 2.0, None, 4.25, 5.0],
+        "note": ["short", "a much longer note", "ok", "ok", "ok"],
+    })
+
+
+def test_csv_and_jsonl_read_back_to_the_batch():
+    df = frame()
+    pd.testing.assert_frame_equal(pd.read_csv(io.StringIO(get_encoder("csv").encode(df))), df)
+    pd.testing.assert_frame_equal(pd.read_json(io.StringIO(get_encoder("jsonl").encode(df)), lines=True), df)
+
+
+def test_columnar_writes_one_line_per_column():
+    assert get_encoder("columnar").encode(frame()).splitlines() == [
+        "rows: 5",
+        "city: Paris | Paris | Paris | Rome | Milan",
+        "amount: 1.5 | 2.0 |  | 4.25 | 5.0",
+        "note: short | a much longer note | ok | ok | ok",
+    ]
+
+
+def test_dictionary_codes_repeated_values_with_a_legend():
+    text = get_encoder("csv", dictionary_encode=True).encode(frame())
+    legend, data = text.split("\n\n")
+    assert legend.splitlines()[1:] == ["city: @0=Paris"]
+    assert data.splitlines()[1:4] == ["@0,1.5,short", "@0,2.0,a much longer note", "@0,,ok"]
+
+
+def test_truncation_shortens_only_long_text_cells():
+    text = get_encoder("csv", max_cell_chars=6).encode(frame())
+    assert "a much..." in text and "short" in text
+
+
+def test_signature_covers_the_options_and_unknown_names_raise():
+    signatures = {get_encoder(name).signature for name in ENCODERS}
+    assert len(signatures) == len(ENCODERS)
+    assert get_encoder("csv").signature != get_encoder("csv", dictionary_encode=True).signature
+    with pytest.raises(ValueError):
+        get_encoder("xml")
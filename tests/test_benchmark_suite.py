@@ -0,0 +1,49 @@
+import sys
+
+import ollama
+import pandas as pd
+
+from benchmarks import suite
+from benchmarks.synthetic import make_dataset
+
+
+def test_dataset_is_reproducible_and_has_the_requested_shape():
+    df = make_dataset(200, numeric_columns=2, categorical_columns=1, duplicate_ratio=0.1, cardinality=3)
+    pd.testing.assert_frame_equal(df, make_dataset(200, numeric_columns=2, categorical_columns=1, duplicate_ratio=0.1, cardinality=3))
+    assert len(df) == 200 and df.duplicated().sum() >= 1
+    assert df["id"].notna().all() and df["num_0"].isna().any()
+    assert df["cat_0"].dropna().nunique() == 3
+
+
+def test_every_repeat_gets_a_fresh_copy():
+    df = pd.DataFrame({"a": [1.0, None]})
+    seen = []
+
+    def fill(frame):
+        seen.append(frame["a"].isna().sum())
+        frame.fillna(0.0, inplace=True)
+
+    result = suite.time_case(fill, len(df), repeats=3, setup=df.copy)
+    assert seen == [1, 1, 1] and df["a"].isna().sum() == 1
+    assert result["rows"] == 2 and result["seconds"] >= 0
+
+
+def test_regressions_are_drops_beyond_the_tolerance():
+    baseline = {"results": {"a": {"rows_per_sec": 100.0}, "b": {"rows_per_sec": 100.0}}}
+    results = {"a": {"rows_per_sec": 85.0}, "b": {"rows_per_sec": 70.0}, "new": {"rows_per_sec": 1.0}}
+    assert suite.find_regressions(results, baseline, tolerance=0.2) == [("b", 100.0, 70.0)]
+
+
+def test_main_stores_a_baseline_then_compares_against_it(tmp_path, monkeypatch):
+    monkeypatch.setattr(ollama, "chat", ollama.chat)  # main installs the fake LLM; restored afterwards
+    args = ["suite.py", "--only", "cleaning", "--rows", "300", "--repeats", "1",
+            "--history", str(tmp_path / "history.json"), "--baseline", str(tmp_path / "baseline.json")]
+    monkeypatch.setattr(sys, "argv", args + ["--update-baseline"])
+    assert suite.main() == 0
+    monkeypatch.setattr(sys, "argv", args + ["--tolerance", "1.0"])
+    assert suite.main() == 0
+    history = suite.load_json(str(tmp_path / "history.json"), [])
+    assert len(history) == 2 and set(history[0]["results"]) == set(suite.cleaning_cases())
+    # A baseline recorded with other settings is not compared against
+    monkeypatch.setattr(sys, "argv", args[:4] + ["301"] + args[5:] + ["--tolerance", "0"])
+    assert suite.main() == 0
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.cleaning_plan import CleaningPlan
+from scripts.data_cleaning import DataCleaning
+
+
+def orders():
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({
+        "region": rng.choice(["north", "south", "east"], 80),
+        "amount": rng.normal(50, 5, 80).round(1),
+        "units": rng.integers(1, 5, 80).astype(float),
+        "note": [f"n{i}" for i in range(80)],
+    })
+    df.loc[[3, 17, 40], "amount"] = np.nan
+    df.loc[[8, 60], "units"] = np.nan
+    df.loc[25, "amount"] = 900.0
+    return pd.concat([df, df.iloc[[1, 2, 2]]], ignore_index=True)
+
+
+@pytest.mark.parametrize("options", [
+    {"missing_value_strategy": "mean"},
+    {"missing_value_strategy": "median", "outlier_column": "amount"},
+    {"missing_value_strategy": "mode", "outlier_column": "amount", "categorical_column": "region"},
+    {"missing_value_strategy": "drop", "outlier_column": "amount", "data_type_fixes": {"units": "int"}},
+    {"missing_value_strategy": "mean", "outlier_column": "amount", "irrelevant_columns": ["units"]},
+])
+def test_fused_plan_matches_the_step_chain(options):
+    df = orders()
+    chained = DataCleaning().clean_data(df.copy(), **options)
+    fused = DataCleaning(fused=True).clean_data(df.copy(), **options)
+    pd.testing.assert_frame_equal(fused, chained)
+
+
+def test_fused_plan_leaves_the_input_untouched():
+    df = orders()
+    DataCleaning(fused=True).clean_data(df, missing_value_strategy="mean", outlier_column="amount", irrelevant_columns=["note"])
+    pd.testing.assert_frame_equal(df, orders())
+
+
+def test_dropped_columns_take_no_part_in_duplicate_detection():
+    df = pd.DataFrame({"amount": [1.0, 1.0, 2.0], "note": ["a", "b", "c"]})
+    assert len(DataCleaning().clean_data(df.copy(), irrelevant_columns=["note"])) == 3
+    assert len(DataCleaning(fused=True).clean_data(df.copy(), irrelevant_columns=["note"])) == 2
+
+
+def test_explain_lists_the_compiled_steps():
+    plan = CleaningPlan("drop", outlier_column="amount", irrelevant_columns=["note"], categorical_column="region")
+    assert plan.explain() == ("drop_irrelevant_columns -> filter(missing_rows, duplicates, outliers) "
+                              "-> encode_categorical_variables")
@@ -0,0 +1,49 @@
+import sqlite3
+
+import pandas as pd
+
+from scripts.db_pool import EnginePool
+
+
+def sqlite_url(tmp_path, name):
+    return f"sqlite:///{tmp_path / name}"
+
+
+def test_engines_are_reused_per_url(tmp_path):
+    pool = EnginePool()
+    a = pool.get(sqlite_url(tmp_path, "a.db"))
+    assert pool.get(sqlite_url(tmp_path, "a.db")) is a
+    assert pool.get(sqlite_url(tmp_path, "b.db")) is not a
+    pool.dispose_all()
+
+
+def test_least_recently_used_engine_is_evicted_at_the_cap(tmp_path):
+    pool = EnginePool(max_engines=2)
+    a, b = pool.get(sqlite_url(tmp_path, "a.db")), pool.get(sqlite_url(tmp_path, "b.db"))
+    # Requesting an open URL at the cap evicts nothing
+    assert pool.get(sqlite_url(tmp_path, "a.db")) is a
+    assert pool.get(sqlite_url(tmp_path, "b.db")) is b
+    pool.get(sqlite_url(tmp_path, "a.db"))
+    pool.get(sqlite_url(tmp_path, "c.db"))
+    assert sorted(pool._engines) == [sqlite_url(tmp_path, "a.db"), sqlite_url(tmp_path, "c.db")]
+    assert pool.get(sqlite_url(tmp_path, "a.db")) is a
+    pool.dispose_all()
+
+
+def test_idle_engines_are_disposed(tmp_path):
+    pool = EnginePool(idle_timeout=-1)
+    a = pool.get(sqlite_url(tmp_path, "a.db"))
+    pool.get(sqlite_url(tmp_path, "b.db"))
+    assert list(pool._engines) == [sqlite_url(tmp_path, "b.db")]
+    assert pool.get(sqlite_url(tmp_path, "a.db")) is not a
+    pool.dispose_all()
+
+
+def test_iter_query_streams_in_chunks(tmp_path):
+    with sqlite3.connect(tmp_path / "sales.db") as connection:
+        pd.DataFrame({"id": range(25), "amount": [i * 1.5 for i in range(25)]}).to_sql("sales", connection, index=False)
+    pool = EnginePool()
+    chunks = list(pool.iter_query(sqlite_url(tmp_path, "sales.db"), "SELECT * FROM sales ORDER BY id", chunksize=10))
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    assert pd.concat(chunks)["id"].tolist() == list(range(25))
+    pool.dispose_all()
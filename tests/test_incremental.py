@@ -0,0 +1,88 @@
+import os
+
+import pandas as pd
+import pytest
+
+from scripts.incremental import IncrementalCleaner
+
+
+@pytest.fixture
+def cleaner(tmp_path):
+    return IncrementalCleaner(state_path=str(tmp_path / "state.sqlite"), output_dir=str(tmp_path / "out"))
+
+
+def sales(ids, start):
+    return pd.DataFrame({
+        "id": ids,
+        "amount": [float(i) for i in ids],
+        "sold_at": pd.date_range(start, periods=len(ids), freq="h"),
+    })
+
+
+def test_datetime_watermark_survives_between_runs(cleaner):
+    first = sales(range(5), "2024-01-01")
+    cleaner.run("sales", first, key_columns=["id"], watermark_column="sold_at")
+    assert cleaner.get_watermark("sales") == pd.Timestamp("2024-01-01 04:00")
+
+    # The second run re-reads the old rows plus five new ones; only the new ones are past the watermark
+    second = pd.concat([first, sales(range(5, 10), "2024-01-02")], ignore_index=True)
+    cleaned = cleaner.run("sales", second, key_columns=["id"], watermark_column="sold_at")
+
+    assert cleaned["id"].tolist() == [5, 6, 7, 8, 9]
+    assert cleaner.get_watermark("sales") == pd.Timestamp("2024-01-02 04:00")
+    assert sorted(cleaner.load_output("sales")["id"]) == list(range(10))
+
+
+def test_changed_rows_replace_earlier_versions_without_rewriting_parts(cleaner):
+    cleaner.run("sales", sales(range(5), "2024-01-01"), key_columns=["id"])
+    first_part = cleaner.part_path("sales", 1)
+    written = os.path.getmtime(first_part)
+
+    changed = sales(range(5), "2024-01-01")
+    changed.loc[2, "amount"] = 200.0
+    cleaned = cleaner.run("sales", changed, key_columns=["id"])
+
+    assert cleaned["id"].tolist() == [2]
+    assert os.path.getmtime(first_part) == written
+    output = cleaner.load_output("sales").set_index("id")
+    assert len(output) == 5
+    assert output.loc[2, "amount"] == 200.0
+
+    cleaner.compact("sales")
+    assert not os.path.exists(first_part)
+    pd.testing.assert_frame_equal(cleaner.load_output("sales").set_index("id").sort_index(), output.sort_index())
+
+
+def test_failed_run_leaves_output_and_state_unchanged(cleaner):
+    cleaner.run("sales", sales(range(5), "2024-01-01"), key_columns=["id"], watermark_column="sold_at")
+    before = cleaner.load_output("sales")
+
+    def failing_stage(df):
+        raise RuntimeError("model unavailable")
+
+    with pytest.raises(RuntimeError):
+        cleaner.run("sales", sales(range(5, 8), "2024-01-02"), key_columns=["id"], watermark_column="sold_at",
+                    ai_stage=failing_stage)
+
+    pd.testing.assert_frame_equal(cleaner.load_output("sales"), before)
+    assert cleaner.get_watermark("sales") == pd.Timestamp("2024-01-01 04:00")
+    # The rows are still new to the next run
+    cleaned = cleaner.run("sales", sales(range(5, 8), "2024-01-02"), key_columns=["id"], watermark_column="sold_at")
+    assert cleaned["id"].tolist() == [5, 6, 7]
+
+
+def test_only_the_incoming_keys_are_looked_up(cleaner):
+    history = sales(range(1200), "2024-01-01")
+    cleaner.run("sales", history, key_columns=["id"])
+
+    incoming = history.iloc[[3, 600, 1100]].copy()
+    incoming["amount"] += 0.5
+    statements = []
+    cleaner._conn.set_trace_callback(statements.append)
+    cleaned = cleaner.run("sales", incoming, key_columns=["id"])
+    cleaner._conn.set_trace_callback(None)
+
+    assert cleaned["id"].tolist() == [3, 600, 1100]
+    lookups = [sql for sql in statements if sql.startswith("SELECT row_key, row_hash FROM fingerprints")]
+    assert len(lookups) == 1 and "IN (" in lookups[0]
+    assert len(cleaner.load_output("sales")) == 1200
@@ -0,0 +1,109 @@
+import io
+import os
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from scripts.jobs import JobManager, COMPLETED, FAILED, CANCELLED, QUEUED, RUNNING
+
+
+def wait_for(manager, job_id, *statuses, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = manager.status(job_id)
+        if status["status"] in statuses:
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} stayed {manager.status(job_id)['status']}")
+
+
+def batches(params, input_path, context):
+    with open(input_path) as source:
+        values = [int(line) for line in source]
+    for value in values:
+        yield pd.DataFrame({"value": [value]}), {"issues_found": [f"row {value}"]}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "jobs.sqlite")
+
+
+def test_completed_job_stores_every_batch_and_removes_its_input(path):
+    manager = JobManager(path)
+    manager.register("file", batches)
+    job_id = manager.submit("file", {}, io.BytesIO(b"1\n2\n3\n"), "values.txt")
+    status = wait_for(manager, job_id, COMPLETED)
+    assert status["batches_done"] == status["batches_total"] == 3
+    assert [result["cleaned_data"] for result in manager.results(job_id, offset=1)] == [[{"value": 2}], [{"value": 3}]]
+    assert "timings" in manager.report(job_id)
+    assert os.listdir(manager.inputs_dir) == []
+    manager.shutdown()
+
+
+def test_failed_runner_records_the_error(path):
+    def broken(params, input_path, context):
+        yield pd.DataFrame({"value": [1]}), {}
+        raise RuntimeError("boom")
+
+    manager = JobManager(path)
+    manager.register("file", broken)
+    job_id = manager.submit("file", {})
+    status = wait_for(manager, job_id, FAILED)
+    assert status["error"] == "boom"
+    assert len(manager.results(job_id)) == 1
+    manager.shutdown()
+
+
+def test_cancelling_a_queued_job_removes_its_input(path):
+    release = threading.Event()
+
+    def blocking(params, input_path, context):
+        release.wait(5)
+        yield pd.DataFrame({"value": [1]}), {}
+
+    manager = JobManager(path, max_workers=1)
+    manager.register("file", blocking)
+    running = manager.submit("file", {})
+    queued = manager.submit("file", {}, io.BytesIO(b"1\n"), "values.txt")
+    assert manager.cancel(queued)["status"] == CANCELLED
+    assert os.listdir(manager.inputs_dir) == []
+    release.set()
+    wait_for(manager, running, COMPLETED)
+    assert manager.status(queued)["status"] == CANCELLED
+    manager.shutdown()
+
+
+def test_jobs_interrupted_by_shutdown_resume_in_the_next_manager(path):
+    started, release = threading.Event(), threading.Event()
+
+    def slow(params, input_path, context):
+        for batch in batches(params, input_path, context):
+            started.set()
+            release.wait(5)
+            if context.cancelled:
+                return
+            yield batch
+
+    manager = JobManager(path, max_workers=1)
+    manager.register("file", slow)
+    running = manager.submit("file", {}, io.BytesIO(b"1\n2\n"), "a.txt")
+    queued = manager.submit("file", {}, io.BytesIO(b"3\n"), "b.txt")
+    assert started.wait(5)
+    manager.shutdown()
+    release.set()
+    manager._executor.shutdown(wait=True)
+    assert manager.status(running)["status"] == RUNNING
+    assert manager.status(queued)["status"] == QUEUED
+    assert len(os.listdir(manager.inputs_dir)) == 2
+
+    restarted = JobManager(path, max_workers=1)
+    restarted.register("file", batches)
+    assert sorted(restarted.resume()) == sorted([running, queued])
+    wait_for(restarted, running, COMPLETED)
+    wait_for(restarted, queued, COMPLETED)
+    assert [result["cleaned_data"] for result in restarted.results(running)] == [[{"value": 1}], [{"value": 2}]]
+    assert os.listdir(restarted.inputs_dir) == []
+    restarted.shutdown()
@@ -0,0 +1,44 @@
+import time
+
+import pandas as pd
+
+from scripts.llm_cache import LLMCache
+
+
+def test_key_follows_contents_not_index():
+    df = pd.DataFrame({"a": [1, 2], "b": ["x", "y"]})
+    key = LLMCache.make_key("m", "v1", df)
+    assert key == LLMCache.make_key("m", "v1", df.set_axis([10, 11]))
+    assert key != LLMCache.make_key("m", "v2", df)
+    assert key != LLMCache.make_key("other", "v1", df)
+    assert key != LLMCache.make_key("m", "v1", df.assign(a=[1, 3]))
+    assert key != LLMCache.make_key("m", "v1", df, context_df=df)
+
+
+def test_hits_misses_and_expiry(tmp_path):
+    cache = LLMCache(tmp_path / "cache.sqlite", ttl=60)
+    assert cache.get("k") is None
+    cache.set("k", {"cleaned_data": [{"a": 1}]})
+    assert cache.get("k") == {"cleaned_data": [{"a": 1}]}
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1}
+
+    cache._conn.execute("UPDATE responses SET created_at = ?", (time.time() - 120,))
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = LLMCache(tmp_path / "cache.sqlite", max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache._conn.execute("UPDATE responses SET accessed_at = accessed_at - 10 WHERE key = 'a'")
+    cache._conn.execute("UPDATE responses SET accessed_at = accessed_at - 20 WHERE key = 'b'")
+    assert cache.get("a") == 1  # now the most recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_entries_survive_a_new_instance(tmp_path):
+    LLMCache(tmp_path / "cache.sqlite").set("k", [1, 2])
+    assert LLMCache(tmp_path / "cache.sqlite").get("k") == [1, 2]
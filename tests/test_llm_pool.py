@@ -0,0 +1,107 @@
+import threading
+
+import pytest
+from ollama import ResponseError
+
+from benchmarks.stub_ollama import StubOllama
+from scripts.llm_pool import OllamaPool
+
+MESSAGES = [{"role": "user", "content": "Dataset:\nid,value\n1,2.5\nReturn format:"}]
+
+
+@pytest.fixture
+def stubs():
+    servers = []
+
+    def start(**kwargs):
+        server = StubOllama(latency=0.05, parallel=4, **kwargs).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        try:
+            server.stop()
+        except OSError:
+            pass
+
+
+def pool_for(*servers, **kwargs):
+    return OllamaPool([server.host for server in servers], health_interval=0, timeout=5, **kwargs)
+
+
+def stats_by_host(pool):
+    return {stats["host"]: stats for stats in pool.stats()}
+
+
+def test_calls_are_spread_over_endpoints(stubs):
+    a, b = stubs(), stubs()
+    pool = pool_for(a, b, max_concurrency=1)
+    threads = [threading.Thread(target=pool.chat, args=("llama3",), kwargs={"messages": MESSAGES}) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (a.chats, b.chats) == (2, 2)
+    assert all(stats["outstanding"] == 0 for stats in pool.stats())
+    pool.close()
+
+
+def test_dead_endpoint_fails_over_and_is_ejected(stubs):
+    alive, dead = stubs(), stubs()
+    dead.stop()
+    pool = pool_for(dead, alive, failure_threshold=1)
+    for _ in range(3):
+        response = pool.chat("llama3", messages=MESSAGES)
+        assert response.message.content
+    stats = stats_by_host(pool)
+    assert alive.chats == 3
+    assert stats[dead.host]["healthy"] is False
+    assert stats[alive.host]["failures"] == 0
+    pool.close()
+
+
+def test_streaming_fails_over_before_the_first_chunk(stubs):
+    alive, dead = stubs(), stubs()
+    dead.stop()
+    pool = pool_for(dead, alive)
+    chunks = list(pool.chat("llama3", messages=MESSAGES, stream=True))
+    assert chunks[-1]["done"] is True
+    assert alive.chats == 1
+    pool.close()
+
+
+def test_missing_model_is_routed_elsewhere_without_marking_the_endpoint(stubs):
+    without, with_model = stubs(models={"other"}), stubs()
+    pool = pool_for(without, with_model)
+    pool.chat("llama3", messages=MESSAGES)
+    stats = stats_by_host(pool)
+    assert "llama3" in stats[without.host]["missing"]
+    assert "llama3" not in stats[without.host]["models"]
+    assert stats[without.host]["failures"] == 0 and stats[without.host]["healthy"]
+    assert "llama3" in stats[with_model.host]["models"]
+    # Known to lack the model, the first endpoint is no longer tried for it
+    pool.chat("llama3", messages=MESSAGES)
+    assert stats_by_host(pool)[without.host]["requests"] == 1
+    # ...but still serves the models it has
+    pool.chat("other", messages=MESSAGES)
+    assert without.chats == 1
+    pool.close()
+
+
+def test_model_missing_everywhere_raises(stubs):
+    pool = pool_for(stubs(models=set()), stubs(models=set()))
+    with pytest.raises(ResponseError) as error:
+        pool.chat("llama3", messages=MESSAGES)
+    assert error.value.status_code == 404
+    assert all(stats["failures"] == 0 for stats in pool.stats())
+    pool.close()
+
+
+def test_warm_up_loads_the_model_everywhere(stubs):
+    a, b = stubs(), stubs()
+    pool = pool_for(a, b)
+    assert pool.warm_up("llama3") == {a.host: "ok", b.host: "ok"}
+    assert a.loaded == b.loaded == {"llama3"}
+    assert all(stats["models"] == ["llama3"] for stats in pool.stats())
+    pool.close()
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.data_cleaning import DataCleaning
+from scripts.memory_optimizer import ARROW_STRINGS, MemoryOptimizer
+
+
+def frame():
+    return pd.DataFrame({
+        "small": np.arange(100, dtype="int64"),
+        "signed": np.arange(-50, 50, dtype="int64"),
+        "halves": np.arange(100) / 2,
+        "precise": np.arange(100) / 3,
+        "city": ["Paris", "Rome"] * 50,
+        "code": [f"c{i}" for i in range(100)],
+        "flag": [True, False] * 50,
+    })
+
+
+def test_dtypes_shrink_and_values_stay_the_same():
+    df = frame()
+    optimized, report = MemoryOptimizer().optimize(df)
+    assert optimized["small"].dtype == np.uint8
+    assert optimized["signed"].dtype == np.int8
+    assert optimized["halves"].dtype == np.float32
+    assert optimized["precise"].dtype == np.float64  # float32 would change the values
+    assert isinstance(optimized["city"].dtype, pd.CategoricalDtype)
+    assert optimized["flag"].dtype == bool
+    if ARROW_STRINGS:
+        assert optimized["code"].dtype == "string[pyarrow]"
+    pd.testing.assert_frame_equal(optimized, df, check_dtype=False, check_categorical=False)
+    assert report["saved_bytes"] == report["before_bytes"] - report["after_bytes"] > 0
+    assert report["columns"]["small"] == {"from": "int64", "to": "uint8"}
+    pd.testing.assert_frame_equal(df, frame())  # the input is not modified
+
+
+def test_mixed_objects_and_nullable_integers_are_left_alone():
+    df = pd.DataFrame({"mixed": [1, "a", None], "nullable": pd.array([1, None, 3], dtype="Int64")})
+    optimized, report = MemoryOptimizer().optimize(df)
+    assert report["columns"] == {}
+    pd.testing.assert_frame_equal(optimized, df)
+
+
+@pytest.mark.parametrize("fused", [False, True])
+def test_high_cardinality_dummies_are_sparse(fused):
+    df = pd.DataFrame({"code": [f"c{i}" for i in range(60)] * 2, "value": np.arange(120.0)})
+    cleaned = DataCleaning().clean_data(df, categorical_column="code", optimize_memory=True, fused=fused)
+    dummies = [column for column in cleaned.columns if column.startswith("code_")]
+    assert len(dummies) == 59
+    assert all(isinstance(cleaned[column].dtype, pd.SparseDtype) for column in dummies)
+    dense = DataCleaning().clean_data(df, categorical_column="code", fused=fused)
+    assert not isinstance(dense["code_c1"].dtype, pd.SparseDtype)
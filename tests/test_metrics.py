@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from scripts.metrics import Metrics, metrics, profiled, record_llm_usage, stage, timed_iter, track_request
+
+
+def test_render_groups_samples_and_escapes_labels():
+    registry = Metrics()
+    registry.inc("stage_calls_total", stage="read")
+    registry.inc("stage_calls_total", 2, stage="read")
+    registry.inc("http_requests_total", route='/a"b', status=200)
+    lines = registry.render({"llm_cache_entries": 3, "skipped": None}).splitlines()
+    assert lines == [
+        "# HELP datacleaning_http_requests_total HTTP requests by route and status code.",
+        "# TYPE datacleaning_http_requests_total counter",
+        'datacleaning_http_requests_total{route="/a\\"b",status="200"} 1',
+        "# HELP datacleaning_stage_calls_total Number of times each pipeline stage ran.",
+        "# TYPE datacleaning_stage_calls_total counter",
+        'datacleaning_stage_calls_total{stage="read"} 3',
+        "# TYPE datacleaning_llm_cache_entries gauge",
+        "datacleaning_llm_cache_entries 3",
+    ]
+
+
+def test_stages_reach_the_current_request_and_the_process_counters():
+    before = metrics.snapshot().get(("stage_rows_total", (("stage", "test_stage"),)), 0)
+    with track_request() as timings:
+        with stage("test_stage", rows=10) as counts:
+            counts["bytes"] = 80
+        chunks = list(timed_iter("test_read", iter([pd.DataFrame({"a": [1, 2]}), pd.DataFrame({"a": [3]})])))
+        record_llm_usage({"prompt_eval_count": 12, "eval_count": 5})
+    breakdown = timings.breakdown()
+    assert len(chunks) == 2
+    assert breakdown["stages"]["test_stage"]["rows"] == 10 and breakdown["stages"]["test_stage"]["bytes"] == 80
+    assert breakdown["stages"]["test_read"]["rows"] == 3 and breakdown["stages"]["test_read"]["calls"] == 3
+    assert breakdown["llm_tokens"] == {"prompt": 12, "completion": 5}
+    assert metrics.snapshot()[("stage_rows_total", (("stage", "test_stage"),))] == before + 10
+    assert timings.server_timing().startswith("test_stage;dur=")
+
+
+def test_profiled_reports_and_rejects_unknown_modes():
+    with profiled("all", top=5) as report:
+        sum(range(1000))
+    assert "cumulative" in report["cprofile"] and report["tracemalloc"]["peak_bytes"] >= 0
+    with profiled(None) as report:
+        pass
+    assert report == {}
+    with pytest.raises(ValueError):
+        with profiled("perf"):
+            pass
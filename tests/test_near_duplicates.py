@@ -0,0 +1,41 @@
+import pandas as pd
+
+from scripts.near_duplicates import NearDuplicateDetector
+
+
+def frame():
+    return pd.DataFrame({
+        "name": ["Acme Corp.", "acme  corp", "Globex", "ACME CORP", "Initech"],
+        "city": ["Paris", None, "Rome", "Paris", None],
+        "phone": [None, "555-0100", None, "555-0100", "555-0199"],
+    })
+
+
+def test_rows_that_differ_by_case_spacing_and_punctuation_share_a_cluster():
+    labels = NearDuplicateDetector(columns=["name"]).find(frame())
+    assert labels.tolist() == [0, 0, 1, 0, 2]
+
+
+def test_merge_policies():
+    detector = NearDuplicateDetector(columns=["name"])
+    first, report = detector.deduplicate(frame(), policy="first")
+    assert first.index.tolist() == [0, 2, 4]
+    assert report == {"rows": 5, "clusters": 3, "removed": 2}
+    assert detector.deduplicate(frame(), policy="last")[0].index.tolist() == [2, 3, 4]
+    assert detector.deduplicate(frame(), policy="most_complete")[0].index.tolist() == [2, 3, 4]
+    coalesced, _ = detector.deduplicate(frame(), policy="coalesce")
+    assert coalesced.loc[0].tolist() == ["Acme Corp.", "Paris", "555-0100"]
+
+
+def test_numbers_keep_their_sign_and_decimals():
+    df = pd.DataFrame({"name": ["Widget", "widget", "Widget"], "price": [15.0, -15.0, 15]})
+    labels = NearDuplicateDetector().find(df)
+    assert labels.tolist() == [0, 1, 0]
+    assert NearDuplicateDetector().find(pd.DataFrame({"price": [1.5, 15.0]})).nunique() == 2
+
+
+def test_rows_with_empty_keys_are_never_merged():
+    df = pd.DataFrame({"name": [None, None, "a"], "city": [None, None, "b"]})
+    deduplicated, report = NearDuplicateDetector().deduplicate(df)
+    assert len(deduplicated) == 3
+    assert report["removed"] == 0
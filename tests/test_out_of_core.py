@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.data_cleaning import DataCleaning
+from scripts.out_of_core import OutOfCoreCleaner, QuantileSketch, SpillingHashSet
+
+
+def readings():
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame({
+        "sensor": rng.choice(["a", "b", "c"], 300),
+        "value": rng.normal(20, 2, 300).round(2),
+        "count": rng.integers(0, 10, 300).astype(float),
+    })
+    df.loc[[4, 90, 250], "value"] = np.nan
+    df.loc[[7, 120], "count"] = np.nan
+    df.loc[[30, 200], "value"] = [500.0, -400.0]
+    # Duplicates of early rows in later partitions
+    return pd.concat([df, df.iloc[[1, 2, 3, 50]]], ignore_index=True)
+
+
+def partitions(df, size):
+    return lambda: (df.iloc[start:start + size] for start in range(0, len(df), size))
+
+
+@pytest.mark.parametrize("options", [
+    {"missing_value_strategy": "mean", "outlier_column": "value"},
+    {"missing_value_strategy": "drop", "outlier_column": "value", "categorical_column": "sensor"},
+    {"missing_value_strategy": "mode", "irrelevant_columns": ["count"]},
+])
+def test_partitions_match_in_memory_cleaning(options):
+    df = readings()
+    expected = DataCleaning().clean_data(df.copy(), **options).reset_index(drop=True)
+    # A sketch as large as the data makes the quantiles exact
+    cleaned = pd.concat(OutOfCoreCleaner(sketch_size=1000).clean(partitions(df, 37), **options), ignore_index=True)
+    pd.testing.assert_frame_equal(cleaned, expected, check_dtype=False)
+
+
+def test_median_and_bounds_are_approximate_with_a_small_sketch():
+    df = readings()
+    stats = OutOfCoreCleaner(sketch_size=100).collect_statistics(partitions(df, 50)(), "median", "value")
+    assert abs(stats["fill_values"]["value"] - df["value"].median()) < 1.0
+    lower, upper = stats["outlier_bounds"]
+    assert lower > -400 and upper < 500
+
+
+def test_hash_set_spills_to_disk_and_still_finds_every_hash(tmp_path):
+    seen = SpillingHashSet(max_memory_items=10, spill_dir=str(tmp_path))
+    for start in range(0, 25, 6):
+        assert seen.first_seen(np.arange(start, min(start + 6, 25))).all()
+    assert len(list(tmp_path.iterdir())) >= 2
+    assert seen.first_seen(np.array([3, 24, 25, 25])).tolist() == [False, False, True, False]
+    seen.close()
+
+
+def test_sketch_state_round_trips():
+    sketch = QuantileSketch(size=50)
+    sketch.update(np.arange(1000, dtype=float))
+    restored = QuantileSketch.from_dict(sketch.to_dict())
+    assert restored.quantile(0.5) == sketch.quantile(0.5)
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.data_cleaning import DataCleaning
+from scripts.parallel import ParallelExecutor
+
+
+def frame():
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({f"num_{i}": rng.normal(0, 1, 400).round(3) for i in range(5)})
+    df["cat"] = rng.choice(["a", "b", "c"], 400)
+    df.loc[rng.random(400) < 0.05, "num_0"] = np.nan
+    df.loc[rng.random(400) < 0.05, "cat"] = None
+    df.loc[399, "num_1"] = 50.0
+    return pd.concat([df, df.iloc[:10]], ignore_index=True)
+
+
+@pytest.fixture(params=["thread", "process"])
+def executor(request):
+    # min_cells=0 shards even this small frame
+    executor = ParallelExecutor(n_jobs=3, backend=request.param, min_cells=0)
+    yield executor
+    executor.close()
+
+
+def test_sharded_operations_match_the_inline_ones(executor):
+    df = frame()
+    inline = ParallelExecutor(n_jobs=1)
+    numeric = df.select_dtypes("number")
+    for statistic in ("mean", "median", "mode"):
+        pd.testing.assert_series_equal(executor.column_statistics(numeric, statistic), inline.column_statistics(numeric, statistic))
+    values = inline.column_statistics(numeric, "mean")
+    pd.testing.assert_frame_equal(executor.fillna(df, values), inline.fillna(df, values))
+    np.testing.assert_array_equal(executor.duplicated(df), inline.duplicated(df))
+    np.testing.assert_array_equal(executor.between(df, "num_1", -1, 1), inline.between(df, "num_1", -1, 1))
+
+
+@pytest.mark.parametrize("fused", [False, True])
+@pytest.mark.parametrize("strategy", ["mean", "median", "mode", "drop"])
+def test_clean_data_does_not_depend_on_n_jobs(fused, strategy):
+    options = dict(missing_value_strategy=strategy, outlier_column="num_1", fused=fused)
+    expected = DataCleaning(n_jobs=1).clean_data(frame(), **options)
+    cleaner = DataCleaning(n_jobs=4)
+    cleaner.executor.min_cells = 0
+    try:
+        pd.testing.assert_frame_equal(cleaner.clean_data(frame(), **options), expected)
+    finally:
+        cleaner.executor.close()
+
+
+def test_small_frames_and_single_jobs_run_inline():
+    assert not ParallelExecutor(n_jobs=4).enabled(frame())
+    assert not ParallelExecutor(n_jobs=1, min_cells=0).enabled(frame())
+    assert ParallelExecutor(n_jobs=-1).n_jobs >= 1
+    with pytest.raises(ValueError):
+        ParallelExecutor(backend="gpu")
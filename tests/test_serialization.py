@@ -0,0 +1,60 @@
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.serialization import RESPONSE_SHAPES, compress, frame_to_json, result_to_json
+
+
+def frame():
+    return pd.DataFrame({
+        "ratio": [0.1 + 0.2, 1 / 3, np.nan, np.inf],
+        "price": [1.5, 2.25, None, 4.0],
+        "count": pd.array([1, None, 3, 4], dtype="Int64"),
+        "when": pd.to_datetime(["2024-01-01", None, "2024-03-01", "2024-04-01"]),
+        "name": ["a", "é", None, "d"],
+    })
+
+
+def records(text, shape):
+    parsed = json.loads(text)
+    if shape == "split":
+        return [dict(zip(parsed["columns"], row)) for row in parsed["data"]]
+    if shape == "columns":
+        return [dict(zip(parsed, row)) for row in zip(*parsed.values())]
+    return parsed
+
+
+@pytest.mark.parametrize("shape", RESPONSE_SHAPES)
+def test_shapes_hold_the_same_rows(shape):
+    rows = records(frame_to_json(frame(), shape), shape)
+    assert rows[0] == {"ratio": 0.1 + 0.2, "price": 1.5, "count": 1, "when": "2024-01-01T00:00:00.000", "name": "a"}
+    assert rows[1]["count"] is None and rows[1]["when"] is None and rows[1]["name"] == "é"
+    assert rows[2]["ratio"] is None and rows[3]["ratio"] is None
+
+
+@pytest.mark.parametrize("shape", RESPONSE_SHAPES)
+def test_floats_round_trip_exactly(shape):
+    values = [0.1 + 0.2, 1 / 3, 123456789.12345679, 1e-300, 2.5, -0.0]
+    rows = records(frame_to_json(pd.DataFrame({"x": values}), shape), shape)
+    assert [row["x"] for row in rows] == values
+    assert frame_to_json(pd.DataFrame({"x": [1.5, None]}), shape) in ('[{"x":1.5},{"x":null}]',
+                                                                      '{"columns":["x"],"data":[[1.5],[null]]}',
+                                                                      '{"x":[1.5,null]}')
+
+
+def test_result_to_json_puts_fields_first_and_adds_the_preview():
+    df = pd.DataFrame({"x": [1 / 3]})
+    parsed = json.loads(result_to_json({"issues_found": ["i"]}, df, "columns", preview=df, job_id="j"))
+    assert list(parsed) == ["job_id", "issues_found", "cleaning_strategy", "cleaned_data", "original_preview"]
+    assert parsed["cleaned_data"] == {"x": [1 / 3]}
+
+
+def test_unknown_shape_and_compression_raise():
+    with pytest.raises(ValueError):
+        frame_to_json(frame(), "index")
+    with pytest.raises(ValueError):
+        compress(b"{}", "brotli")
+    assert gzip.decompress(compress(b"{}", "gzip")) == b"{}"
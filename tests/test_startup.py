@@ -0,0 +1,29 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from benchmarks.bench_startup import DEFERRED, PROBE, ROOT
+from scripts.ai_agent import AIAgent
+
+
+@pytest.mark.parametrize("module", ["scripts.ai_agent", "scripts.backend"])
+def test_import_leaves_heavy_modules_unloaded(module, tmp_path):
+    env = {**os.environ, "JOBS_DB_PATH": str(tmp_path / "jobs.sqlite"), "LLM_CACHE_PATH": str(tmp_path / "cache.sqlite")}
+    output = subprocess.run([sys.executable, "-c", PROBE.format(module=module, deferred=DEFERRED)],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+    assert json.loads(output.strip().splitlines()[-1])["loaded"] == []
+
+
+def test_graph_is_compiled_once_per_agent():
+    agent = AIAgent()
+    graphs = []
+    threads = [threading.Thread(target=lambda: graphs.append(agent.graph)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(graph) for graph in graphs}) == 1
@@ -0,0 +1,73 @@
+import json
+
+import ollama
+import pandas as pd
+
+from benchmarks.fake_llm import FakeLLM
+from scripts.ai_agent import AIAgent
+from scripts.structured_output import BatchSchema, StreamingResultParser
+
+
+def batch():
+    return pd.DataFrame({"name": ["a", "b", "c"], "amount": [1.0, None, 3.0], "_row_id": [10, 11, 12]})
+
+
+def answer(records):
+    return json.dumps({"issues_found": ["x"], "cleaning_strategy": ["y"], "cleaned_data": records})
+
+
+def test_schema_lists_columns_row_ids_and_types():
+    schema = BatchSchema(batch()).json_schema()
+    record = schema["properties"]["cleaned_data"]["items"]
+    assert record["required"] == ["_row_id", "name", "amount"]
+    assert record["properties"]["_row_id"]["enum"] == [10, 11, 12]
+    assert record["properties"]["amount"]["type"] == ["number", "null"]
+
+
+def test_record_errors():
+    schema = BatchSchema(batch())
+    assert schema.errors({"_row_id": 10, "name": "a", "amount": None}) == []
+    assert schema.errors({"_row_id": 99, "name": "a", "amount": 1}) == ["unknown _row_id 99"]
+    assert schema.errors({"_row_id": 10, "name": "a", "amount": 1}, seen={10}) == ["duplicate _row_id 10"]
+    assert schema.errors({"_row_id": 11, "name": "b"}) == ["missing columns ['amount']"]
+    assert schema.errors({"_row_id": 11, "name": "b", "amount": "lots", "x": 1}) == [
+        "unexpected columns ['x']", "amount: 'lots' is not number/null"]
+
+
+def test_records_complete_as_their_closing_brace_arrives():
+    records = [{"_row_id": i, "name": "n", "amount": 1.5} for i in (10, 11, 12)]
+    text = answer(records)
+    parser = StreamingResultParser(BatchSchema(batch()))
+    completed = []
+    for start in range(0, len(text), 3):
+        completed.append(len(parser.feed(text[start:start + 3])))
+    assert sum(completed) == 3 and max(completed) == 1
+    assert parser.done and parser.error is None
+    assert parser.result() == {"issues_found": ["x"], "cleaning_strategy": ["y"], "cleaned_data": records}
+
+
+def test_parser_stops_on_malformed_text_or_too_many_invalid_records():
+    parser = StreamingResultParser(BatchSchema(batch()))
+    parser.feed('Sure! {"cleaned_data": []}')
+    assert parser.stopped and parser.error.startswith("expected a JSON object")
+
+    bad = [{"_row_id": i, "name": "n"} for i in (10, 11, 12)]
+    parser = StreamingResultParser(BatchSchema(batch()), max_invalid=2)
+    parser.feed(answer(bad))
+    assert parser.error.startswith("3 records failed validation") and not parser.done
+    assert len(parser.invalid) == 3
+
+    parser = StreamingResultParser(BatchSchema(batch()))
+    parser.feed('{"cleaned_data": [{"_row_id": 10]}')
+    assert parser.error == "unexpected ']'"
+
+
+def test_structured_mode_returns_one_record_per_row_despite_bad_records(monkeypatch):
+    fake = FakeLLM(latency=0, bad_row_ratio=0.2, seed=4)
+    monkeypatch.setattr(ollama, "chat", fake)
+    df = pd.DataFrame({"name": [f"n{i}" for i in range(30)], "amount": [float(i) for i in range(30)]})
+    results = AIAgent(structured=True, row_retries=5, max_invalid_records=30).clean_data(df, batch_size=10)
+    records = [record for result in results for record in result["cleaned_data"]]
+    assert len(records) == len(df)
+    assert all(set(record) == {"name", "amount"} for record in records)
+    assert fake.calls > len(results)  # the bad rows were sent again
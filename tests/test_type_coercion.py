@@ -0,0 +1,48 @@
+import pandas as pd
+
+from scripts.data_cleaning import DataCleaning
+from scripts.type_coercion import TypeCoercer
+
+
+def test_int_target_rounds_fractional_values_and_reports_them():
+    coerced, report = TypeCoercer().coerce(pd.DataFrame({"a": [1.5, 2.0, 3.7]}), {"a": "int"})
+    assert coerced["a"].tolist() == [2, 2, 4]
+    assert report["a"]["rounded"] == 2
+    assert report["a"]["failed"] == 0
+
+
+def test_explicit_dtype_names_are_kept_exactly():
+    df = pd.DataFrame({"f": [1.0, 2.0, None], "i": ["1", "2", "x"]})
+    coerced, report = TypeCoercer().coerce(df, {"f": "float64", "i": "int64"})
+    assert coerced["f"].dtype == "float64"
+    # int64 cannot hold the unparseable cell, so it becomes the nullable Int64
+    assert coerced["i"].dtype == "Int64"
+    assert report["i"]["failed"] == 1
+    assert report["i"]["failed_examples"] == [{"row": 2, "value": "x"}]
+
+
+def test_generic_targets_are_downcast():
+    coerced, _ = TypeCoercer().coerce(pd.DataFrame({"f": [1.0, 2.5], "i": [1, 2]}), {"f": "float", "i": "int"})
+    assert coerced["f"].dtype == "float32"
+    assert coerced["i"].dtype == "int8"
+
+
+def test_fix_data_types_reports_changed_cells(capsys):
+    df = DataCleaning().fix_data_types(pd.DataFrame({"a": [1.5, "x", 3.0]}), "a", "int")
+    assert df["a"].tolist() == [2, pd.NA, 3]
+    output = capsys.readouterr().out
+    assert "1 cells could not be converted" in output
+    assert "1 fractional values rounded" in output
+
+
+def test_integer_overflow_is_reported_instead_of_wrapping():
+    coerced, report = TypeCoercer().coerce(pd.DataFrame({"a": [300, 1], "b": [1e20, 2.0]}), {"a": "int8", "b": "int"})
+    assert coerced["a"].tolist() == [pd.NA, 1]
+    assert coerced["b"].tolist() == [pd.NA, 2]
+    assert report["a"]["failed"] == 1 and report["b"]["failed"] == 1
+    assert report["b"]["rounded"] == 0
+
+
+def test_infinite_values_fail_for_integer_targets():
+    df = DataCleaning().fix_data_types(pd.DataFrame({"a": ["1", "inf", "-inf"]}), "a", "int")
+    assert df["a"].tolist() == [1, pd.NA, pd.NA]